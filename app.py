@@ -1,11 +1,42 @@
 import streamlit as st
 import pandas as pd
+import shutil
 import sqlite3
-from datetime import datetime, date
-import altair as alt
-from io import BytesIO
+import tempfile
+from datetime import datetime
 from pathlib import Path
-from typing import Optional, List, Tuple
+
+from inventory.admin import (
+    JOURNAL_KEEP, count_deletable_logs, delete_logs, delete_logs_where, get_journal, hard_delete_names, set_active, undo,
+    update_names,
+)
+from inventory.analytics import (
+    item_totals, load_log_columns, monthly_totals, recipient_item_totals, recipient_totals,
+)
+from inventory.archive import archivable_years, archive_year
+from inventory.db import (
+    analyze_db, db_free_bytes, fts_available, get_archives, rebuild_item_balances, rebuild_note_index,
+    rebuild_rollups, set_thread_db, vacuum_db,
+)
+from inventory.queries import (
+    LOG_COLUMNS, add_items, add_recipients, count_logs, get_active_items, get_active_recipients,
+    get_all_items, get_all_recipients, get_item_balances, get_log_date_range, get_low_stock,
+    get_rollup_months, insert_log, insert_logs_bulk, insert_receipt, log_cursor, monthly_item_stats,
+    monthly_recipient_item_stats, monthly_recipient_stats, prepare_db, read_logs, search_logs,
+    set_min_qtys, set_stock_count,
+)
+from inventory.export import export_key, export_logs
+from inventory.forecast import forecast_items, item_series, recipient_rates
+from inventory.importer import import_logs
+from inventory.perf import db_size, get_monitor
+from inventory.report import report_job, request_report
+from inventory.sites import (
+    count_logs_sites, export_sites, get_sites, item_names, item_totals_sites, log_date_range_sites,
+    monthly_item_stats_sites, monthly_recipient_stats_sites, read_logs_sites, recipient_names,
+    rollup_months_sites, set_item_aliases, site_items, sites_export_key,
+)
+from inventory.sync import pending_changes, start_sync
+from inventory.writer import get_writer
 
 # =========================================================
 # 설정
@@ -14,570 +45,859 @@ st.set_page_config(page_title="대구고등법원 환경미화 소모품 스마
 st.title("📱 대구고등법원 환경미화 소모품 스마트 장부")
 st.caption("만든이 오장일")
 
-DB_PATH = Path("inventory.db")
-
 # ⚠️ 실무 운영 시 비밀번호는 반드시 변경하세요.
 # 더 안전하게 하려면 Streamlit Cloud의 Secrets로 옮기는 것을 권장합니다.
 ADMIN_PASSWORD = "1234"
 
 # =========================================================
-# 초기 데이터 (명단/품목)
-# =========================================================
-DEFAULT_RECIPIENTS = [
-    "김순영","노나경","김감열","임금란","최점순","최명숙","김상임","김일란",
-    "정정화","이순옥","김영경","정해동","박선옥","박영순","우미진","우시은",
-    "장기현","박승욱"
-]
-
-DEFAULT_ITEMS = [
-    "핸드타올","점보롤",
-    "락스","박리제","왁스","물비누","소독제","세수비누","빨래비누","하이타이",
-    "쓰레기봉투(100L)","쓰레기봉투(75L)","쓰레기봉투(50L)","쓰레기봉투(20L)",
-    "고무장갑","장갑","수세미(녹색)","수세미(철)","극세사수건","마대걸레","기름걸레",
-    "갈대빗자루","플라스틱빗자루","쓰레받이(대)","쓰레받이(소)",
-    "빠께스","변기솔","금속광택제","바가지",
-    "위생비닐","위생봉투컵","검정비닐","헤라"
-]
-
+# 화면 유틸
 # =========================================================
-# DB 유틸
-# =========================================================
-def run(query: str, params=(), fetch: bool = False):
-    # Streamlit rerun 환경에서 안전하게
-    conn = sqlite3.connect(DB_PATH)
-    try:
-        conn.execute("PRAGMA foreign_keys = ON;")
-        cur = conn.cursor()
-        cur.execute(query, params)
-        rows = cur.fetchall() if fetch else None
-        conn.commit()
-        return rows
-    finally:
-        conn.close()
-
-def init_db():
-    run("""
-        CREATE TABLE IF NOT EXISTS recipients (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL,
-            active INTEGER NOT NULL DEFAULT 1
-        )
-    """)
-    run("""
-        CREATE TABLE IF NOT EXISTS items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL,
-            active INTEGER NOT NULL DEFAULT 1
-        )
-    """)
-    run("""
-        CREATE TABLE IF NOT EXISTS logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ts TEXT NOT NULL,
-            recipient_id INTEGER NOT NULL,
-            item_id INTEGER NOT NULL,
-            qty INTEGER NOT NULL,
-            note TEXT,
-            FOREIGN KEY(recipient_id) REFERENCES recipients(id),
-            FOREIGN KEY(item_id) REFERENCES items(id)
-        )
-    """)
-
-def seed_if_empty():
-    r_cnt = run("SELECT COUNT(*) FROM recipients", fetch=True)[0][0]
-    i_cnt = run("SELECT COUNT(*) FROM items", fetch=True)[0][0]
-
-    if r_cnt == 0:
-        for name in DEFAULT_RECIPIENTS:
-            run("INSERT OR IGNORE INTO recipients(name, active) VALUES (?, 1)", (name,))
-    if i_cnt == 0:
-        for name in DEFAULT_ITEMS:
-            run("INSERT OR IGNORE INTO items(name, active) VALUES (?, 1)", (name,))
-
-def get_active_recipients() -> List[Tuple[int, str]]:
-    return run("SELECT id, name FROM recipients WHERE active=1 ORDER BY name", fetch=True)
-
-def get_active_items() -> List[Tuple[int, str]]:
-    return run("SELECT id, name FROM items WHERE active=1 ORDER BY name", fetch=True)
-
-def get_all_recipients():
-    return run("SELECT id, name, active FROM recipients ORDER BY name", fetch=True)
-
-def get_all_items():
-    return run("SELECT id, name, active FROM items ORDER BY name", fetch=True)
+def log_pager(key: str, page_size: int, **filters) -> pd.DataFrame:
+    # 지나온 페이지의 커서를 세션에 스택으로 보관 -> 매 렌더마다 page_size 건만 읽음
+    state = st.session_state.setdefault(key, {"filters": filters, "stack": []})
+    if state["filters"] != filters:
+        state.update(filters=filters, stack=[])
+    stack = state["stack"]
+    df = read_logs(limit=page_size + 1, before=stack[-1] if stack else None, **filters)
+    has_next = len(df) > page_size
+    df = df.head(page_size)
+
+    c1, c2, c3 = st.columns([1, 1, 4])
+    with c1:
+        if st.button("◀ 이전", key=f"{key}_prev", disabled=not stack):
+            stack.pop()
+            st.rerun()
+    with c2:
+        if st.button("다음 ▶", key=f"{key}_next", disabled=not has_next):
+            stack.append(log_cursor(df))
+            st.rerun()
+    with c3:
+        st.caption(f"{len(stack) + 1} 페이지")
+    return df
 
-def insert_log(ts: datetime, recipient_id: int, item_id: int, qty: int, note: Optional[str]):
-    run(
-        "INSERT INTO logs(ts, recipient_id, item_id, qty, note) VALUES (?, ?, ?, ?, ?)",
-        (ts.strftime("%Y-%m-%d %H:%M:%S"), recipient_id, item_id, qty, note)
+def export_button(kind: str, label: str, file_name: str, mime: str, all_sites: bool = False, **filters):
+    # 버튼을 눌렀을 때만 파일을 만들고, 만든 파일은 필터/데이터가 같은 동안 재사용
+    # 사업장을 바꾸면 다른 장부이므로 세션에 둔 파일도 사업장별로
+    site = st.session_state.get("site_sel")
+    state_key = f"export_{kind}_sites" if all_sites else f"export_{kind}" + (f"_{site}" if site else "")
+    key_fn, build = (sites_export_key, export_sites) if all_sites else (export_key, export_logs)
+    if st.button(f"📦 {label} 파일 만들기", key=f"{state_key}_build"):
+        with st.spinner("파일을 만드는 중..."):
+            st.session_state[state_key] = (key_fn(kind, **filters), build(kind, **filters))
+    built = st.session_state.get(state_key)
+    if built and built[0] == key_fn(kind, **filters) and built[1].exists():
+        with open(built[1], "rb") as f:
+            st.download_button(f"⬇️ {label} 다운로드", data=f, file_name=file_name, mime=mime, key=f"{state_key}_dl")
+
+def admin_done(message: str, *editor_keys: str):
+    # 결과 메시지를 다음 렌더에 보여 주고 편집 표의 수정 상태를 비운 뒤 한 번만 다시 그림
+    st.session_state["admin_flash"] = message
+    for key in editor_keys:
+        st.session_state.pop(key, None)
+    st.rerun()
+
+def names_admin(table: str, label: str, rows, key: str):
+    # 수령자/품목 편집 표: 이름 · 활성은 표에서 고쳐 한 번에 저장, 체크한 행은 한 번에 전환/삭제
+    df = pd.DataFrame(rows, columns=["id", "이름", "활성"])
+    df["활성"] = df["활성"] == 1
+    df.insert(0, "선택", False)
+    editor_key = f"{key}_editor"
+    edited = st.data_editor(
+        df, key=editor_key, use_container_width=True, hide_index=True, disabled=["id"],
+        column_config={"선택": st.column_config.CheckboxColumn(width="small")},
     )
+    selected = edited.loc[edited["선택"], "id"].astype(int).tolist()
 
-def read_logs(
-    start: Optional[date] = None,
-    end: Optional[date] = None,
-    recipient_id: Optional[int] = None,
-    item_id: Optional[int] = None
-) -> pd.DataFrame:
-    where = []
-    params = []
-
-    if start:
-        where.append("date(ts) >= date(?)")
-        params.append(start.strftime("%Y-%m-%d"))
-    if end:
-        where.append("date(ts) <= date(?)")
-        params.append(end.strftime("%Y-%m-%d"))
-    if recipient_id:
-        where.append("recipient_id = ?")
-        params.append(recipient_id)
-    if item_id:
-        where.append("item_id = ?")
-        params.append(item_id)
-
-    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
-
-    rows = run(f"""
-        SELECT
-            l.id,
-            l.ts,
-            r.name AS recipient,
-            i.name AS item,
-            l.qty,
-            COALESCE(l.note, '') AS note
-        FROM logs l
-        JOIN recipients r ON r.id = l.recipient_id
-        JOIN items i ON i.id = l.item_id
-        {where_sql}
-        ORDER BY l.ts DESC
-    """, tuple(params), fetch=True)
-
-    df = pd.DataFrame(rows, columns=["id", "시간", "수령자", "품목", "수량", "비고"])
-    if not df.empty:
-        df["시간"] = pd.to_datetime(df["시간"], errors="coerce")
-    return df
-
-def deactivate_recipient(recipient_id: int):
-    run("UPDATE recipients SET active=0 WHERE id=?", (recipient_id,))
-
-def activate_recipient(recipient_id: int):
-    run("UPDATE recipients SET active=1 WHERE id=?", (recipient_id,))
-
-def deactivate_item(item_id: int):
-    run("UPDATE items SET active=0 WHERE id=?", (item_id,))
-
-def activate_item(item_id: int):
-    run("UPDATE items SET active=1 WHERE id=?", (item_id,))
-
-def add_recipients(names: List[str]):
-    for n in names:
-        n = n.strip()
-        if n:
-            run("INSERT OR IGNORE INTO recipients(name, active) VALUES (?, 1)", (n,))
-
-def add_items(names: List[str]):
-    for n in names:
-        n = n.strip()
-        if n:
-            run("INSERT OR IGNORE INTO items(name, active) VALUES (?, 1)", (n,))
-
-def delete_log(log_id: int):
-    run("DELETE FROM logs WHERE id=?", (log_id,))
-
-# ====== 추가: 수정/완전삭제 유틸 ======
-def update_recipient_name(recipient_id: int, new_name: str):
-    new_name = new_name.strip()
-    if not new_name:
-        raise ValueError("이름이 비어있습니다.")
-    run("UPDATE recipients SET name=? WHERE id=?", (new_name, recipient_id))
-
-def update_item_name(item_id: int, new_name: str):
-    new_name = new_name.strip()
-    if not new_name:
-        raise ValueError("품목명이 비어있습니다.")
-    run("UPDATE items SET name=? WHERE id=?", (new_name, item_id))
-
-def hard_delete_recipient(recipient_id: int):
-    cnt = run("SELECT COUNT(*) FROM logs WHERE recipient_id=?", (recipient_id,), fetch=True)[0][0]
-    if cnt > 0:
-        raise ValueError(f"이 수령자는 지급 기록 {cnt}건이 연결되어 있어 완전 삭제할 수 없습니다. 비활성화를 사용하세요.")
-    run("DELETE FROM recipients WHERE id=?", (recipient_id,))
-
-def hard_delete_item(item_id: int):
-    cnt = run("SELECT COUNT(*) FROM logs WHERE item_id=?", (item_id,), fetch=True)[0][0]
-    if cnt > 0:
-        raise ValueError(f"이 품목은 지급 기록 {cnt}건이 연결되어 있어 완전 삭제할 수 없습니다. 비활성화를 사용하세요.")
-    run("DELETE FROM items WHERE id=?", (item_id,))
+    b1, b2, b3, b4 = st.columns(4)
+    try:
+        with b1:
+            if st.button("💾 수정 내용 저장", key=f"{key}_save"):
+                n = update_names(table, list(edited[["id", "이름", "활성"]].itertuples(index=False, name=None)))
+                admin_done(f"{label} {n}건 수정 완료", editor_key)
+        with b2:
+            if st.button(f"🚫 선택 {len(selected)}건 비활성화", key=f"{key}_deact", disabled=not selected):
+                n = set_active(table, selected, False)
+                admin_done(f"{label} {n}건 비활성화 완료", editor_key)
+        with b3:
+            if st.button(f"✅ 선택 {len(selected)}건 활성화", key=f"{key}_act", disabled=not selected):
+                n = set_active(table, selected, True)
+                admin_done(f"{label} {n}건 활성화 완료", editor_key)
+        with b4:
+            if st.button(f"🗑️ 선택 {len(selected)}건 완전 삭제", key=f"{key}_hard_delete", disabled=not selected):
+                n = hard_delete_names(table, selected)
+                admin_done(f"{label} {n}건 완전 삭제 완료", editor_key)
+    except sqlite3.IntegrityError:
+        st.error("같은 이름이 이미 존재합니다. (중복 불가)")
+    except ValueError as e:
+        st.error(str(e))
+    st.caption(f"※ 기록이 연결된 {label}은(는) 완전 삭제가 막힙니다. (비활성화 권장) 잘못 바꾼 것은 '기록 관리' 탭에서 되돌릴 수 있습니다.")
 
 # =========================================================
-# 앱 시작: DB 준비
+# 앱 시작: DB 준비 (프로세스당 한 번, 이후 rerun 에서는 바로 통과)
 # =========================================================
-init_db()
-seed_if_empty()
+# 세션 스레드는 재사용되므로 매번 대표 장부로 되돌린 뒤 시작
+set_thread_db(None)
+prepare_db()
+# INVENTORY_SHEET_KEY 가 설정된 경우에만 Google Sheets 동기화 스레드 시작 (대표 장부)
+sync_worker = start_sync()
+
+# INVENTORY_SITES 로 사업장이 여럿이면 고른 사업장 장부를 이 스레드의 대상으로
+sites = get_sites()
+multi_site = len(sites) > 1
+if multi_site:
+    site_name = st.sidebar.selectbox("사업장", [s.name for s in sites], key="site_sel")
+    set_thread_db(next(s.path for s in sites if s.name == site_name))
+    prepare_db()
 
 # =========================================================
 # 메뉴
 # =========================================================
-menu = st.sidebar.radio("메뉴", ["📤 지급 기록", "📊 통계", "📁 내역 조회/다운로드", "⚙️ 관리자"])
+menu = st.sidebar.radio("메뉴", ["📤 지급 기록", "📦 입고 · 재고", "📊 통계", "📈 예측 · 발주", "📁 내역 조회/다운로드", "⚙️ 관리자"])
+page_timer = get_monitor().page_timer(menu)
+
+# 화면 본문. st.stop()/st.rerun() 도 예외로 빠져나가므로 시간 기록은 finally 에서
+try:
+    # =========================================================
+    # 1) 지급 기록
+    # =========================================================
+    if menu == "📤 지급 기록":
+        st.subheader("📤 소모품 지급 입력")
+
+        recipients = get_active_recipients()
+        items = get_active_items()
+
+        if not recipients:
+            st.error("활성 수령자가 없습니다. 관리자 메뉴에서 수령자를 등록/활성화하세요.")
+            st.stop()
+        if not items:
+            st.error("활성 품목이 없습니다. 관리자 메뉴에서 품목을 등록/활성화하세요.")
+            st.stop()
+
+        low_stock = get_low_stock()
+        if low_stock:
+            st.warning("재고 부족: " + ", ".join(f"{name} {on_hand}개 (최소 {min_qty})" for name, on_hand, min_qty in low_stock))
+
+        recip_labels = [name for _id, name in recipients]
+        recip_map = {name: _id for _id, name in recipients}
+
+        item_labels = [name for _id, name in items]
+        item_map = {name: _id for _id, name in items}
+
+        mode_single, mode_cart, mode_grid = st.tabs(["한 건 입력", "여러 건(장바구니)", "수령자 × 품목 표"])
+
+        with mode_single:
+            with st.form("issue_form", clear_on_submit=True):
+                c1, c2, c3 = st.columns([2, 2, 1])
+
+                with c1:
+                    recip_name = st.selectbox("수령자", recip_labels)
+                with c2:
+                    item_name = st.selectbox("품목", item_labels)
+                with c3:
+                    qty = st.number_input("수량", min_value=1, value=1, step=1)
+
+                note = st.text_input("비고(선택)", placeholder="예: 대청소, 특별작업 등")
+                submitted = st.form_submit_button("✅ 지급 기록 저장")
+
+                if submitted:
+                    insert_log(
+                        ts=datetime.now(),
+                        recipient_id=recip_map[recip_name],
+                        item_id=item_map[item_name],
+                        qty=int(qty),
+                        note=note.strip() if note else None
+                    )
+                    st.success("저장되었습니다.")
+
+        # 장바구니: 여러 줄을 모아 한 번에 저장
+        with mode_cart:
+            cart_key = f"issue_cart_{st.session_state.get('issue_cart_ver', 0)}"
+            cart = st.data_editor(
+                pd.DataFrame({"수령자": pd.Series(dtype="object"), "품목": pd.Series(dtype="object"),
+                              "수량": pd.Series(dtype="int64"), "비고": pd.Series(dtype="object")}),
+                num_rows="dynamic",
+                use_container_width=True,
+                column_config={
+                    "수령자": st.column_config.SelectboxColumn("수령자", options=recip_labels, required=True),
+                    "품목": st.column_config.SelectboxColumn("품목", options=item_labels, required=True),
+                    "수량": st.column_config.NumberColumn("수량", min_value=1, step=1, default=1, required=True),
+                    "비고": st.column_config.TextColumn("비고"),
+                },
+                key=cart_key,
+            )
+            if st.button("✅ 장바구니 일괄 저장", key="issue_cart_save"):
+                now = datetime.now()
+                rows = [
+                    (now, recip_map[r["수령자"]], item_map[r["품목"]], int(r["수량"]),
+                     str(r["비고"]).strip() if pd.notna(r["비고"]) and str(r["비고"]).strip() else None)
+                    for r in cart.to_dict("records")
+                    if r["수령자"] in recip_map and r["품목"] in item_map and pd.notna(r["수량"]) and int(r["수량"]) > 0
+                ]
+                if not rows:
+                    st.warning("저장할 줄이 없습니다.")
+                else:
+                    insert_logs_bulk(rows)
+                    st.session_state["issue_cart_ver"] = st.session_state.get("issue_cart_ver", 0) + 1
+                    st.success(f"{len(rows)}건 저장되었습니다.")
+
+        # 표 입력: 수령자(행) × 품목(열) 에 수량을 채워 한 번에 저장
+        with mode_grid:
+            grid_items = st.multiselect("품목 선택", item_labels, key="issue_grid_items")
+            if not grid_items:
+                st.info("표에 표시할 품목을 선택하세요.")
+            else:
+                grid_key = f"issue_grid_{st.session_state.get('issue_grid_ver', 0)}"
+                grid = st.data_editor(
+                    pd.DataFrame(0, index=pd.Index(recip_labels, name="수령자"), columns=grid_items),
+                    use_container_width=True,
+                    column_config={n: st.column_config.NumberColumn(n, min_value=0, step=1) for n in grid_items},
+                    key=grid_key,
+                )
+                grid_note = st.text_input("비고(선택)", placeholder="예: 월초 일괄 지급", key="issue_grid_note")
+                if st.button("✅ 표 일괄 저장", key="issue_grid_save"):
+                    now = datetime.now()
+                    note_val = grid_note.strip() or None
+                    long = grid.stack()
+                    long = long[long.fillna(0) > 0]
+                    rows = [
+                        (now, recip_map[r_name], item_map[i_name], int(q), note_val)
+                        for (r_name, i_name), q in long.items()
+                    ]
+                    if not rows:
+                        st.warning("수량이 입력된 칸이 없습니다.")
+                    else:
+                        insert_logs_bulk(rows)
+                        st.session_state["issue_grid_ver"] = st.session_state.get("issue_grid_ver", 0) + 1
+                        st.success(f"{len(rows)}건 저장되었습니다.")
 
-# =========================================================
-# 1) 지급 기록
-# =========================================================
-if menu == "📤 지급 기록":
-    st.subheader("📤 소모품 지급 입력")
+        st.divider()
 
-    recipients = get_active_recipients()
-    items = get_active_items()
+        st.caption("최근 기록 (50건씩)")
+        df_recent = log_pager("recent_pages", 50)
+        if df_recent.empty:
+            st.info("아직 기록이 없습니다.")
+        else:
+            st.dataframe(df_recent, use_container_width=True)
 
-    if not recipients:
-        st.error("활성 수령자가 없습니다. 관리자 메뉴에서 수령자를 등록/활성화하세요.")
-        st.stop()
-    if not items:
-        st.error("활성 품목이 없습니다. 관리자 메뉴에서 품목을 등록/활성화하세요.")
-        st.stop()
+    # =========================================================
+    # 2) 입고 · 재고
+    # =========================================================
+    elif menu == "📦 입고 · 재고":
+        st.subheader("📦 입고 · 재고")
 
-    recip_labels = [name for _id, name in recipients]
-    recip_map = {name: _id for _id, name in recipients}
+        items = get_active_items()
+        if not items:
+            st.error("활성 품목이 없습니다. 관리자 메뉴에서 품목을 등록/활성화하세요.")
+            st.stop()
 
-    item_labels = [name for _id, name in items]
-    item_map = {name: _id for _id, name in items}
+        item_labels = [name for _id, name in items]
+        item_map = {name: _id for _id, name in items}
 
-    with st.form("issue_form", clear_on_submit=True):
-        c1, c2, c3 = st.columns([2, 2, 1])
+        c1, c2 = st.columns(2)
 
         with c1:
-            recip_name = st.selectbox("수령자", recip_labels)
-        with c2:
-            item_name = st.selectbox("품목", item_labels)
-        with c3:
-            qty = st.number_input("수량", min_value=1, value=1, step=1)
-
-        note = st.text_input("비고(선택)", placeholder="예: 대청소, 특별작업 등")
-        submitted = st.form_submit_button("✅ 지급 기록 저장")
-
-        if submitted:
-            insert_log(
-                ts=datetime.now(),
-                recipient_id=recip_map[recip_name],
-                item_id=item_map[item_name],
-                qty=int(qty),
-                note=note.strip() if note else None
-            )
-            st.success("저장되었습니다.")
-
-    st.divider()
-
-    st.caption("최근 50건")
-    df_recent = read_logs()
-    if df_recent.empty:
-        st.info("아직 기록이 없습니다.")
-    else:
-        st.dataframe(df_recent.head(50), use_container_width=True)
+            st.markdown("#### 입고 등록")
+            with st.form("receipt_form", clear_on_submit=True):
+                r_item = st.selectbox("품목", item_labels, key="receipt_item")
+                r_qty = st.number_input("입고 수량", min_value=1, value=1, step=1, key="receipt_qty")
+                r_note = st.text_input("비고(선택)", placeholder="예: 3월 정기 구매", key="receipt_note")
+                if st.form_submit_button("✅ 입고 저장"):
+                    insert_receipt(datetime.now(), item_map[r_item], int(r_qty), r_note.strip() or None)
+                    st.success("입고 저장되었습니다.")
 
-# =========================================================
-# 2) 통계
-# =========================================================
-elif menu == "📊 통계":
-    st.subheader("📊 월별 · 품목별 통계")
+        with c2:
+            st.markdown("#### 재고 실사(조정)")
+            with st.form("stock_count_form", clear_on_submit=True):
+                a_item = st.selectbox("품목", item_labels, key="count_item")
+                a_qty = st.number_input("실제 수량", min_value=0, value=0, step=1, key="count_qty")
+                a_reason = st.text_input("사유(선택)", placeholder="예: 월말 재고 실사", key="count_reason")
+                if st.form_submit_button("✅ 실사 수량 반영"):
+                    delta = set_stock_count(datetime.now(), item_map[a_item], int(a_qty), a_reason.strip() or "재고 실사")
+                    st.success(f"반영되었습니다. (조정 {delta:+d})")
 
-    df = read_logs()
-    if df.empty:
-        st.info("통계를 낼 데이터가 없습니다.")
-        st.stop()
+        st.divider()
+        st.markdown("#### 현재고")
+        st.caption("• 최소재고를 입력하면 그 이하로 떨어질 때 지급 화면에 경고가 표시됩니다.")
+
+        bal = get_item_balances()
+        edited = st.data_editor(
+            bal,
+            use_container_width=True,
+            hide_index=True,
+            disabled=["id", "품목", "현재고"],
+            column_config={"최소재고": st.column_config.NumberColumn("최소재고", min_value=0, step=1)},
+            key="balance_editor",
+        )
+        if st.button("💾 최소재고 저장", key="min_qty_save"):
+            changed = edited[edited["최소재고"] != bal["최소재고"]]
+            empty = changed[changed["최소재고"].isna()]
+            if not empty.empty:
+                st.error(f"최소재고가 비어 있습니다: {', '.join(empty['품목'])} (0 이상의 수를 입력하세요)")
+            else:
+                set_min_qtys(list(zip(changed["id"], changed["최소재고"])))
+                st.success(f"{len(changed)}개 품목 저장")
+                st.rerun()
 
-    df = df.dropna(subset=["시간"]).copy()
-    df["월"] = df["시간"].dt.to_period("M").astype(str)
+    # =========================================================
+    # 3) 통계
+    # =========================================================
+    elif menu == "📊 통계":
+        import altair as alt  # 차트가 있는 이 화면에서만 불러옴
+
+        st.subheader("📊 월별 · 품목별 통계")
+
+        if multi_site and st.checkbox("전체 사업장 합산", key="stats_all_sites"):
+            months = rollup_months_sites()
+            if not months:
+                st.info("통계를 낼 데이터가 없습니다.")
+                st.stop()
+            month = st.selectbox("월 선택", months, index=len(months) - 1, key="stats_sites_month")
+            st.caption("• 품목은 관리자 > 유지보수의 '사업장 품목 이름 맞추기' 에 따라 통합 이름으로 합칩니다.")
+
+            item_df = monthly_item_stats_sites(month)
+            if item_df.empty:
+                st.info("선택한 달의 기록이 없습니다.")
+            else:
+                st.markdown("#### 품목별 (사업장 합산)")
+                pivot = item_df.pivot_table(index="품목", columns="사업장", values="수량", aggfunc="sum", fill_value=0)
+                pivot = pivot.reindex(columns=[s.name for s in sites], fill_value=0)
+                pivot["합계"] = pivot.sum(axis=1)
+                st.dataframe(pivot.sort_values("합계", ascending=False), use_container_width=True)
+                chart = alt.Chart(item_df).mark_bar().encode(
+                    x=alt.X("품목:N", sort="-y"), y="수량:Q", color="사업장:N", tooltip=["사업장", "품목", "수량"]
+                )
+                st.altair_chart(chart, use_container_width=True)
+
+                st.markdown("#### 수령자별")
+                st.dataframe(monthly_recipient_stats_sites(month), use_container_width=True, hide_index=True)
+
+            st.divider()
+            st.markdown("#### 기간 품목 합계 (사업장별)")
+            site_range = log_date_range_sites()
+            if site_range:
+                c1, c2 = st.columns(2)
+                with c1:
+                    p_start = st.date_input("시작일", value=site_range[0], key="stats_sites_start")
+                with c2:
+                    p_end = st.date_input("종료일", value=site_range[1], key="stats_sites_end")
+                st.dataframe(item_totals_sites(p_start, p_end), use_container_width=True, hide_index=True)
+            st.stop()
+
+        months = get_rollup_months()
+        if not months:
+            st.info("통계를 낼 데이터가 없습니다.")
+            st.stop()
+
+        month = st.selectbox("월 선택", months)
+
+        # 월간 보고서: 작업 스레드에서 만들고, 같은 데이터면 만들어 둔 파일을 바로 내려줌
+        report_path, report_future = report_job(month)
+        if report_path.exists():
+            with open(report_path, "rb") as f:
+                st.download_button(
+                    f"⬇️ {month} 월간 보고서 (PDF)", data=f, file_name=f"소모품_월간보고서_{month}.pdf",
+                    mime="application/pdf", key="report_dl"
+                )
+        elif report_future is not None and not report_future.done():
+            st.info("보고서를 만드는 중입니다. 잠시 후 새로고침하세요.")
+            st.button("🔄 새로고침", key="report_refresh")
+        else:
+            if report_future is not None and report_future.exception() is not None:
+                st.error(f"보고서 생성 실패: {report_future.exception()}")
+            if st.button(f"📄 {month} 월간 보고서 만들기 (PDF)", key="report_build"):
+                request_report(month)
+                st.rerun()
 
-    month = st.selectbox("월 선택", sorted(df["월"].unique()))
-    mdf = df[df["월"] == month].copy()
+        c1, c2 = st.columns(2)
 
-    c1, c2 = st.columns(2)
+        with c1:
+            st.markdown("### 품목별 총 소모량")
+            item_stats = monthly_item_stats(month)
+            chart1 = alt.Chart(item_stats).mark_bar().encode(
+                x=alt.X("수량:Q", title="총 소모량"),
+                y=alt.Y("품목:N", sort="-x", title="품목"),
+                tooltip=["품목", "수량"]
+            )
+            st.altair_chart(chart1, use_container_width=True)
+            st.dataframe(item_stats, use_container_width=True)
 
-    with c1:
-        st.markdown("### 품목별 총 소모량")
-        item_stats = mdf.groupby("품목")["수량"].sum().reset_index().sort_values("수량", ascending=False)
-        chart1 = alt.Chart(item_stats).mark_bar().encode(
-            x=alt.X("수량:Q", title="총 소모량"),
-            y=alt.Y("품목:N", sort="-x", title="품목"),
-            tooltip=["품목", "수량"]
+        with c2:
+            st.markdown("### 수령자별 소모량")
+            recip_stats = monthly_recipient_stats(month)
+            chart2 = alt.Chart(recip_stats).mark_bar().encode(
+                x=alt.X("수량:Q", title="총 소모량"),
+                y=alt.Y("수령자:N", sort="-x", title="수령자"),
+                tooltip=["수령자", "수량"]
+            )
+            st.altair_chart(chart2, use_container_width=True)
+            st.dataframe(recip_stats, use_container_width=True)
+
+        st.markdown("### 수령자 × 품목 (누적)")
+        pivot = monthly_recipient_item_stats(month)
+        chart3 = alt.Chart(pivot).mark_bar().encode(
+            x=alt.X("수령자:N", title="수령자"),
+            y=alt.Y("수량:Q", title="수량"),
+            color="품목:N",
+            tooltip=["수령자", "품목", "수량"]
         )
-        st.altair_chart(chart1, use_container_width=True)
-        st.dataframe(item_stats, use_container_width=True)
+        st.altair_chart(chart3, use_container_width=True)
 
-    with c2:
-        st.markdown("### 수령자별 소모량")
-        recip_stats = mdf.groupby("수령자")["수량"].sum().reset_index().sort_values("수량", ascending=False)
-        chart2 = alt.Chart(recip_stats).mark_bar().encode(
-            x=alt.X("수량:Q", title="총 소모량"),
-            y=alt.Y("수령자:N", sort="-x", title="수령자"),
-            tooltip=["수령자", "수량"]
+        st.divider()
+        st.markdown("### 기간 분석")
+        st.caption("• 여러 달/여러 해를 한 번에 집계합니다.")
+        date_range = get_log_date_range()
+        p1, p2 = st.columns(2)
+        with p1:
+            p_start = st.date_input("시작일", value=date_range[0], key="period_start")
+        with p2:
+            p_end = st.date_input("종료일", value=date_range[1], key="period_end")
+        cols = load_log_columns(start=p_start, end=p_end)
+        st.caption(f"• {len(cols):,}건")
+
+        trend = monthly_totals(cols)
+        st.altair_chart(
+            alt.Chart(trend).mark_line(point=True).encode(
+                x=alt.X("월:O", title="월"), y=alt.Y("수량:Q", title="총 소모량"), tooltip=["월", "수량"]
+            ),
+            use_container_width=True
         )
-        st.altair_chart(chart2, use_container_width=True)
-        st.dataframe(recip_stats, use_container_width=True)
-
-    st.markdown("### 수령자 × 품목 (누적)")
-    pivot = mdf.groupby(["수령자", "품목"])["수량"].sum().reset_index()
-    chart3 = alt.Chart(pivot).mark_bar().encode(
-        x=alt.X("수령자:N", title="수령자"),
-        y=alt.Y("수량:Q", title="수량"),
-        color="품목:N",
-        tooltip=["수령자", "품목", "수량"]
-    )
-    st.altair_chart(chart3, use_container_width=True)
-
-# =========================================================
-# 3) 조회/다운로드
-# =========================================================
-elif menu == "📁 내역 조회/다운로드":
-    st.subheader("📁 내역 조회 · 다운로드")
-
-    df = read_logs()
-    if df.empty:
-        st.info("다운로드할 기록이 없습니다.")
-        st.stop()
-
-    df = df.dropna(subset=["시간"]).copy()
-
-    with st.expander("필터", expanded=True):
-        c1, c2, c3, c4 = st.columns([1, 1, 1, 1])
-
-        min_d = df["시간"].dt.date.min()
-        max_d = df["시간"].dt.date.max()
-
+        c1, c2 = st.columns(2)
         with c1:
-            start = st.date_input("시작일", value=min_d, min_value=min_d, max_value=max_d)
+            st.markdown("#### 품목별 합계")
+            st.dataframe(item_totals(cols), use_container_width=True, hide_index=True)
         with c2:
-            end = st.date_input("종료일", value=max_d, min_value=min_d, max_value=max_d)
+            st.markdown("#### 수령자별 합계")
+            st.dataframe(recipient_totals(cols), use_container_width=True, hide_index=True)
+        with st.expander("수령자 × 품목 합계"):
+            st.dataframe(
+                recipient_item_totals(cols).sort_values("수량", ascending=False),
+                use_container_width=True, hide_index=True
+            )
 
-        recipients_all = run("SELECT id, name FROM recipients ORDER BY name", fetch=True)
-        items_all = run("SELECT id, name FROM items ORDER BY name", fetch=True)
+    # =========================================================
+    # 4) 예측 · 발주
+    # =========================================================
+    elif menu == "📈 예측 · 발주":
+        import altair as alt
 
-        recip_names = ["(전체)"] + [n for _id, n in recipients_all]
-        item_names = ["(전체)"] + [n for _id, n in items_all]
+        st.subheader("📈 사용량 예측 · 발주 제안")
+        st.caption("• 최근 1년 지급 기록과 월별 집계(계절 지수)로 모든 품목을 한 번에 계산합니다. 기록이 바뀌면 다시 계산합니다.")
 
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            lead_days = st.number_input("조달 기간(일)", min_value=1, max_value=120, value=14, step=1, key="fc_lead")
+        with c2:
+            review_days = st.number_input("발주 주기(일)", min_value=1, max_value=180, value=30, step=1, key="fc_review")
         with c3:
-            recip_sel = st.selectbox("수령자", recip_names, key="dl_recip_sel")
-        with c4:
-            item_sel = st.selectbox("품목", item_names, key="dl_item_sel")
-
-    recip_id = None
-    item_id = None
-    if recip_sel != "(전체)":
-        recip_id = next((_id for _id, n in recipients_all if n == recip_sel), None)
-    if item_sel != "(전체)":
-        item_id = next((_id for _id, n in items_all if n == item_sel), None)
-
-    filtered = read_logs(start=start, end=end, recipient_id=recip_id, item_id=item_id)
-    filtered = filtered.dropna(subset=["시간"]).copy()
-
-    st.caption(f"조회 결과: {len(filtered)}건")
-    st.dataframe(filtered, use_container_width=True)
-
-    st.divider()
-    c1, c2 = st.columns(2)
-
-    with c1:
-        csv_bytes = filtered.to_csv(index=False).encode("utf-8-sig")
-        st.download_button(
-            "⬇️ CSV 다운로드",
-            data=csv_bytes,
-            file_name="소모품_지급내역.csv",
-            mime="text/csv",
-            key="dl_csv"
-        )
+            service = st.selectbox(
+                "서비스 수준", [0.90, 0.95, 0.99], index=1, format_func=lambda v: f"{v:.0%} (결품 없을 확률)", key="fc_service"
+            )
 
-    with c2:
-        buffer = BytesIO()
-        filtered.to_excel(buffer, index=False)
-        buffer.seek(0)
-        st.download_button(
-            "⬇️ Excel 다운로드",
-            data=buffer,
-            file_name="소모품_지급내역.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            key="dl_xlsx"
+        fc = forecast_items(int(lead_days), int(review_days), float(service))
+        if fc.empty:
+            st.error("활성 품목이 없습니다. 관리자 메뉴에서 품목을 등록/활성화하세요.")
+            st.stop()
+        m1, m2, m3 = st.columns(3)
+        m1.metric("지금 발주 필요", f"{(fc['상태'] == '발주 필요').sum()}종")
+        m2.metric(f"{int(lead_days) + int(review_days)}일 안에 소진", f"{(fc['상태'] == '다음 주기 발주').sum()}종")
+        m3.metric("계절 지수에 쓴 기간", f"{fc.attrs.get('season_months', 0)}개월")
+
+        only_action = st.checkbox("발주가 필요한 품목만", key="fc_only_action")
+        shown = fc[fc["상태"] != "여유"] if only_action else fc
+        st.dataframe(shown.drop(columns=["id"]), use_container_width=True, hide_index=True)
+
+        st.markdown("#### 품목별 추이")
+        fc_item = st.selectbox("품목", fc["품목"].tolist(), key="fc_item")
+        series = item_series(int(fc.loc[fc["품목"] == fc_item, "id"].iloc[0]))
+        long = series.melt("날짜", var_name="구분", value_name="수량").dropna()
+        st.altair_chart(
+            alt.Chart(long).mark_line().encode(
+                x=alt.X("날짜:T", title="날짜"),
+                y=alt.Y("수량:Q", title="하루 사용량"),
+                color=alt.Color("구분:N", sort=["사용량", "7일 평균", "28일 평균", "예측"]),
+                tooltip=["날짜:T", "구분", alt.Tooltip("수량:Q", format=".2f")],
+            ),
+            use_container_width=True
         )
 
-# =========================================================
-# 4) 관리자
-# =========================================================
-elif menu == "⚙️ 관리자":
-    st.subheader("⚙️ 관리자")
-
-    pw = st.text_input("관리자 비밀번호", type="password")
-    if pw != ADMIN_PASSWORD:
-        st.warning("관리자 비밀번호를 입력하세요.")
-        st.stop()
-
-    st.success("관리자 인증 완료")
-
-    tab1, tab2, tab3 = st.tabs(["수령자 관리", "품목 관리", "기록 관리(삭제)"])
-
-    # -------------------------
-    # 수령자 관리
-    # -------------------------
-    with tab1:
-        st.markdown("### 수령자 관리")
-        st.caption("• 비활성화하면 지급 입력 화면에서 선택되지 않습니다. (기록은 보존됨)")
-
-        all_r = get_all_recipients()
-        rdf = pd.DataFrame(all_r, columns=["id", "이름", "활성"])
-        rdf["활성"] = rdf["활성"].map(lambda x: "활성" if x == 1 else "비활성")
-        st.dataframe(rdf, use_container_width=True)
-
-        st.markdown("#### 수령자 추가 (여러 명 가능)")
-        new_names = st.text_area("한 줄에 한 명씩 입력", height=120, placeholder="예)\n홍길동\n김철수", key="recip_add_area")
-        if st.button("➕ 수령자 추가", key="recip_add_btn"):
-            add_recipients(new_names.splitlines())
-            st.success("추가 완료. (중복은 자동 무시)")
-            st.rerun()
-
-        st.divider()
-        st.markdown("#### 수령자 수정/삭제/활성 전환")
-
-        if not all_r:
-            st.info("수령자가 없습니다.")
-        else:
-            options = [(rid, name, active) for rid, name, active in all_r]
-            labels = [f"[{rid}] {name} ({'활성' if active == 1 else '비활성'})" for rid, name, active in options]
+        with st.expander("수령자별 사용 속도 (최근 91일)"):
+            st.dataframe(recipient_rates(), use_container_width=True, hide_index=True)
+
+    # =========================================================
+    # 5) 조회/다운로드
+    # =========================================================
+    elif menu == "📁 내역 조회/다운로드":
+        st.subheader("📁 내역 조회 · 다운로드")
+
+        if multi_site and st.checkbox("전체 사업장 함께 보기", key="dl_all_sites"):
+            site_range = log_date_range_sites()
+            if site_range is None:
+                st.info("다운로드할 기록이 없습니다.")
+                st.stop()
+            min_d, max_d = site_range
+            with st.expander("필터", expanded=True):
+                c1, c2, c3, c4 = st.columns([1, 1, 1, 1])
+                with c1:
+                    start = st.date_input("시작일", value=min_d, min_value=min_d, max_value=max_d, key="dl_sites_start")
+                with c2:
+                    end = st.date_input("종료일", value=max_d, min_value=min_d, max_value=max_d, key="dl_sites_end")
+                with c3:
+                    recip_sel = st.selectbox("수령자", ["(전체)"] + recipient_names(), key="dl_sites_recip")
+                with c4:
+                    item_sel = st.selectbox("품목", ["(전체)"] + item_names(), key="dl_sites_item")
+            filters = dict(
+                start=start, end=end,
+                recipient=None if recip_sel == "(전체)" else recip_sel,
+                item=None if item_sel == "(전체)" else item_sel,
+            )
 
-            sel_label = st.selectbox("대상 선택", labels, key="recip_select")
-            sel_idx = labels.index(sel_label)
-            sel_id, sel_name, sel_active = options[sel_idx]
+            counts = count_logs_sites(**filters)
+            st.caption("조회 결과: " + ", ".join(f"{name} {n:,}건" for name, n in counts.items()) + f" (합계 {sum(counts.values()):,}건)")
+            st.dataframe(read_logs_sites(limit=500, **filters), use_container_width=True)
+            st.caption("최근 500건만 표시합니다. 전체는 파일로 받으세요.")
 
-            c1, c2 = st.columns([2, 1])
+            st.divider()
+            c1, c2 = st.columns(2)
             with c1:
-                new_name = st.text_input("이름 수정", value=sel_name, key="recip_new_name")
+                export_button("csv", "CSV", "소모품_지급내역_전체사업장.csv", "text/csv", all_sites=True, **filters)
             with c2:
-                st.write("")
-                st.write(f"현재 상태: **{'활성' if sel_active == 1 else '비활성'}**")
-
-            b1, b2, b3, b4 = st.columns(4)
-
-            with b1:
-                if st.button("✏️ 이름 저장", key="recip_save_name"):
-                    try:
-                        update_recipient_name(int(sel_id), new_name)
-                        st.success("이름 수정 완료")
-                        st.rerun()
-                    except sqlite3.IntegrityError:
-                        st.error("같은 이름이 이미 존재합니다. (중복 불가)")
-                    except Exception as e:
-                        st.error(str(e))
-
-            with b2:
-                if sel_active == 1:
-                    if st.button("🚫 비활성화", key="recip_deact_btn"):
-                        deactivate_recipient(int(sel_id))
-                        st.success("비활성화 완료")
-                        st.rerun()
-                else:
-                    if st.button("✅ 활성화", key="recip_act_btn"):
-                        activate_recipient(int(sel_id))
-                        st.success("활성화 완료")
-                        st.rerun()
-
-            with b3:
-                if st.button("🗑️ 완전 삭제", key="recip_hard_delete"):
-                    try:
-                        hard_delete_recipient(int(sel_id))
-                        st.success("완전 삭제 완료")
-                        st.rerun()
-                    except Exception as e:
-                        st.error(str(e))
-
-            with b4:
-                st.caption("※ 기록이 연결된 수령자는\n완전 삭제가 막힙니다.\n(비활성화 권장)")
-
-    # -------------------------
-    # 품목 관리
-    # -------------------------
-    with tab2:
-        st.markdown("### 품목 관리")
-        st.caption("• 비활성화하면 지급 입력 화면에서 선택되지 않습니다. (기록은 보존됨)")
-
-        all_i = get_all_items()
-        idf = pd.DataFrame(all_i, columns=["id", "품목명", "활성"])
-        idf["활성"] = idf["활성"].map(lambda x: "활성" if x == 1 else "비활성")
-        st.dataframe(idf, use_container_width=True)
-
-        st.markdown("#### 품목 추가 (여러 개 가능)")
-        new_items = st.text_area("한 줄에 한 품목씩 입력", height=120, placeholder="예)\n탈취제\n방향제", key="item_add_area")
-        if st.button("➕ 품목 추가", key="item_add_btn"):
-            add_items(new_items.splitlines())
-            st.success("추가 완료. (중복은 자동 무시)")
-            st.rerun()
+                export_button(
+                    "xlsx", "Excel", "소모품_지급내역_전체사업장.xlsx",
+                    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", all_sites=True, **filters
+                )
+            st.stop()
 
-        st.divider()
-        st.markdown("#### 품목 수정/삭제/활성 전환")
+        date_range = get_log_date_range()
+        if date_range is None:
+            st.info("다운로드할 기록이 없습니다.")
+            st.stop()
 
-        if not all_i:
-            st.info("품목이 없습니다.")
-        else:
-            options = [(iid, name, active) for iid, name, active in all_i]
-            labels = [f"[{iid}] {name} ({'활성' if active == 1 else '비활성'})" for iid, name, active in options]
+        with st.expander("필터", expanded=True):
+            c1, c2, c3, c4 = st.columns([1, 1, 1, 1])
 
-            sel_label = st.selectbox("대상 선택", labels, key="item_select")
-            sel_idx = labels.index(sel_label)
-            sel_id, sel_name, sel_active = options[sel_idx]
+            min_d, max_d = date_range
 
-            c1, c2 = st.columns([2, 1])
             with c1:
-                new_name = st.text_input("품목명 수정", value=sel_name, key="item_new_name")
+                start = st.date_input("시작일", value=min_d, min_value=min_d, max_value=max_d)
             with c2:
-                st.write("")
-                st.write(f"현재 상태: **{'활성' if sel_active == 1 else '비활성'}**")
+                end = st.date_input("종료일", value=max_d, min_value=min_d, max_value=max_d)
+
+            recipients_all = get_all_recipients()
+            items_all = get_all_items()
+
+            recip_names = ["(전체)"] + [n for _id, n, _a in recipients_all]
+            item_names = ["(전체)"] + [n for _id, n, _a in items_all]
+
+            with c3:
+                recip_sel = st.selectbox("수령자", recip_names, key="dl_recip_sel")
+            with c4:
+                item_sel = st.selectbox("품목", item_names, key="dl_item_sel")
+
+        recip_id = None
+        item_id = None
+        if recip_sel != "(전체)":
+            recip_id = next((_id for _id, n, _a in recipients_all if n == recip_sel), None)
+        if item_sel != "(전체)":
+            item_id = next((_id for _id, n, _a in items_all if n == item_sel), None)
+
+        filters = dict(start=start, end=end, recipient_id=recip_id, item_id=item_id)
+
+        note_query = st.text_input("비고 검색", key="dl_note_query", placeholder="예: 대청소 3층 (띄어 쓴 낱말을 모두 포함)").strip()
+        if note_query:
+            # 검색어가 있으면 최근 500건만 (다운로드는 기존 필터 기준 그대로)
+            found = search_logs(note_query, limit=500, **filters)
+            st.caption(f"비고 검색 결과: {len(found)}건" + (" (최근 500건)" if len(found) >= 500 else ""))
+            st.dataframe(found, use_container_width=True)
+        else:
+            st.caption(f"조회 결과: {count_logs(**filters)}건")
+            page = log_pager("dl_pages", 100, **filters)
+            st.dataframe(page, use_container_width=True)
 
-            b1, b2, b3, b4 = st.columns(4)
+        st.divider()
+        c1, c2 = st.columns(2)
 
-            with b1:
-                if st.button("✏️ 품목명 저장", key="item_save_name"):
-                    try:
-                        update_item_name(int(sel_id), new_name)
-                        st.success("품목명 수정 완료")
-                        st.rerun()
-                    except sqlite3.IntegrityError:
-                        st.error("같은 품목명이 이미 존재합니다. (중복 불가)")
-                    except Exception as e:
-                        st.error(str(e))
+        with c1:
+            export_button("csv", "CSV", "소모품_지급내역.csv", "text/csv", **filters)
 
-            with b2:
-                if sel_active == 1:
-                    if st.button("🚫 비활성화", key="item_deact_btn"):
-                        deactivate_item(int(sel_id))
-                        st.success("비활성화 완료")
-                        st.rerun()
-                else:
-                    if st.button("✅ 활성화", key="item_act_btn"):
-                        activate_item(int(sel_id))
-                        st.success("활성화 완료")
-                        st.rerun()
+        with c2:
+            export_button(
+                "xlsx", "Excel", "소모품_지급내역.xlsx",
+                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", **filters
+            )
 
-            with b3:
-                if st.button("🗑️ 완전 삭제", key="item_hard_delete"):
+    # =========================================================
+    # 6) 관리자
+    # =========================================================
+    elif menu == "⚙️ 관리자":
+        st.subheader("⚙️ 관리자")
+
+        pw = st.text_input("관리자 비밀번호", type="password")
+        if pw != ADMIN_PASSWORD:
+            st.warning("관리자 비밀번호를 입력하세요.")
+            st.stop()
+
+        st.success("관리자 인증 완료")
+        flash = st.session_state.pop("admin_flash", None)
+        if flash:
+            st.success(flash)
+
+        tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["수령자 관리", "품목 관리", "기록 관리(삭제)", "유지보수", "성능", "가져오기"])
+
+        # -------------------------
+        # 수령자 관리
+        # -------------------------
+        with tab1:
+            st.markdown("### 수령자 관리")
+            st.caption("• 비활성화하면 지급 입력 화면에서 선택되지 않습니다. (기록은 보존됨)")
+
+            st.markdown("#### 수령자 추가 (여러 명 가능)")
+            new_names = st.text_area("한 줄에 한 명씩 입력", height=120, placeholder="예)\n홍길동\n김철수", key="recip_add_area")
+            if st.button("➕ 수령자 추가", key="recip_add_btn"):
+                add_recipients(new_names.splitlines())
+                admin_done("추가 완료. (중복은 자동 무시)", "recip_editor")
+
+            st.divider()
+            st.markdown("#### 수령자 수정/삭제/활성 전환")
+            all_r = get_all_recipients()
+            if not all_r:
+                st.info("수령자가 없습니다.")
+            else:
+                names_admin("recipients", "수령자", all_r, "recip")
+
+        # -------------------------
+        # 품목 관리
+        # -------------------------
+        with tab2:
+            st.markdown("### 품목 관리")
+            st.caption("• 비활성화하면 지급 입력 화면에서 선택되지 않습니다. (기록은 보존됨)")
+
+            st.markdown("#### 품목 추가 (여러 개 가능)")
+            new_items = st.text_area("한 줄에 한 품목씩 입력", height=120, placeholder="예)\n탈취제\n방향제", key="item_add_area")
+            if st.button("➕ 품목 추가", key="item_add_btn"):
+                add_items(new_items.splitlines())
+                admin_done("추가 완료. (중복은 자동 무시)", "item_editor")
+
+            st.divider()
+            st.markdown("#### 품목 수정/삭제/활성 전환")
+            all_i = get_all_items()
+            if not all_i:
+                st.info("품목이 없습니다.")
+            else:
+                names_admin("items", "품목", all_i, "item")
+
+        # -------------------------
+        # 기록 관리(삭제)
+        # -------------------------
+        with tab3:
+            st.markdown("### 기록 관리(삭제)")
+            st.caption("• 삭제한 기록은 아래 '작업 기록' 에서 되돌릴 수 있습니다. (실무에서는 가급적 삭제 대신 비고/정정 기록을 권장)")
+
+            df = log_pager("admin_log_pages", 200)
+            if df.empty:
+                st.info("삭제할 기록이 없습니다.")
+            else:
+                # 페이지마다 따로 (체크 상태는 행 위치 기준이라 다른 페이지로 옮겨 가면 안 됨)
+                log_editor_key = f"log_del_editor_{int(df['id'].iloc[0])}"
+                edited = st.data_editor(
+                    df.assign(선택=False)[["선택"] + LOG_COLUMNS], key=log_editor_key,
+                    use_container_width=True, hide_index=True, disabled=LOG_COLUMNS,
+                )
+                selected = edited.loc[edited["선택"], "id"].astype(int).tolist()
+                if st.button(f"🗑️ 선택 기록 {len(selected)}건 삭제", key="log_del_btn", disabled=not selected):
+                    n = delete_logs(selected)
+                    admin_done(f"기록 {n}건 삭제 완료", log_editor_key)
+
+            with st.expander("조건으로 한꺼번에 삭제 (기간 · 수령자 · 품목)"):
+                main_range = get_log_date_range()
+                last_day = main_range[1] if main_range else datetime.now().date()
+                c1, c2, c3, c4 = st.columns(4)
+                with c1:
+                    del_start = st.date_input("시작일", value=last_day, key="range_del_start")
+                with c2:
+                    del_end = st.date_input("종료일", value=last_day, key="range_del_end")
+                recipients_all = get_all_recipients()
+                items_all = get_all_items()
+                with c3:
+                    del_recip = st.selectbox("수령자", ["(전체)"] + [n for _id, n, _a in recipients_all], key="range_del_recip")
+                with c4:
+                    del_item = st.selectbox("품목", ["(전체)"] + [n for _id, n, _a in items_all], key="range_del_item")
+                del_filters = dict(
+                    start=del_start, end=del_end,
+                    recipient_id=next((_id for _id, n, _a in recipients_all if n == del_recip), None),
+                    item_id=next((_id for _id, n, _a in items_all if n == del_item), None),
+                )
+                n_target = count_deletable_logs(**del_filters)
+                st.write(f"삭제 대상: **{n_target:,}건** (보관 파일로 옮긴 연도 기록은 제외)")
+                confirm = st.checkbox("위 조건의 기록을 모두 삭제합니다.", key="range_del_confirm")
+                if st.button("🗑️ 조건 삭제", key="range_del_btn", disabled=not (confirm and n_target)):
                     try:
-                        hard_delete_item(int(sel_id))
-                        st.success("완전 삭제 완료")
-                        st.rerun()
-                    except Exception as e:
+                        n = delete_logs_where(**del_filters)
+                        admin_done(f"기록 {n:,}건 삭제 완료", "range_del_confirm")
+                    except ValueError as e:
                         st.error(str(e))
 
-            with b4:
-                st.caption("※ 기록이 연결된 품목은\n완전 삭제가 막힙니다.\n(비활성화 권장)")
-
-    # -------------------------
-    # 기록 관리(삭제)
-    # -------------------------
-    with tab3:
-        st.markdown("### 기록 관리(삭제)")
-        st.caption("• 삭제는 되돌릴 수 없습니다. (실무에서는 가급적 삭제 대신 비고/정정 기록을 권장)")
-
-        df = read_logs()
-        if df.empty:
-            st.info("삭제할 기록이 없습니다.")
-        else:
-            st.dataframe(df.head(200), use_container_width=True)
-            del_id = st.number_input("삭제할 기록 id", min_value=1, step=1, key="log_del_id")
-            if st.button("🗑️ 선택 기록 삭제", key="log_del_btn"):
-                delete_log(int(del_id))
-                st.success("삭제 완료")
-                st.rerun()
+            st.divider()
+            st.markdown("#### 작업 기록 · 되돌리기")
+            st.caption(f"• 관리자 일괄 작업은 최근 {JOURNAL_KEEP}건까지 되돌릴 수 있습니다. (작업 전 값을 그대로 복원)")
+            journal = get_journal()
+            if journal.empty:
+                st.info("기록된 작업이 없습니다.")
+            else:
+                st.dataframe(journal, use_container_width=True, hide_index=True)
+                pending = journal[journal["되돌림"] == ""]
+                if not pending.empty:
+                    undo_labels = {f"[{r.id}] {r.시각} {r.작업}": int(r.id) for r in pending.itertuples()}
+                    undo_sel = st.selectbox("되돌릴 작업", list(undo_labels), key="undo_select")
+                    if st.button("↩️ 되돌리기", key="undo_btn"):
+                        try:
+                            n = undo(undo_labels[undo_sel])
+                            admin_done(f"되돌리기 완료 ({n:,}건)", "recip_editor", "item_editor")
+                        except ValueError as e:
+                            st.error(str(e))
+
+        # -------------------------
+        # 유지보수
+        # -------------------------
+        with tab4:
+            st.markdown("### 유지보수")
+            st.caption("• 통계 화면과 현재고는 집계 테이블을 읽습니다. 숫자가 맞지 않으면 다시 계산하세요.")
+            if st.button("🔄 월별 집계 다시 계산", key="rollup_rebuild_btn"):
+                rebuild_rollups()
+                st.success("월별 집계 재계산 완료")
+            if st.button("🔄 현재고 다시 계산", key="balance_rebuild_btn"):
+                rebuild_item_balances()
+                st.success("현재고 재계산 완료")
+            if fts_available() and st.button("🔎 비고 검색 색인 다시 만들기", key="note_index_rebuild_btn"):
+                rebuild_note_index()
+                st.success("비고 검색 색인 재생성 완료")
+
+            if multi_site:
+                st.divider()
+                st.markdown("#### 사업장 품목 이름 맞추기")
+                st.caption("• 사업장마다 다르게 부르는 품목을 같은 '통합 이름' 으로 적으면 합산 통계 · 내역에서 한 품목으로 봅니다.")
+                edited = st.data_editor(
+                    site_items(), key="item_alias_editor", use_container_width=True, hide_index=True,
+                    disabled=["사업장", "품목"],
+                )
+                if st.button("💾 이름 대응 저장", key="item_alias_save_btn"):
+                    set_item_aliases(dict(zip(edited["품목"], edited["통합 이름"])))
+                    st.success("저장했습니다.")
+                    st.rerun()
+
+            st.divider()
+            st.markdown("#### 연도별 보관")
+            st.caption("• 지난 연도 기록을 별도 파일로 옮겨 장부 DB 를 작게 유지합니다. 조회/다운로드에는 그대로 나옵니다.")
+            archives = get_archives()
+            if archives:
+                st.dataframe(
+                    pd.DataFrame(archives, columns=["연도", "파일", "행 수", "처음", "마지막", "보관 시각"]),
+                    use_container_width=True, hide_index=True
+                )
+            years = archivable_years()
+            if not years:
+                st.info("보관할 지난 연도 기록이 없습니다.")
+            else:
+                arch_year = st.selectbox("보관할 연도", years, key="archive_year")
+                if st.button("📦 보관 파일로 옮기기", key="archive_btn"):
+                    res = archive_year(arch_year)
+                    st.success(f"{res['year']}년 기록 {res['moved']:,}건을 보관했습니다. (보관 파일 {res['rows']:,}건)")
+                    st.rerun()
+
+            st.divider()
+            st.markdown("#### Google Sheets 동기화")
+            if sync_worker is None:
+                st.info("동기화가 꺼져 있습니다. (INVENTORY_SHEET_KEY / INVENTORY_SHEET_CREDENTIALS 환경변수로 설정)")
+            else:
+                st.write(f"보낼 변경: **{pending_changes():,}건**, 연속 실패: {sync_worker.failures}회")
+                if sync_worker.last_error:
+                    st.warning(f"마지막 오류: {sync_worker.last_error}")
+                if st.button("🔁 지금 동기화", key="sync_now_btn"):
+                    sync_worker.nudge()
+                    st.success("동기화를 요청했습니다. (백그라운드에서 진행)")
+
+            st.divider()
+            st.markdown("#### DB 정리")
+            st.metric("정리로 돌려받을 수 있는 공간", f"{db_free_bytes() / 1024 / 1024:.1f} MB")
+            c1, c2 = st.columns(2)
+            with c1:
+                if st.button("🧹 VACUUM (빈 공간 정리)", key="vacuum_btn"):
+                    vacuum_db()
+                    st.success("VACUUM 완료")
+            with c2:
+                if st.button("📈 ANALYZE (통계 갱신)", key="analyze_btn"):
+                    analyze_db()
+                    st.success("ANALYZE 완료")
+
+        # -------------------------
+        # 성능
+        # -------------------------
+        with tab5:
+            st.markdown("### 성능")
+            st.caption("• 이 서버 프로세스가 시작된 뒤 최근 실행 기록입니다. (재시작하면 초기화)")
+            monitor = get_monitor()
+
+            cols = st.columns(3)
+            for col, (name, size) in zip(cols, db_size().items()):
+                col.metric(name, f"{size / 1024 / 1024:.1f} MB")
+
+            st.markdown("#### 쓰기 스레드 (그룹 커밋)")
+            cols = st.columns(5)
+            for col, (name, value) in zip(cols, get_writer().stats().items()):
+                col.metric(name, f"{value:,.1f}" if isinstance(value, float) else f"{value:,}")
+
+            st.markdown("#### 화면별 렌더 시간")
+            st.dataframe(monitor.page_summary(), use_container_width=True)
+
+            st.markdown("#### 쿼리별 실행 시간")
+            st.caption(f"• '전체 스캔' 은 {monitor.slow_ms:.0f}ms 이상 걸린 실행의 실행계획에 SCAN 이 있는 경우입니다.")
+            st.dataframe(monitor.query_summary(), use_container_width=True)
+
+            st.markdown("#### 가장 느린 쿼리")
+            st.dataframe(monitor.slowest_queries(), use_container_width=True)
+
+            c1, c2 = st.columns(2)
+            with c1:
+                monitor.persist = st.checkbox(
+                    f"perf_log 에도 저장 ({monitor.log_path().name})", value=monitor.persist, key="perf_persist"
+                )
+            with c2:
+                if st.button("🧹 기록 비우기", key="perf_clear_btn"):
+                    monitor.clear()
+                    st.rerun()
+
+        # -------------------------
+        # 가져오기 (예전 장부)
+        # -------------------------
+        with tab6:
+            st.markdown("### 예전 장부 가져오기 (CSV / Excel)")
+            st.caption("• 머리글: 시간, 수령자, 품목, 수량, 비고 (내역 다운로드 파일 형식 그대로 가능)")
+            st.caption("• 먼저 '미리 검사' 로 오류와 새 이름을 확인한 뒤 가져오세요.")
+            upload = st.file_uploader("파일 선택", type=["csv", "xlsx"], key="import_file")
+            create_missing = st.checkbox("없는 수령자/품목은 새로 등록", key="import_create_missing")
+
+            if upload is not None:
+                c1, c2 = st.columns(2)
+                with c1:
+                    dry = st.button("🔍 미리 검사", key="import_dry_btn")
+                with c2:
+                    real = st.button("📥 가져오기", key="import_btn")
+                if dry or real:
+                    # 업로드 내용을 임시 파일로 옮겨 두고 한 줄씩 읽음
+                    suffix = Path(upload.name).suffix.lower()
+                    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+                        shutil.copyfileobj(upload, tmp)
+                    try:
+                        with st.spinner("읽는 중..."):
+                            report = import_logs(Path(tmp.name), dry_run=dry, create_missing=create_missing)
+                    finally:
+                        Path(tmp.name).unlink(missing_ok=True)
+                    (st.info if dry else st.success)(report.summary().splitlines()[0])
+                    st.text(report.summary())
+                    if report.errors:
+                        st.dataframe(
+                            pd.DataFrame(report.errors, columns=["시트/파일", "줄", "오류"]),
+                            use_container_width=True, hide_index=True
+                        )
+finally:
+    # 화면 렌더 시간 기록 (중간에 끝난 실행 포함)
+    page_timer.stop()
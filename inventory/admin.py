@@ -0,0 +1,284 @@
+"""관리자 일괄 작업 (여러 건을 한 트랜잭션으로) + 되돌리기 기록.
+
+선택한 id 목록은 JSON 배열 하나로 넘겨 json_each 로 풀어 쓰므로 몇 건이든 쿼리 수가 같고,
+완전 삭제 전 참조 확인도 id 마다 세지 않고 EXISTS 쿼리 한 번으로 끝냅니다.
+작업마다 바뀌기 전 행을 admin_journal_* 에 복사해 두므로 undo(작업 id) 로 되돌릴 수 있습니다.
+"""
+import json
+import sqlite3
+from datetime import date, datetime
+from typing import Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from .db import ANALYZE_THRESHOLD, HAS_UPDATE_FROM, analyze_db, archive_alias, archive_attach, archive_years, cached_query, run, run_many, transaction
+from .queries import _log_filters
+from .writer import queued_write
+
+NAME_TABLES = {"recipients": "수령자", "items": "품목"}
+JOURNAL_KEEP = 100  # 되돌리기 기록을 남겨 두는 최근 작업 수
+
+# id 목록(JSON 배열) -> IN 조건
+_IN_IDS = "IN (SELECT value FROM json_each(?))"
+
+def _ids_json(ids: Iterable[int]) -> str:
+    return json.dumps(sorted({int(i) for i in ids}))
+
+def _check_table(table: str):
+    if table not in NAME_TABLES:
+        raise ValueError(f"알 수 없는 명단: {table}")
+
+def _changes() -> int:
+    return run("SELECT changes()", fetch=True)[0][0]
+
+def _analyze_if_large(n: int):
+    # 대량 삭제/복원 뒤에는 플래너 통계를 갱신 (insert_logs_bulk, archive_year 와 같은 기준)
+    if n >= ANALYZE_THRESHOLD:
+        analyze_db()
+
+def _archive_attach_all(*_args, **_kwargs):
+    return archive_attach(archive_years())
+
+def _apply_names(table: str, journal_id: int, source: str, params: tuple) -> int:
+    # journal_id 에 담긴 행을 source (id, name, active) 의 값으로 바꿈.
+    # UNIQUE 는 행마다 검사되므로 이름 맞바꾸기(A<->B)는 먼저 임시 이름(char(1) || id)으로 비운 뒤 넣음
+    staged = "SELECT id FROM admin_journal_names WHERE journal_id = ?"
+    run(f"UPDATE {table} SET name = char(1) || id WHERE id IN ({staged})", (journal_id,))
+    n = _changes()
+    if HAS_UPDATE_FROM:
+        run(f"""
+            UPDATE {table} SET name = c.name, active = c.active
+            FROM ({source}) c WHERE c.id = {table}.id AND c.id IN ({staged})
+        """, (*params, journal_id))
+    else:
+        rows = run(f"SELECT c.name, c.active, c.id FROM ({source}) c WHERE c.id IN ({staged})", (*params, journal_id), fetch=True)
+        run_many(f"UPDATE {table} SET name = ?, active = ? WHERE id = ?", rows)
+    return n
+
+# =========================================================
+# 되돌리기 기록
+# =========================================================
+def _journal(action: str, target: str) -> int:
+    # transaction() 안에서. 요약/건수는 작업이 끝난 뒤 _finish 에서 채움
+    run(
+        "INSERT INTO admin_journal(ts, action, target, summary, rows) VALUES (?, ?, ?, '', 0)",
+        (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), action, target),
+    )
+    return run("SELECT last_insert_rowid()", fetch=True)[0][0]
+
+def _finish(journal_id: int, summary: str, n: int):
+    if n == 0:
+        # 바뀐 것이 없으면 기록도 남기지 않음
+        run("DELETE FROM admin_journal WHERE id=?", (journal_id,))
+        return
+    run("UPDATE admin_journal SET summary=?, rows=? WHERE id=?", (summary, n, journal_id))
+    oldest = journal_id - JOURNAL_KEEP
+    run("DELETE FROM admin_journal_logs WHERE journal_id <= ?", (oldest,))
+    run("DELETE FROM admin_journal_names WHERE journal_id <= ?", (oldest,))
+    run("DELETE FROM admin_journal WHERE id <= ?", (oldest,))
+
+@cached_query
+def get_journal(limit: int = 50) -> pd.DataFrame:
+    rows = run("""
+        SELECT id, ts, summary, rows, COALESCE(undone_at, '')
+        FROM admin_journal ORDER BY id DESC LIMIT ?
+    """, (int(limit),), fetch=True)
+    return pd.DataFrame(rows, columns=["id", "시각", "작업", "건수", "되돌림"])
+
+@queued_write
+def undo(journal_id: int) -> int:
+    # 작업 하나를 한 트랜잭션으로 되돌림. 같은 대상의 나중 작업이 남아 있거나,
+    # 그 뒤에 지워진 수령자/품목 · 겹치는 이름이 있으면 거절
+    try:
+        with transaction():
+            row = run("SELECT action, target, undone_at FROM admin_journal WHERE id=?", (journal_id,), fetch=True)
+            if not row:
+                raise ValueError("되돌리기 기록이 없습니다. (오래된 작업은 정리됨)")
+            action, target, undone_at = row[0]
+            if undone_at:
+                raise ValueError("이미 되돌린 작업입니다.")
+            # 같은 대상의 나중 작업을 덮어쓰지 않도록 최근 것부터 차례로
+            later = run(
+                "SELECT 1 FROM admin_journal WHERE id > ? AND target = ? AND undone_at IS NULL LIMIT 1",
+                (journal_id, target), fetch=True,
+            )
+            if later:
+                raise ValueError("같은 대상에 더 나중 작업이 있습니다. 나중 작업부터 되돌리세요.")
+            if action == "delete_logs":
+                # AUTOINCREMENT 라 지운 id 는 다시 쓰이지 않음 -> 같은 id 로 복원 (집계 · 현재고 · 색인은 트리거가)
+                run("""
+                    INSERT INTO logs(id, ts, recipient_id, item_id, qty, note)
+                    SELECT id, ts, recipient_id, item_id, qty, note FROM admin_journal_logs
+                    WHERE journal_id = ? AND id NOT IN (SELECT id FROM logs)
+                """, (journal_id,))
+                n = _changes()
+                _analyze_if_large(n)
+            elif action == "update_names":
+                _check_table(target)
+                n = _apply_names(
+                    target, journal_id, "SELECT id, name, active FROM admin_journal_names WHERE journal_id = ?", (journal_id,)
+                )
+            elif action == "delete_names":
+                _check_table(target)
+                run(f"INSERT INTO {target}(id, name, active) SELECT id, name, active FROM admin_journal_names WHERE journal_id = ?", (journal_id,))
+                n = _changes()
+                if target == "items":
+                    run("""
+                        INSERT INTO item_balances(item_id, min_qty)
+                        SELECT id, min_qty FROM admin_journal_names WHERE journal_id = ? AND min_qty IS NOT NULL
+                        ON CONFLICT(item_id) DO UPDATE SET min_qty = excluded.min_qty
+                    """, (journal_id,))
+            else:
+                raise ValueError(f"되돌릴 수 없는 작업: {action}")
+            run("UPDATE admin_journal SET undone_at=? WHERE id=?", (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), journal_id))
+    except sqlite3.IntegrityError:
+        raise ValueError("되돌릴 수 없습니다. 그 뒤에 관련 수령자/품목이 삭제되었거나 같은 이름이 이미 있습니다.") from None
+    return n
+
+# =========================================================
+# 지급 기록 일괄 삭제
+# =========================================================
+_JOURNAL_LOGS_INSERT = """
+    INSERT INTO admin_journal_logs(journal_id, id, ts, recipient_id, item_id, qty, note)
+    SELECT ?, l.id, l.ts, l.recipient_id, l.item_id, l.qty, l.note FROM logs l {where}
+"""
+
+@queued_write
+def delete_logs(ids: List[int]) -> int:
+    # 선택한 기록을 한 번에 삭제 (보관 DB 로 옮겨진 닫힌 연도 기록은 대상 아님)
+    ids_json = _ids_json(ids)
+    with transaction():
+        journal_id = _journal("delete_logs", "logs")
+        run(_JOURNAL_LOGS_INSERT.format(where=f"WHERE l.id {_IN_IDS}"), (journal_id, ids_json))
+        run(f"DELETE FROM logs WHERE id {_IN_IDS}", (ids_json,))
+        n = _changes()
+        _finish(journal_id, f"지급 기록 {n:,}건 삭제", n)
+    _analyze_if_large(n)
+    return n
+
+def _describe_filters(start, end, recipient_id, item_id) -> str:
+    parts = []
+    if start or end:
+        parts.append(f"{start or ''} ~ {end or ''}")
+    for table, value in (("recipients", recipient_id), ("items", item_id)):
+        if value:
+            row = run(f"SELECT name FROM {table} WHERE id=?", (value,), fetch=True)
+            parts.append(row[0][0] if row else f"#{value}")
+    return ", ".join(parts)
+
+def count_deletable_logs(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    recipient_id: Optional[int] = None,
+    item_id: Optional[int] = None,
+) -> int:
+    # delete_logs_where 미리보기: 장부 DB 에 남은 기록만 셈
+    where_sql, params = _log_filters(start, end, recipient_id, item_id)
+    return run(f"SELECT COUNT(*) FROM logs l {where_sql}", tuple(params), fetch=True)[0][0]
+
+@queued_write
+def delete_logs_where(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    recipient_id: Optional[int] = None,
+    item_id: Optional[int] = None,
+) -> int:
+    # 기간 · 수령자 · 품목 조건에 맞는 기록을 한 번에 삭제 (조건 없는 전체 삭제는 막음)
+    if not any([start, end, recipient_id, item_id]):
+        raise ValueError("삭제 조건(기간 · 수령자 · 품목)을 하나 이상 지정하세요.")
+    where_sql, params = _log_filters(start, end, recipient_id, item_id)
+    with transaction():
+        journal_id = _journal("delete_logs", "logs")
+        run(_JOURNAL_LOGS_INSERT.format(where=where_sql), (journal_id, *params))
+        # 방금 복사한 id 목록(기본 키 앞부분)으로 지움 -> 조건을 두 번 평가하지 않음
+        run("DELETE FROM logs WHERE id IN (SELECT id FROM admin_journal_logs WHERE journal_id = ?)", (journal_id,))
+        n = _changes()
+        _finish(journal_id, f"지급 기록 {n:,}건 삭제 ({_describe_filters(start, end, recipient_id, item_id)})", n)
+    _analyze_if_large(n)
+    return n
+
+# =========================================================
+# 수령자 / 품목 일괄 수정 · 활성 전환 · 완전 삭제
+# =========================================================
+# JSON [[id, 이름, 활성], ...] -> 행
+_NAME_ROWS = """
+    SELECT json_extract(value, '$[0]') AS id, json_extract(value, '$[1]') AS name, json_extract(value, '$[2]') AS active
+    FROM json_each(?)
+"""
+
+def _update_names(table: str, rows_json: str) -> int:
+    journal_id = _journal("update_names", table)
+    changed = f"c.id = {table}.id AND ({table}.name != c.name OR {table}.active != c.active)"
+    run(f"""
+        INSERT INTO admin_journal_names(journal_id, id, name, active)
+        SELECT ?, {table}.id, {table}.name, {table}.active FROM {table} JOIN ({_NAME_ROWS}) c ON {changed}
+    """, (journal_id, rows_json))
+    n = _apply_names(table, journal_id, _NAME_ROWS, (rows_json,))
+    _finish(journal_id, f"{NAME_TABLES[table]} {n:,}건 수정", n)
+    return n
+
+@queued_write
+def update_names(table: str, rows: List[Tuple[int, str, bool]]) -> int:
+    # 편집 표의 (id, 이름, 활성) 을 한 번에 반영. 달라진 행만 바뀌고 기록됨
+    _check_table(table)
+    cleaned = []
+    for rid, name, active in rows:
+        name = (name or "").strip()
+        if not name:
+            raise ValueError(f"{NAME_TABLES[table]} 이름이 비어 있습니다. (id {rid})")
+        cleaned.append([int(rid), name, int(bool(active))])
+    with transaction():
+        return _update_names(table, json.dumps(cleaned, ensure_ascii=False))
+
+@queued_write
+def set_active(table: str, ids: List[int], active: bool) -> int:
+    # 선택한 수령자/품목을 한 번에 활성/비활성 (이름은 그대로)
+    _check_table(table)
+    with transaction():
+        rows = run(f"SELECT id, name FROM {table} WHERE id {_IN_IDS}", (_ids_json(ids),), fetch=True)
+        return _update_names(table, json.dumps([[rid, name, int(active)] for rid, name in rows], ensure_ascii=False))
+
+def referenced_names(table: str, ids: List[int]) -> List[str]:
+    # 기록이 연결된 수령자/품목 이름 (보관 DB 포함, 품목은 입고/조정도). id 마다가 아니라 쿼리 한 번
+    _check_table(table)
+    column = "recipient_id" if table == "recipients" else "item_id"
+    years = archive_years()
+    sources = ["main.logs"] + [f"{archive_alias(y)}.logs" for y in years]
+    if table == "items":
+        sources += ["main.receipts", "main.stock_adjustments"]
+    exists = " OR ".join(f"EXISTS(SELECT 1 FROM {src} WHERE {column} = x.id)" for src in sources)
+    rows = run(
+        f"SELECT x.name FROM {table} x WHERE x.id {_IN_IDS} AND ({exists}) ORDER BY x.name",
+        (_ids_json(ids),), fetch=True, attach=archive_attach(years),
+    )
+    return [name for (name,) in rows]
+
+@queued_write(attach=_archive_attach_all)
+def hard_delete_names(table: str, ids: List[int]) -> int:
+    # 선택한 수령자/품목을 완전 삭제. 하나라도 기록이 연결돼 있으면 아무것도 지우지 않음
+    _check_table(table)
+    ids_json = _ids_json(ids)
+    with transaction(attach=archive_attach(archive_years())):
+        blocked = referenced_names(table, ids)
+        if blocked:
+            shown = ", ".join(blocked[:5]) + (f" 외 {len(blocked) - 5}" if len(blocked) > 5 else "")
+            kinds = "지급/입고/조정" if table == "items" else "지급"
+            raise ValueError(f"{kinds} 기록이 연결되어 있어 완전 삭제할 수 없습니다: {shown}. 비활성화를 사용하세요.")
+        journal_id = _journal("delete_names", table)
+        if table == "items":
+            run(f"""
+                INSERT INTO admin_journal_names(journal_id, id, name, active, min_qty)
+                SELECT ?, i.id, i.name, i.active, b.min_qty
+                FROM items i LEFT JOIN item_balances b ON b.item_id = i.id
+                WHERE i.id {_IN_IDS}
+            """, (journal_id, ids_json))
+            run(f"DELETE FROM item_balances WHERE item_id {_IN_IDS}", (ids_json,))
+        else:
+            run(f"""
+                INSERT INTO admin_journal_names(journal_id, id, name, active)
+                SELECT ?, id, name, active FROM recipients WHERE id {_IN_IDS}
+            """, (journal_id, ids_json))
+        run(f"DELETE FROM {table} WHERE id {_IN_IDS}", (ids_json,))
+        n = _changes()
+        _finish(journal_id, f"{NAME_TABLES[table]} {n:,}건 완전 삭제", n)
+    return n
@@ -0,0 +1,122 @@
+"""기간 분석용 열 단위(정수 코드) 지급 기록.
+
+read_logs 는 화면 표시용으로 이름/비고 문자열을 행마다 들고 있어 몇 년치를 집계하기엔 무겁습니다.
+여기서는 (ts, recipient_id, item_id, qty) 만 NumPy 배열로 읽고 id 로 bincount 한 뒤,
+이름은 결과 표를 만들 때만 붙입니다.
+"""
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from .db import cached_query, iter_rows
+from .queries import _log_source, get_all_items, get_all_recipients
+
+@dataclass(frozen=True)
+class LogColumns:
+    ts: np.ndarray            # int64, 장부의 ts 그대로 (장부 시각을 UTC 로 본 epoch 초)
+    recipient_id: np.ndarray  # int32
+    item_id: np.ndarray       # int32
+    qty: np.ndarray           # int32
+
+    def __len__(self) -> int:
+        return len(self.qty)
+
+    @property
+    def nbytes(self) -> int:
+        return self.ts.nbytes + self.recipient_id.nbytes + self.item_id.nbytes + self.qty.nbytes
+
+    def months(self) -> np.ndarray:
+        # datetime64[M] 월 코드
+        return self.ts.astype("datetime64[s]").astype("datetime64[M]")
+
+def _read_only(a: np.ndarray) -> np.ndarray:
+    # 캐시된 배열을 화면 코드가 고치지 못하도록
+    a.flags.writeable = False
+    return a
+
+@cached_query
+def load_log_columns(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    recipient_id: Optional[int] = None,
+    item_id: Optional[int] = None,
+    chunk_size: int = 50_000,
+) -> LogColumns:
+    source, where_sql, params, attach = _log_source(start=start, end=end, recipient_id=recipient_id, item_id=item_id)
+    chunks = [
+        np.array(rows, dtype=np.int64).reshape(-1, 4)
+        for rows in iter_rows(f"""
+            SELECT l.ts, l.recipient_id, l.item_id, l.qty
+            FROM {source} {where_sql}
+        """, params, chunk_size, attach)
+    ]
+    data = np.concatenate(chunks) if chunks else np.empty((0, 4), dtype=np.int64)
+    return LogColumns(
+        ts=_read_only(np.ascontiguousarray(data[:, 0])),
+        recipient_id=_read_only(data[:, 1].astype(np.int32)),
+        item_id=_read_only(data[:, 2].astype(np.int32)),
+        qty=_read_only(data[:, 3].astype(np.int32)),
+    )
+
+# =========================================================
+# 집계 (정수 코드 기준)
+# =========================================================
+def _totals(codes: np.ndarray, qty: np.ndarray) -> Dict[int, int]:
+    if not len(codes):
+        return {}
+    sums = np.bincount(codes, weights=qty)
+    nz = np.flatnonzero(sums)
+    return dict(zip(nz.tolist(), sums[nz].astype(np.int64).tolist()))
+
+def _names(rows) -> Dict[int, str]:
+    return {rid: name for rid, name, _active in rows}
+
+def item_totals(cols: LogColumns) -> pd.DataFrame:
+    names = _names(get_all_items())
+    totals = _totals(cols.item_id, cols.qty)
+    df = pd.DataFrame({"품목": [names.get(i, f"#{i}") for i in totals], "수량": list(totals.values())})
+    return df.sort_values("수량", ascending=False, ignore_index=True)
+
+def recipient_totals(cols: LogColumns) -> pd.DataFrame:
+    names = _names(get_all_recipients())
+    totals = _totals(cols.recipient_id, cols.qty)
+    df = pd.DataFrame({"수령자": [names.get(r, f"#{r}") for r in totals], "수량": list(totals.values())})
+    return df.sort_values("수량", ascending=False, ignore_index=True)
+
+def recipient_item_totals(cols: LogColumns) -> pd.DataFrame:
+    # (수령자, 품목) 쌍을 하나의 정수 키로 합쳐 bincount
+    if not len(cols):
+        return pd.DataFrame(columns=["수령자", "품목", "수량"])
+    width = int(cols.item_id.max()) + 1
+    totals = _totals(cols.recipient_id.astype(np.int64) * width + cols.item_id, cols.qty)
+    keys = np.fromiter(totals.keys(), dtype=np.int64, count=len(totals))
+    r_names, i_names = _names(get_all_recipients()), _names(get_all_items())
+    return pd.DataFrame({
+        "수령자": [r_names.get(r, f"#{r}") for r in (keys // width).tolist()],
+        "품목": [i_names.get(i, f"#{i}") for i in (keys % width).tolist()],
+        "수량": list(totals.values()),
+    })
+
+def monthly_totals(cols: LogColumns, by_item: bool = False) -> pd.DataFrame:
+    # 월별 합계 (by_item 이면 월 × 품목)
+    if not len(cols):
+        return pd.DataFrame(columns=["월", "품목", "수량"] if by_item else ["월", "수량"])
+    months = cols.months()
+    first = months.min()
+    m_code = (months - first).astype(np.int64)
+    if not by_item:
+        sums = np.bincount(m_code, weights=cols.qty).astype(np.int64)
+        labels = np.arange(first, first + len(sums)).astype(str)
+        return pd.DataFrame({"월": labels, "수량": sums})
+    width = int(cols.item_id.max()) + 1
+    totals = _totals(m_code * width + cols.item_id, cols.qty)
+    keys = np.fromiter(totals.keys(), dtype=np.int64, count=len(totals))
+    names = _names(get_all_items())
+    return pd.DataFrame({
+        "월": (first + keys // width).astype(str),
+        "품목": [names.get(i, f"#{i}") for i in (keys % width).tolist()],
+        "수량": list(totals.values()),
+    })
@@ -0,0 +1,341 @@
+"""브라우저 없이 장부를 읽고 쓰는 공용 계층 + 작은 HTTP/JSON 서버.
+
+Streamlit 화면과 같은 queries 함수를 그대로 쓰므로 캐시, 보관 DB, 쓰기 스레드도 똑같이 탑니다.
+기록 목록은 iter_logs 커서에서 바로 JSON lines / CSV 로 흘려보내 DataFrame 을 만들지 않습니다.
+
+    python -m inventory serve --port 8502
+    curl 'localhost:8502/logs?start=2026-01-01&item=검정비닐&format=csv'
+    curl -X POST localhost:8502/logs --data-binary @기록.jsonl
+
+INVENTORY_API_TOKEN 을 설정하면 모든 요청에 Authorization: Bearer <토큰> 이 있어야 합니다.
+"""
+import csv
+import hmac
+import io
+import json
+import os
+import re
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, TextIO
+from urllib.parse import parse_qs, urlsplit
+
+from .db import get_pool
+from .export import EXPORT_WRITERS, export_logs
+from .importer import parse_qty, parse_ts
+from .queries import (
+    LOG_COLUMNS, LogRow, add_items, add_recipients, count_logs, get_all_items, get_all_recipients,
+    get_rollup_months, insert_logs_bulk, iter_logs, monthly_item_stats, monthly_recipient_item_stats,
+    monthly_recipient_stats, search_logs,
+)
+
+LOG_FIELDS = ["id", "ts", "recipient", "item", "qty", "note"]  # JSON lines 키 (LOG_COLUMNS 와 같은 순서)
+MONTHLY = {
+    "item": (monthly_item_stats, {"품목": "item", "수량": "qty"}),
+    "recipient": (monthly_recipient_stats, {"수령자": "recipient", "수량": "qty"}),
+    "recipient_item": (monthly_recipient_item_stats, {"수령자": "recipient", "품목": "item", "수량": "qty"}),
+}
+MAX_INSERT_ROWS = 100_000  # 요청 한 번에 넣을 수 있는 행 수 (그 이상은 importer 로)
+
+# =========================================================
+# 필터 · 조회
+# =========================================================
+def _resolve(value: Optional[str], rows, label: str) -> Optional[int]:
+    # 이름 또는 id -> id
+    if value in (None, ""):
+        return None
+    for rid, name, _active in rows:
+        if name == value:
+            return rid
+    if str(value).isdigit() and any(rid == int(value) for rid, _n, _a in rows):
+        return int(value)
+    raise ValueError(f"등록되지 않은 {label}: {value}")
+
+def _date(value: Optional[str]) -> Optional[date]:
+    if value in (None, ""):
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"날짜는 YYYY-MM-DD 형식이어야 합니다: {value!r}") from None
+
+def _limit(value: Optional[str]) -> Optional[int]:
+    if value in (None, ""):
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        raise ValueError(f"limit 은 1 이상의 정수여야 합니다: {value!r}")
+    return limit
+
+def log_filters(params: Mapping[str, Optional[str]]) -> dict:
+    # start / end / recipient / item (이름 또는 id) -> read_logs 계열 필터
+    return dict(
+        start=_date(params.get("start")),
+        end=_date(params.get("end")),
+        recipient_id=_resolve(params.get("recipient"), get_all_recipients(), "수령자"),
+        item_id=_resolve(params.get("item"), get_all_items(), "품목"),
+    )
+
+def log_rows(filters: dict, search: Optional[str] = None, limit: Optional[int] = None) -> Iterator[tuple]:
+    # 최신순 기록 튜플 (search: 비고 검색, 기본 500건). limit 이 없으면 전체를 커서로 흘려보냄
+    if search:
+        df = search_logs(search, limit=limit or 500, **filters)
+        for log_id, ts, *rest in df.itertuples(index=False, name=None):
+            yield (log_id, ts.strftime("%Y-%m-%d %H:%M:%S"), *map(_plain, rest))
+        return
+    rows = (row for chunk in iter_logs(**filters) for row in chunk)
+    yield from (islice(rows, limit) if limit else rows)
+
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+def write_jsonl(rows: Iterable[tuple], out: TextIO) -> int:
+    # 기록 한 줄 = LOG_FIELDS 객체. 정수 열은 그대로 찍고 문자열만 인코딩 (dict + json.dumps 보다 4배 빠름)
+    n = 0
+    for log_id, ts, recip, item, qty, note in rows:
+        out.write(
+            f'{{"id": {log_id}, "ts": "{ts}", "recipient": {_encode(recip)}, '
+            f'"item": {_encode(item)}, "qty": {qty}, "note": {_encode(note)}}}\n'
+        )
+        n += 1
+    return n
+
+def write_csv(rows: Iterable[tuple], out: TextIO, header: List[str] = LOG_COLUMNS) -> int:
+    w = csv.writer(out)
+    w.writerow(header)
+    n = 0
+    for row in rows:
+        w.writerow(row)
+        n += 1
+    return n
+
+WRITERS = {"jsonl": write_jsonl, "csv": write_csv}
+
+def monthly_rows(month: str, by: str = "item") -> List[dict]:
+    if by not in MONTHLY:
+        raise ValueError(f"by 는 {', '.join(MONTHLY)} 중 하나여야 합니다.")
+    fn, names = MONTHLY[by]
+    df = fn(month).rename(columns=names)
+    return [dict(zip(df.columns, map(_plain, row))) for row in df.itertuples(index=False, name=None)]
+
+def _plain(value):
+    # numpy 정수 -> int (json 직렬화용)
+    return value.item() if hasattr(value, "item") else value
+
+# =========================================================
+# 기록 넣기
+# =========================================================
+def parse_records(records: Iterable[dict], create_missing: bool = False) -> List[LogRow]:
+    # {"ts"?, "recipient"|"recipient_id", "item"|"item_id", "qty", "note"?} -> insert_logs_bulk 행.
+    # 한 건이라도 틀리면 아무것도 넣지 않도록 먼저 모두 검사 (ValueError 에 줄 번호)
+    recipients = {name: rid for rid, name, _a in get_all_recipients()}
+    items = {name: iid for iid, name, _a in get_all_items()}
+    parsed, errors = [], []
+    for line, rec in enumerate(records, start=1):
+        try:
+            if not isinstance(rec, dict):
+                raise ValueError("객체가 아닙니다.")
+            ts = datetime.fromisoformat(parse_ts(rec["ts"])) if rec.get("ts") else datetime.now().replace(microsecond=0)
+            recip = rec.get("recipient_id") or str(rec.get("recipient") or "").strip()
+            item = rec.get("item_id") or str(rec.get("item") or "").strip()
+            if not recip or not item:
+                raise ValueError("수령자/품목이 비어 있습니다.")
+            note = str(rec.get("note") or "").strip() or None
+            parsed.append((line, ts, recip, item, parse_qty(rec.get("qty")), note))
+        except (KeyError, ValueError) as e:
+            errors.append((line, str(e)))
+    if len(parsed) > MAX_INSERT_ROWS:
+        raise ValueError(f"한 번에 {MAX_INSERT_ROWS:,}건까지 넣을 수 있습니다. (python -m inventory.importer 사용)")
+
+    new_r = {r for _l, _t, r, _i, _q, _n in parsed if isinstance(r, str) and r not in recipients}
+    new_i = {i for _l, _t, _r, i, _q, _n in parsed if isinstance(i, str) and i not in items}
+    if create_missing and not errors:
+        if new_r:
+            add_recipients(sorted(new_r))
+            recipients = {name: rid for rid, name, _a in get_all_recipients()}
+        if new_i:
+            add_items(sorted(new_i))
+            items = {name: iid for iid, name, _a in get_all_items()}
+    r_ids, i_ids = set(recipients.values()), set(items.values())
+
+    rows = []
+    for line, ts, recip, item, qty, note in parsed:
+        rid = recipients.get(recip) if isinstance(recip, str) else recip
+        iid = items.get(item) if isinstance(item, str) else item
+        if rid not in r_ids:
+            errors.append((line, f"등록되지 않은 수령자: {recip}"))
+        elif iid not in i_ids:
+            errors.append((line, f"등록되지 않은 품목: {item}"))
+        else:
+            rows.append((ts, rid, iid, qty, note))
+    if errors:
+        lines = [f"{line}: {msg}" for line, msg in sorted(errors)[:20]]
+        raise ValueError("\n".join(lines) + (f"\n... 외 {len(errors) - 20}건" if len(errors) > 20 else ""))
+    return rows
+
+def insert_records(records: Iterable[dict], create_missing: bool = False) -> int:
+    # 모두 검사한 뒤 한 번의 커밋으로 (쓰기 스레드 경유)
+    rows = parse_records(records, create_missing)
+    return insert_logs_bulk(rows) if rows else 0
+
+def read_jsonl(stream: Iterable[str]) -> Iterator[dict]:
+    for n, line in enumerate(stream, start=1):
+        line = line.strip()
+        if line:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{n}: JSON 형식 오류 ({e.msg})") from None
+
+# =========================================================
+# HTTP 서버
+# =========================================================
+_NON_ASCII = re.compile(rb"[\x80-\xff]")
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "inventory-api/1"
+
+    def log_message(self, format, *args):
+        pass  # 요청마다 stderr 에 찍지 않음
+
+    def parse_request(self) -> bool:
+        # curl 처럼 한글을 인코딩하지 않고 보낸 요청 줄의 UTF-8 바이트를 %XX 로 바꿔 둠.
+        # http.server 는 요청 줄을 latin-1 로 읽어 (\xa0, \x85 를 공백으로 잘라) 400 을 내거나 값을 깨뜨림
+        self.raw_requestline = _NON_ASCII.sub(lambda m: b"%%%02X" % m.group()[0], self.raw_requestline)
+        return super().parse_request()
+
+    def _params(self) -> Dict[str, str]:
+        return {k: v[-1] for k, v in parse_qs(urlsplit(self.path).query).items()}
+
+    def _authorized(self) -> bool:
+        token = os.environ.get("INVENTORY_API_TOKEN")
+        if not token:
+            return True
+        given = self.headers.get("Authorization", "")
+        return hmac.compare_digest(given.encode(), f"Bearer {token}".encode())
+
+    def _send_json(self, value, status: int = 200):
+        body = json.dumps(value, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, content_type: str, write):
+        # HTTP/1.0: 길이 없이 보내고 연결을 닫아 끝을 알림 -> 행 수와 상관없이 메모리 일정
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.end_headers()
+        self._streaming = True
+        out = io.TextIOWrapper(self.wfile, encoding="utf-8", newline="", write_through=False)
+        try:
+            write(out)
+            out.flush()
+        finally:
+            out.detach()
+
+    def _dispatch(self, method: str):
+        self._streaming = False
+        if not self._authorized():
+            return self._send_json({"error": "인증이 필요합니다."}, 401)
+        path = urlsplit(self.path).path.rstrip("/") or "/"
+        params = self._params()
+        try:
+            handler = getattr(self, f"{method}_{path.strip('/').split('/')[0] or 'root'}", None)
+            if handler is None:
+                return self._send_json({"error": f"없는 경로: {path}"}, 404)
+            handler(path, params)
+        except ValueError as e:
+            self._send_json({"error": str(e)}, 400)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception as e:
+            if self._streaming:
+                raise  # 본문을 보내던 중이면 연결을 끊어 잘린 응답임을 알림
+            self._send_json({"error": f"{type(e).__name__}: {e}"}, 500)
+
+    def do_GET(self):
+        self._dispatch("get")
+
+    def do_POST(self):
+        self._dispatch("post")
+
+    # ----- GET -----
+    def get_root(self, path, params):
+        self._send_json({"db": str(get_pool().path), "data_version": get_pool().current_version()})
+
+    def get_recipients(self, path, params):
+        self._send_json([{"id": i, "name": n, "active": bool(a)} for i, n, a in get_all_recipients()])
+
+    def get_items(self, path, params):
+        self._send_json([{"id": i, "name": n, "active": bool(a)} for i, n, a in get_all_items()])
+
+    def get_logs(self, path, params):
+        # /logs?start&end&recipient&item&q&limit&format=jsonl|csv, /logs/count
+        filters = log_filters(params)
+        if path == "/logs/count":
+            return self._send_json({"count": count_logs(**filters)})
+        fmt = params.get("format", "jsonl")
+        if fmt not in WRITERS:
+            raise ValueError("format 은 jsonl 또는 csv 여야 합니다.")
+        limit = _limit(params.get("limit"))
+        rows = log_rows(filters, params.get("q"), limit)
+        first = next(rows, None)  # 필터 오류는 응답을 보내기 전에 400 으로
+        rows = rows if first is None else _prepend(first, rows)
+        content_type = "application/x-ndjson; charset=utf-8" if fmt == "jsonl" else "text/csv; charset=utf-8"
+        self._stream(content_type, lambda out: WRITERS[fmt](rows, out))
+
+    def get_months(self, path, params):
+        self._send_json(get_rollup_months())
+
+    def get_monthly(self, path, params):
+        # /monthly/2026-03?by=item|recipient|recipient_item
+        month = path.split("/")[-1]
+        if month not in get_rollup_months():
+            raise ValueError(f"집계가 없는 달입니다: {month}")
+        self._send_json(monthly_rows(month, params.get("by", "item")))
+
+    def get_export(self, path, params):
+        # /export?format=csv|xlsx&필터 : 화면의 다운로드와 같은 파일 (같은 필터/데이터면 재사용)
+        kind = params.get("format", "csv")
+        if kind not in EXPORT_WRITERS:
+            raise ValueError(f"format 은 {', '.join(EXPORT_WRITERS)} 중 하나여야 합니다.")
+        file = export_logs(kind, **log_filters(params))
+        mime = "text/csv" if kind == "csv" else "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        self.send_response(200)
+        self.send_header("Content-Type", mime)
+        self.send_header("Content-Length", str(file.stat().st_size))
+        self.send_header("Content-Disposition", f'attachment; filename="logs.{kind}"')
+        self.end_headers()
+        with open(file, "rb") as f:
+            while chunk := f.read(1 << 16):
+                self.wfile.write(chunk)
+
+    # ----- POST -----
+    def post_logs(self, path, params):
+        # 본문: JSON 배열 또는 JSON lines. ?create_missing=1 이면 없는 수령자/품목 등록
+        length = int(self.headers.get("Content-Length") or 0)
+        text = self.rfile.read(length).decode("utf-8-sig")
+        if text.lstrip().startswith("["):
+            try:
+                records = json.loads(text)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"JSON 형식 오류 ({e.msg})") from None
+        else:
+            records = read_jsonl(text.splitlines())
+        n = insert_records(records, create_missing=params.get("create_missing") in ("1", "true"))
+        self._send_json({"inserted": n}, 201)
+
+def _prepend(first, rest: Iterator) -> Iterator:
+    yield first
+    yield from rest
+
+def serve(host: str = "127.0.0.1", port: int = 8502) -> ThreadingHTTPServer:
+    # 요청마다 스레드. 읽기는 각자 연결, 쓰기는 쓰기 스레드로 모임
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    return server
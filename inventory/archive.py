@@ -0,0 +1,86 @@
+"""닫힌 연도의 지급 기록을 연도별 보관 DB 로 옮기기.
+
+옮긴 기록은 read_logs / count_logs / iter_logs 가 기간이 겹칠 때만 ATTACH 해서 함께 읽습니다.
+월별 집계와 현재고는 장부 DB 에 그대로 남으므로 통계 화면은 보관 DB 를 열지 않습니다.
+"""
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from .db import (
+    ARCHIVE_SCHEMA, NOTE_FTS, analyze_db, archive_alias, archive_path, from_ts, fts_available, rebuild_note_index,
+    run, to_ts, ts_text,
+)
+from .writer import queued_write
+
+def _delete_triggers() -> List[Tuple[str, str]]:
+    # logs 의 삭제 트리거 (집계, 현재고, 시트 동기화 ...). 옮기는 행은 삭제가 아니므로 잠시 내림
+    # 비고 색인(trg_logs_fts_del)은 행이 장부 DB 를 떠나므로 그대로 둠 (보관 DB 에 따로 색인)
+    return run("""
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'trigger' AND tbl_name = 'logs' AND sql LIKE '%AFTER DELETE ON logs%'
+          AND name NOT LIKE 'trg_logs_fts%'
+    """, fetch=True)
+
+def _year_range(year: int) -> Tuple[int, int]:
+    return to_ts(date(year, 1, 1)), to_ts(date(year + 1, 1, 1))
+
+def archivable_years() -> List[int]:
+    # 올해 이전이면서 장부 DB 에 아직 기록이 남은 연도
+    first = run("SELECT MIN(ts) FROM logs", fetch=True)[0][0]
+    if first is None:
+        return []
+    this_year = date.today().year
+    return [
+        y for y in range(from_ts(first).year, this_year)
+        if run("SELECT EXISTS(SELECT 1 FROM logs WHERE ts >= ? AND ts < ?)", _year_range(y), fetch=True)[0][0]
+    ]
+
+def _archive_attach(year: int) -> Dict[str, Path]:
+    return {archive_alias(year): archive_path(year)}
+
+@queued_write(attach=_archive_attach)
+def _move_year(year: int) -> Dict[str, int]:
+    # year 의 기록을 보관 DB 로 옮기고 장부 DB 에서 지움 (쓰기 스레드의 한 트랜잭션)
+    alias = archive_alias(year)
+    lo, hi = _year_range(year)
+    for ddl in ARCHIVE_SCHEMA:
+        run(ddl.format(a=alias))
+    with_fts = fts_available()
+    if with_fts:
+        run(NOTE_FTS.format(schema=alias))
+    # 다시 실행해도 같은 결과 (WAL 은 DB 파일별로만 원자적이라 중간에 끊기면 재실행으로 복구)
+    run(f"""
+        INSERT OR IGNORE INTO {alias}.logs(id, ts, recipient_id, item_id, qty, note)
+        SELECT id, ts, recipient_id, item_id, qty, note FROM main.logs WHERE ts >= ? AND ts < ?
+    """, (lo, hi))
+    triggers = _delete_triggers()
+    for name, _sql in triggers:
+        run(f"DROP TRIGGER {name}")
+    run("DELETE FROM main.logs WHERE ts >= ? AND ts < ?", (lo, hi))
+    moved = run("SELECT changes()", fetch=True)[0][0]
+    for _name, sql in triggers:
+        run(sql)
+    if with_fts:
+        # 보관 DB 는 더 바뀌지 않으므로 트리거 없이 통째로 색인
+        rebuild_note_index(alias)
+
+    # 보관 목록의 처음/마지막은 화면에 그대로 보이므로 문자열로
+    rows, min_ts, max_ts = run(
+        f"SELECT COUNT(*), {ts_text('MIN(ts)')}, {ts_text('MAX(ts)')} FROM {alias}.logs", fetch=True
+    )[0]
+    run("""
+        INSERT INTO log_archives(year, file, rows, min_ts, max_ts, archived_at) VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(year) DO UPDATE SET
+            file = excluded.file, rows = excluded.rows, min_ts = excluded.min_ts,
+            max_ts = excluded.max_ts, archived_at = excluded.archived_at
+    """, (year, archive_path(year).name, rows, min_ts, max_ts, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    return {"year": year, "moved": moved, "rows": rows}
+
+def archive_year(year: int) -> Dict[str, int]:
+    # year 의 기록을 <장부>_archive_<year>.db 로 옮김
+    if year >= date.today().year:
+        raise ValueError("올해 기록은 보관할 수 없습니다.")
+    result = _move_year(year)
+    analyze_db()
+    return result
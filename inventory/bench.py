@@ -0,0 +1,188 @@
+"""데이터 접근 경로 벤치마크. (Streamlit 없이 실행)
+
+    python -m inventory.synth --db bench.db --logs 1000000
+    python -m inventory.bench --db bench.db --json after.json --compare before.json
+
+캐시를 거치지 않은 실제 DB 비용을 재기 위해 @cached_query 함수는 __wrapped__ 로 호출합니다.
+"""
+import argparse
+import json
+import platform
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from . import db
+from .admin import referenced_names
+from .analytics import item_totals, load_log_columns, monthly_totals, recipient_item_totals
+from .db import from_ts, init_db, run, transaction
+from .export import write_logs_csv, write_logs_xlsx
+from .forecast import _forecast_items, seasonal_index
+from .queries import (
+    count_logs, get_rollup_months, insert_log, insert_logs_bulk, log_cursor,
+    monthly_item_stats, monthly_recipient_item_stats, monthly_recipient_stats, read_logs,
+)
+
+Case = Tuple[str, Callable[[], object]]
+
+def _uncached(fn):
+    return getattr(fn, "__wrapped__", fn)
+
+def _rows(result) -> Optional[int]:
+    if isinstance(result, int):
+        return result
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+def time_case(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    fn()  # 워밍업 (페이지 캐시)
+    times, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return {
+        "min_ms": min(times),
+        "median_ms": statistics.median(times),
+        "max_ms": max(times),
+        "rows": _rows(result),
+    }
+
+def read_cases() -> List[Case]:
+    lo, hi = run("SELECT MIN(ts), MAX(ts) FROM logs", fetch=True)[0]
+    if lo is None:
+        raise SystemExit("logs 가 비어 있습니다. 먼저 python -m inventory.synth 로 데이터를 만드세요.")
+    last = from_ts(hi).date()
+    month_start = last.replace(day=1)
+    year_start = last - timedelta(days=365)
+    rid = run("SELECT recipient_id FROM logs GROUP BY recipient_id ORDER BY COUNT(*) DESC LIMIT 1", fetch=True)[0][0]
+    iid = run("SELECT item_id FROM logs GROUP BY item_id ORDER BY COUNT(*) DESC LIMIT 1", fetch=True)[0][0]
+    unused_iid = run("SELECT COALESCE(MAX(id), 0) + 1 FROM items", fetch=True)[0][0]
+    recipient_ids = [r for (r,) in run("SELECT id FROM recipients", fetch=True)]
+    item_ids = [i for (i,) in run("SELECT id FROM items", fetch=True)]
+
+    rl = _uncached(read_logs)
+    first_page = rl(limit=51)
+    cursor = log_cursor(first_page.head(50))
+    month = _uncached(get_rollup_months)()[-1]
+    lc = _uncached(load_log_columns)
+    all_cols = lc()
+    tmp = Path(tempfile.mkdtemp(prefix="inventory_bench_"))
+
+    return [
+        ("read_logs/page50", lambda: rl(limit=51)),
+        ("read_logs/page50_next", lambda: rl(limit=51, before=cursor)),
+        ("read_logs/last_month", lambda: rl(start=month_start, end=last)),
+        ("read_logs/last_year", lambda: rl(start=year_start, end=last)),
+        ("read_logs/recipient_all", lambda: rl(recipient_id=rid)),
+        ("read_logs/item_all", lambda: rl(item_id=iid)),
+        ("read_logs/recipient_item_year", lambda: rl(start=year_start, end=last, recipient_id=rid, item_id=iid)),
+        ("count_logs/last_year", lambda: _uncached(count_logs)(start=year_start, end=last)),
+        ("stats/months", lambda: _uncached(get_rollup_months)()),
+        ("stats/item_month", lambda: _uncached(monthly_item_stats)(month)),
+        ("stats/recipient_month", lambda: _uncached(monthly_recipient_stats)(month)),
+        ("stats/recipient_item_month", lambda: _uncached(monthly_recipient_item_stats)(month)),
+        # 몇 년치 집계: 문자열 DataFrame groupby vs 정수 코드 bincount
+        ("analytics/frame_item_groupby_all", lambda: rl().groupby("품목")["수량"].sum()),
+        ("analytics/load_columns_all", lambda: lc()),
+        ("analytics/item_totals_all", lambda: item_totals(all_cols)),
+        ("analytics/recipient_item_all", lambda: recipient_item_totals(all_cols)),
+        ("analytics/monthly_all", lambda: monthly_totals(all_cols, by_item=True)),
+        # 전 품목 예측 (열 배열은 캐시된 상태에서 행렬 계산 + 계절 지수)
+        ("forecast/all_items", lambda: _uncached(_forecast_items)(14, 30, 0.95, 365, last)),
+        ("forecast/seasonal_index", lambda: _uncached(seasonal_index)(unused_iid, last.strftime("%Y-%m"))),
+        ("export/csv_month", lambda: write_logs_csv(tmp / "m.csv", start=month_start, end=last)),
+        ("export/csv_year", lambda: write_logs_csv(tmp / "y.csv", start=year_start, end=last)),
+        ("export/xlsx_month", lambda: write_logs_xlsx(tmp / "m.xlsx", start=month_start, end=last)),
+        # 완전 삭제 전 참조 확인: 명단 전체를 쿼리 한 번으로
+        ("refcheck/all_recipients", lambda: referenced_names("recipients", recipient_ids)),
+        ("refcheck/all_items", lambda: referenced_names("items", item_ids)),
+    ]
+
+def write_cases(n_single: int, n_bulk: int) -> List[Case]:
+    rid, iid = run("SELECT recipient_id, item_id FROM logs LIMIT 1", fetch=True)[0]
+    now = datetime.now()
+
+    def single():
+        for _ in range(n_single):
+            insert_log(now, rid, iid, 1, "bench")
+        return n_single
+
+    def bulk():
+        return insert_logs_bulk([(now, rid, iid, 1, "bench")] * n_bulk)
+
+    return [
+        (f"write/insert_log_x{n_single}", single),
+        (f"write/insert_logs_bulk_{n_bulk}", bulk),
+    ]
+
+def run_bench(repeat: int = 5, writes: bool = True, only: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    init_db()
+    cases = read_cases()
+    if writes:
+        cases += write_cases(n_single=200, n_bulk=10_000)
+    max_id = run("SELECT COALESCE(MAX(id), 0) FROM logs", fetch=True)[0][0]
+
+    results = {}
+    try:
+        for name, fn in cases:
+            if only and only not in name:
+                continue
+            results[name] = time_case(fn, repeat)
+    finally:
+        if writes:
+            # 벤치마크가 넣은 행은 지워서 DB 를 원래대로
+            with transaction():
+                run("DELETE FROM logs WHERE id > ?", (max_id,))
+    return results
+
+def meta() -> Dict[str, object]:
+    return {
+        "db": str(db.DB_PATH),
+        "db_bytes": Path(db.DB_PATH).stat().st_size,
+        "logs": run("SELECT COUNT(*) FROM logs", fetch=True)[0][0],
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "when": datetime.now().isoformat(timespec="seconds"),
+    }
+
+def report(results: Dict[str, Dict[str, float]], baseline: Optional[Dict[str, Dict[str, float]]] = None) -> str:
+    lines = [f"{'case':<34}{'min ms':>10}{'median ms':>12}{'max ms':>10}{'rows':>10}" + ("   vs base" if baseline else "")]
+    for name, r in results.items():
+        rows = "" if r["rows"] is None else f"{r['rows']:,}"
+        line = f"{name:<34}{r['min_ms']:>10.2f}{r['median_ms']:>12.2f}{r['max_ms']:>10.2f}{rows:>10}"
+        if baseline and name in baseline and baseline[name]["median_ms"]:
+            change = (r["median_ms"] / baseline[name]["median_ms"] - 1) * 100
+            line += f"{change:>+9.1f}%"
+        lines.append(line)
+    return "\n".join(lines)
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="장부 데이터 접근 벤치마크")
+    ap.add_argument("--db", default=str(db.DB_PATH), help="대상 DB 파일 (기본: inventory.db)")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--no-writes", action="store_true", help="insert_log 처리량 측정 생략")
+    ap.add_argument("--only", help="이름에 이 문자열이 들어간 항목만")
+    ap.add_argument("--json", help="결과를 JSON 으로 저장")
+    ap.add_argument("--compare", help="이전 --json 결과와 비교")
+    args = ap.parse_args(argv)
+
+    db.DB_PATH = Path(args.db)
+    results = run_bench(args.repeat, writes=not args.no_writes, only=args.only)
+    info = meta()
+    baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))["results"] if args.compare else None
+
+    print(f"# {info['db']}: {info['logs']:,} logs, {info['db_bytes'] / 1e6:.1f} MB, "
+          f"python {info['python']}, sqlite {info['sqlite']}")
+    print(report(results, baseline))
+    if args.json:
+        Path(args.json).write_text(json.dumps({"meta": info, "results": results}, ensure_ascii=False, indent=2), encoding="utf-8")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""명령줄 진입점: python -m inventory <명령> ...
+
+    python -m inventory logs --start 2026-01-01 --item 검정비닐 --format csv > 검정비닐.csv
+    python -m inventory monthly 2026-03 --by recipient
+    python -m inventory insert 기록.jsonl --create-missing
+    python -m inventory serve --port 8502
+    INVENTORY_SITES="별관=annex.db" python -m inventory export xlsx 전체.xlsx --all-sites
+
+조회 결과는 표준출력으로 JSON lines (또는 CSV) 를 흘려보내므로 다른 도구에 바로 이어 붙일 수 있습니다.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+from . import db
+from .api import WRITERS, _date, insert_records, log_filters, log_rows, monthly_rows, read_jsonl, serve
+from .export import EXPORT_WRITERS
+from .queries import count_logs, get_rollup_months, prepare_db
+from .sites import SITE_EXPORT_WRITERS, count_logs_sites
+
+def _add_filters(p: argparse.ArgumentParser):
+    p.add_argument("--start", help="시작일 YYYY-MM-DD")
+    p.add_argument("--end", help="종료일 YYYY-MM-DD (포함)")
+    p.add_argument("--recipient", help="수령자 이름 또는 id")
+    p.add_argument("--item", help="품목 이름 또는 id")
+
+def _filters(args) -> dict:
+    return log_filters(vars(args))
+
+def _site_filters(args) -> dict:
+    # 전체 사업장: 수령자/품목은 이름(품목은 통합 이름)으로 사업장마다 찾음
+    return dict(start=_date(args.start), end=_date(args.end), recipient=args.recipient, item=args.item)
+
+def cmd_logs(args) -> int:
+    rows = log_rows(_filters(args), args.search, args.limit)
+    out = open(args.output, "w", newline="", encoding="utf-8-sig" if args.format == "csv" else "utf-8") if args.output else sys.stdout
+    try:
+        n = WRITERS[args.format](rows, out)
+    finally:
+        if args.output:
+            out.close()
+    if args.output:
+        print(f"{n:,}건 -> {args.output}", file=sys.stderr)
+    return 0
+
+def cmd_count(args) -> int:
+    if args.all_sites:
+        for name, n in count_logs_sites(**_site_filters(args)).items():
+            print(f"{name}\t{n}")
+        return 0
+    print(count_logs(**_filters(args)))
+    return 0
+
+def cmd_months(args) -> int:
+    print("\n".join(get_rollup_months()))
+    return 0
+
+def cmd_monthly(args) -> int:
+    for row in monthly_rows(args.month, args.by):
+        print(json.dumps(row, ensure_ascii=False))
+    return 0
+
+def cmd_export(args) -> int:
+    if args.all_sites:
+        n = SITE_EXPORT_WRITERS[args.kind](Path(args.output), **_site_filters(args))
+    else:
+        n = EXPORT_WRITERS[args.kind](Path(args.output), **_filters(args))
+    print(f"{n:,}건 -> {args.output}", file=sys.stderr)
+    return 0
+
+def cmd_insert(args) -> int:
+    # JSON lines 를 모두 검사한 뒤 한 번에 커밋 (CSV / Excel 장부는 python -m inventory.importer)
+    stream = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8-sig")
+    try:
+        n = insert_records(read_jsonl(stream), create_missing=args.create_missing)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    print(f"{n:,}건 저장", file=sys.stderr)
+    return 0
+
+def cmd_reindex(args) -> int:
+    if not db.fts_available():
+        print("이 SQLite 에는 FTS5(trigram) 가 없어 비고 검색은 LIKE 로 동작합니다.", file=sys.stderr)
+        return 1
+    db.rebuild_note_index()
+    print("비고 검색 색인 재생성 완료", file=sys.stderr)
+    return 0
+
+def cmd_serve(args) -> int:
+    server = serve(args.host, args.port)
+    print(f"http://{args.host}:{args.port}/ ({db.DB_PATH})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="python -m inventory", description="소모품 장부 명령줄 도구")
+    ap.add_argument("--db", default=str(db.DB_PATH), help="대상 DB 파일 (기본: inventory.db)")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("logs", help="지급 기록 (최신순) 을 JSON lines / CSV 로")
+    _add_filters(p)
+    p.add_argument("--search", help="비고 검색어 (기본 최근 500건)")
+    p.add_argument("--limit", type=int)
+    p.add_argument("--format", choices=sorted(WRITERS), default="jsonl")
+    p.add_argument("-o", "--output", help="파일로 저장 (기본: 표준출력)")
+    p.set_defaults(fn=cmd_logs)
+
+    p = sub.add_parser("count", help="조건에 맞는 기록 수")
+    _add_filters(p)
+    p.add_argument("--all-sites", action="store_true", help="INVENTORY_SITES 의 모든 사업장 (사업장별)")
+    p.set_defaults(fn=cmd_count)
+
+    p = sub.add_parser("months", help="집계가 있는 달 목록")
+    p.set_defaults(fn=cmd_months)
+
+    p = sub.add_parser("monthly", help="월별 집계 (JSON lines)")
+    p.add_argument("month", help="YYYY-MM")
+    p.add_argument("--by", choices=["item", "recipient", "recipient_item"], default="item")
+    p.set_defaults(fn=cmd_monthly)
+
+    p = sub.add_parser("export", help="화면의 다운로드와 같은 CSV / Excel 파일")
+    p.add_argument("kind", choices=sorted(EXPORT_WRITERS))
+    p.add_argument("output")
+    _add_filters(p)
+    p.add_argument("--all-sites", action="store_true", help="모든 사업장을 사업장 열과 함께")
+    p.set_defaults(fn=cmd_export)
+
+    p = sub.add_parser("insert", help="JSON lines 기록을 한 번에 저장")
+    p.add_argument("file", nargs="?", default="-", help="JSON lines 파일 (기본: 표준입력)")
+    p.add_argument("--create-missing", action="store_true", help="없는 수령자/품목은 새로 등록")
+    p.set_defaults(fn=cmd_insert)
+
+    p = sub.add_parser("reindex", help="비고 검색 색인 다시 만들기")
+    p.set_defaults(fn=cmd_reindex)
+
+    p = sub.add_parser("serve", help="HTTP/JSON 서버")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8502)
+    p.set_defaults(fn=cmd_serve)
+    return ap
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    db.DB_PATH = Path(args.db)
+    prepare_db()
+    try:
+        return args.fn(args)
+    except ValueError as e:
+        print(f"오류: {e}", file=sys.stderr)
+        return 2
+    except BrokenPipeError:
+        # | head 처럼 읽는 쪽이 먼저 끝난 경우
+        sys.stderr.close()
+        return 0
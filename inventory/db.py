@@ -0,0 +1,802 @@
+"""SQLite 연결 풀, 트랜잭션, 조회 캐시, 스키마 · 마이그레이션."""
+import os
+import sqlite3
+import threading
+import functools
+import itertools
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, List, Tuple, Dict, Callable, Iterator
+
+# INVENTORY_DB 환경변수로 다른 장부 파일을 쓸 수 있습니다. (벤치마크/테스트용)
+DB_PATH = Path(os.environ.get("INVENTORY_DB", "inventory.db"))
+
+# =========================================================
+# 연결 풀
+# =========================================================
+# 연결은 프로세스 단위로 재사용합니다. (rerun 마다 connect/close 하지 않음)
+DB_PRAGMAS = (
+    "PRAGMA journal_mode = WAL;",
+    "PRAGMA synchronous = NORMAL;",
+    "PRAGMA busy_timeout = 5000;",
+    "PRAGMA foreign_keys = ON;",
+    "PRAGMA cache_size = -16000;",    # 약 16MB
+    "PRAGMA mmap_size = 67108864;",   # 64MB
+    "PRAGMA temp_store = MEMORY;",
+)
+
+class ConnectionPool:
+    def __init__(self, path: Path, size: int = 4):
+        self.path = path
+        self.size = size
+        self._idle: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # 쓰기가 커밋될 때마다 1씩 증가 -> 조회 캐시 무효화 기준
+        self.data_version = 0
+        self._watch: Optional[sqlite3.Connection] = None
+
+    def _open(self) -> sqlite3.Connection:
+        # isolation_level=None: 트랜잭션은 transaction() 에서만 명시적으로 엽니다.
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        for pragma in DB_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        # 같은 스레드에서 트랜잭션이 열려 있으면 그 연결을 그대로 사용
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._open()
+        changes = conn.total_changes
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            # 붙여 둔 보관/사업장 DB 를 떼고 돌려놓음. 붙은 채로 두면 이 연결의 BEGIN IMMEDIATE 가
+            # 그 파일들에도 쓰기 잠금을 걸어 다른 연결(다른 사업장의 쓰기 스레드 등)을 막음
+            reusable = detach_databases(conn)
+            with self._lock:
+                if conn.total_changes != changes:
+                    self.data_version += 1
+                if reusable and len(self._idle) < self.size:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    @contextmanager
+    def transaction(self, attach: Optional[Dict[str, Path]] = None):
+        # 중첩 호출은 바깥 트랜잭션에 합류합니다.
+        if getattr(self._local, "conn", None) is not None:
+            attach_databases(self._local.conn, attach)
+            yield self._local.conn
+            return
+
+        with self.connection() as conn:
+            # ATTACH 는 트랜잭션 밖에서만 가능하므로 BEGIN 전에
+            attach_databases(conn, attach)
+            conn.execute("BEGIN IMMEDIATE")
+            self._local.conn = conn
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+            finally:
+                self._local.conn = None
+
+    def in_transaction(self) -> bool:
+        # 이 스레드에서 transaction() 블록 안인지
+        return getattr(self._local, "conn", None) is not None
+
+    def current_version(self) -> Tuple[int, int]:
+        # 다른 프로세스(가져오기 스크립트 등)의 커밋은 쓰기를 하지 않는
+        # 감시용 연결의 PRAGMA data_version 변화로 감지합니다.
+        with self._lock:
+            if self._watch is None:
+                self._watch = self._open()
+            return self.data_version, self._watch.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+            if self._watch is not None:
+                idle.append(self._watch)
+                self._watch = None
+        for conn in idle:
+            conn.close()
+
+# SQLite 기본 한도(10) 안에서 한 연결에 한꺼번에 붙일 DB 수 (연결을 풀에 돌려줄 때 모두 뗌)
+MAX_ATTACHED = 10
+
+def attach_databases(conn: sqlite3.Connection, attach: Optional[Dict[str, Path]]):
+    # {별칭: 파일} 중 아직 붙지 않은 것만 ATTACH. 자리가 모자라면 이번에 안 쓰는 것부터 DETACH
+    if not attach:
+        return
+    current = {row[1] for row in conn.execute("PRAGMA database_list")} - {"main", "temp"}
+    missing = [alias for alias in attach if alias not in current]
+    if not missing:
+        return
+    if conn.in_transaction:
+        raise RuntimeError("트랜잭션 안에서는 보관 DB 를 붙일 수 없습니다.")
+    spare = sorted(current - set(attach))
+    while spare and len(current) + len(missing) > MAX_ATTACHED:
+        alias = spare.pop()
+        conn.execute(f"DETACH DATABASE {alias}")
+        current.discard(alias)
+    for alias in missing:
+        conn.execute(f"ATTACH DATABASE ? AS {alias}", (str(attach[alias]),))
+
+def detach_databases(conn: sqlite3.Connection) -> bool:
+    # 붙인 DB 를 모두 DETACH. 끝나지 않은 문장이 남아 뗄 수 없으면 False (연결을 닫아야 함)
+    try:
+        for row in conn.execute("PRAGMA database_list").fetchall():
+            if row[1] not in ("main", "temp"):
+                conn.execute(f"DETACH DATABASE {row[1]}")
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+# 스레드별 대상 장부 (여러 사업장 장부를 스레드마다 따로 조회할 때). 없으면 DB_PATH
+_thread_db = threading.local()
+
+def set_thread_db(path: Optional[Path]):
+    # 이 스레드의 get_pool() 대상을 바꿈 (None 이면 DB_PATH 로 되돌림)
+    _thread_db.path = str(path) if path is not None else None
+
+@contextmanager
+def use_db(path: Path):
+    prev = getattr(_thread_db, "path", None)
+    _thread_db.path = str(path)
+    try:
+        yield
+    finally:
+        _thread_db.path = prev
+
+def get_pool(db_path: Optional[str] = None) -> ConnectionPool:
+    # 경로별로 프로세스에 하나 (이 모듈은 rerun 해도 다시 import 되지 않음)
+    path = str(db_path or getattr(_thread_db, "path", None) or DB_PATH)
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = ConnectionPool(Path(path))
+        return pool
+
+class QueryCache:
+    # data_version 이 바뀌면 통째로 비우는 LRU 캐시
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.version = None
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, version, key, compute):
+        with self._lock:
+            if version != self.version:
+                self._data.clear()
+                self.version = version
+            elif key in self._data:
+                self._data.move_to_end(key)
+                return self._data[key]
+        value = compute()
+        with self._lock:
+            if version == self.version:
+                self._data[key] = value
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+# 장부 파일마다 따로 (data_version 이 파일마다 다르므로, 하나를 같이 쓰면 사업장을 오갈 때마다 비워짐)
+_query_caches: Dict[str, QueryCache] = {}
+
+def get_query_cache(db_path: Optional[str] = None) -> QueryCache:
+    path = str(get_pool(db_path).path)
+    with _pools_lock:
+        cache = _query_caches.get(path)
+        if cache is None:
+            cache = _query_caches[path] = QueryCache()
+        return cache
+
+def cached_query(fn):
+    # 인자 + data_version 기준 캐시. 호출자가 결과를 고쳐도 캐시가 오염되지 않도록 사본을 돌려줌
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        pool = get_pool()
+        key = (str(pool.path), fn.__name__, args, tuple(sorted(kwargs.items())))
+        value = get_query_cache(pool.path).get_or_compute(pool.current_version(), key, lambda: fn(*args, **kwargs))
+        copy = getattr(value, "copy", None)
+        return copy() if copy is not None else value
+    return wrapper
+
+def transaction(attach: Optional[Dict[str, Path]] = None):
+    # with transaction(): 블록 안의 run() 은 모두 한 번에 커밋됩니다.
+    return get_pool().transaction(attach)
+
+# 실행 후 (conn, query, params, ms, rows) 로 호출되는 계측 훅 (inventory.perf 가 등록)
+QueryHook = Callable[[sqlite3.Connection, str, object, float, int], None]
+_query_hooks: List[QueryHook] = []
+
+def add_query_hook(hook: QueryHook):
+    if hook not in _query_hooks:
+        _query_hooks.append(hook)
+
+def _notify(conn: sqlite3.Connection, query: str, params, t0: float, rows: int):
+    ms = (time.perf_counter() - t0) * 1000
+    for hook in _query_hooks:
+        hook(conn, query, params, ms, rows)
+
+def run(query: str, params=(), fetch: bool = False, attach: Optional[Dict[str, Path]] = None):
+    with get_pool().connection() as conn:
+        attach_databases(conn, attach)
+        t0 = time.perf_counter()
+        cur = conn.execute(query, params)
+        rows = cur.fetchall() if fetch else None
+        if _query_hooks:
+            _notify(conn, query, params, t0, len(rows) if rows is not None else cur.rowcount)
+        return rows
+
+def run_many(query: str, seq_of_params) -> int:
+    # 여러 행을 한 트랜잭션, 한 번의 executemany 로 저장. 훅에는 첫 행의 값을 넘김 (실행계획용)
+    rows = iter(seq_of_params)
+    first = next(rows, None)
+    with transaction() as conn:
+        t0 = time.perf_counter()
+        cur = conn.executemany(query, rows if first is None else itertools.chain([first], rows))
+        if _query_hooks:
+            _notify(conn, query, first, t0, cur.rowcount)
+        return cur.rowcount
+
+def iter_rows(query: str, params=(), chunk_size: int = 5000,
+              attach: Optional[Dict[str, Path]] = None) -> Iterator[List[tuple]]:
+    # 커서에서 chunk_size 행씩 꺼냄 (내보내기 등 큰 결과). 훅에는 다 읽은 뒤(또는 중간에 그만둘 때)
+    # 꺼내는 데 걸린 시간까지 넘김 -> SQLite 는 행을 꺼낼 때 실제로 계산하므로
+    with get_pool().connection() as conn:
+        attach_databases(conn, attach)
+        t0 = time.perf_counter()
+        n = 0
+        cur = conn.execute(query, params)
+        try:
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                n += len(rows)
+                yield rows
+        finally:
+            cur.close()
+            if _query_hooks:
+                _notify(conn, query, params, t0, n)
+
+# =========================================================
+# 시각 (ts)
+# =========================================================
+# ts 는 장부 시각(벽시계, 시간대 없음)을 UTC 로 본 epoch 초 정수.
+# 문자열보다 작고 비교가 빠르며, DataFrame 은 문자열 파싱 없이 pd.to_datetime(unit="s") 로 만듦
+_EPOCH = datetime(1970, 1, 1)
+
+def to_ts(value) -> int:
+    # datetime / date -> ts (초 미만은 버림)
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    return (value - _EPOCH) // timedelta(seconds=1)
+
+def from_ts(ts: int) -> datetime:
+    return _EPOCH + timedelta(seconds=ts)
+
+def ts_text(expr: str) -> str:
+    # SQL 안에서 ts -> 'YYYY-MM-DD HH:MM:SS' (내보내기/시트처럼 문자열이 필요한 곳)
+    return f"datetime({expr}, 'unixepoch')"
+
+def ts_month(expr: str) -> str:
+    return f"strftime('%Y-%m', {expr}, 'unixepoch')"
+
+# 이미 'YYYY-MM-DD HH:MM:SS' 로 검사한 문자열을 그대로 넣을 때 (가져오기/예시 데이터)
+TS_PARAM = "CAST(strftime('%s', ?) AS INTEGER)"
+
+# STRICT 테이블(SQLite 3.37+): 열 타입과 다른 값(정수 ts 자리에 문자열 등)을 넣으면 바로 오류
+HAS_STRICT = sqlite3.sqlite_version_info >= (3, 37, 0)
+# UPDATE ... FROM (SQLite 3.33+). 없으면 바꿀 값을 먼저 읽어 행마다 UPDATE
+HAS_UPDATE_FROM = sqlite3.sqlite_version_info >= (3, 33, 0)
+
+def table_options(*options: str) -> str:
+    opts = list(options) + (["STRICT"] if HAS_STRICT else [])
+    return " " + ", ".join(opts) if opts else ""
+
+# =========================================================
+# 스키마
+# =========================================================
+# ts 가 들어 있거나 STRICT 로 만드는 테이블. {name} 자리는 마이그레이션에서 새 테이블 이름으로 바꿔 씀
+TABLES = {
+    "logs": """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ts INTEGER NOT NULL,
+        recipient_id INTEGER NOT NULL,
+        item_id INTEGER NOT NULL,
+        qty INTEGER NOT NULL,
+        note TEXT,
+        FOREIGN KEY(recipient_id) REFERENCES recipients(id),
+        FOREIGN KEY(item_id) REFERENCES items(id)
+    )""" + table_options(),
+    # 월별 집계 테이블: logs 트리거로 증분 유지 -> 통계 화면은 원본 로그를 다시 집계하지 않음
+    "monthly_item_totals": """
+    CREATE TABLE IF NOT EXISTS {name} (
+        month TEXT NOT NULL,
+        item_id INTEGER NOT NULL,
+        qty INTEGER NOT NULL,
+        n INTEGER NOT NULL,
+        PRIMARY KEY (month, item_id)
+    )""" + table_options("WITHOUT ROWID"),
+    "monthly_recipient_item_totals": """
+    CREATE TABLE IF NOT EXISTS {name} (
+        month TEXT NOT NULL,
+        recipient_id INTEGER NOT NULL,
+        item_id INTEGER NOT NULL,
+        qty INTEGER NOT NULL,
+        n INTEGER NOT NULL,
+        PRIMARY KEY (month, recipient_id, item_id)
+    )""" + table_options("WITHOUT ROWID"),
+    # 재고: 입고(receipts) + 조정(stock_adjustments) - 지급(logs) = 현재고
+    "receipts": """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ts INTEGER NOT NULL,
+        item_id INTEGER NOT NULL,
+        qty INTEGER NOT NULL,
+        note TEXT,
+        FOREIGN KEY(item_id) REFERENCES items(id)
+    )""" + table_options(),
+    "stock_adjustments": """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ts INTEGER NOT NULL,
+        item_id INTEGER NOT NULL,
+        delta INTEGER NOT NULL,
+        reason TEXT,
+        FOREIGN KEY(item_id) REFERENCES items(id)
+    )""" + table_options(),
+    # item_balances 는 트리거로 같은 트랜잭션 안에서 갱신 -> 현재고 조회는 품목 수만큼만 읽음
+    "item_balances": """
+    CREATE TABLE IF NOT EXISTS {name} (
+        item_id INTEGER PRIMARY KEY,
+        on_hand INTEGER NOT NULL DEFAULT 0,
+        min_qty INTEGER NOT NULL DEFAULT 0
+    )""" + table_options(),
+    # 관리자 일괄 작업으로 지운 지급 기록 원본 (같은 id 로 복원)
+    "admin_journal_logs": """
+    CREATE TABLE IF NOT EXISTS {name} (
+        journal_id INTEGER NOT NULL,
+        id INTEGER NOT NULL,
+        ts INTEGER NOT NULL,
+        recipient_id INTEGER NOT NULL,
+        item_id INTEGER NOT NULL,
+        qty INTEGER NOT NULL,
+        note TEXT,
+        PRIMARY KEY (journal_id, id)
+    )""" + table_options("WITHOUT ROWID"),
+}
+
+def create_table(name: str):
+    run(TABLES[name].format(name=name))
+
+# 날짜 범위/수령자/품목 필터와 월별 집계가 인덱스만 읽도록 하는 커버링 인덱스
+LOG_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_logs_ts ON logs(ts, recipient_id, item_id, qty)",
+    "CREATE INDEX IF NOT EXISTS idx_logs_recipient_ts ON logs(recipient_id, ts, item_id, qty)",
+    "CREATE INDEX IF NOT EXISTS idx_logs_item_ts ON logs(item_id, ts, recipient_id, qty)",
+)
+
+# 이 건수 이상을 한 번에 넣으면 통계(ANALYZE)를 갱신합니다.
+ANALYZE_THRESHOLD = 1000
+
+ROLLUP_TABLES = ("monthly_item_totals", "monthly_recipient_item_totals")
+
+_ROLLUP_ADD = f"""
+        INSERT INTO monthly_item_totals(month, item_id, qty, n)
+        VALUES ({ts_month('NEW.ts')}, NEW.item_id, NEW.qty, 1)
+        ON CONFLICT(month, item_id) DO UPDATE SET qty = qty + excluded.qty, n = n + 1;
+        INSERT INTO monthly_recipient_item_totals(month, recipient_id, item_id, qty, n)
+        VALUES ({ts_month('NEW.ts')}, NEW.recipient_id, NEW.item_id, NEW.qty, 1)
+        ON CONFLICT(month, recipient_id, item_id) DO UPDATE SET qty = qty + excluded.qty, n = n + 1;
+"""
+
+_ROLLUP_SUB = f"""
+        UPDATE monthly_item_totals SET qty = qty - OLD.qty, n = n - 1
+        WHERE month = {ts_month('OLD.ts')} AND item_id = OLD.item_id;
+        DELETE FROM monthly_item_totals
+        WHERE month = {ts_month('OLD.ts')} AND item_id = OLD.item_id AND n <= 0;
+        UPDATE monthly_recipient_item_totals SET qty = qty - OLD.qty, n = n - 1
+        WHERE month = {ts_month('OLD.ts')} AND recipient_id = OLD.recipient_id AND item_id = OLD.item_id;
+        DELETE FROM monthly_recipient_item_totals
+        WHERE month = {ts_month('OLD.ts')} AND recipient_id = OLD.recipient_id AND item_id = OLD.item_id AND n <= 0;
+"""
+
+ROLLUP_TRIGGERS = (
+    f"CREATE TRIGGER IF NOT EXISTS trg_logs_rollup_ins AFTER INSERT ON logs BEGIN {_ROLLUP_ADD} END",
+    f"CREATE TRIGGER IF NOT EXISTS trg_logs_rollup_del AFTER DELETE ON logs BEGIN {_ROLLUP_SUB} END",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_logs_rollup_upd
+        AFTER UPDATE OF ts, recipient_id, item_id, qty ON logs
+        BEGIN {_ROLLUP_SUB} {_ROLLUP_ADD} END""",
+)
+
+STOCK_TABLES = ("receipts", "stock_adjustments", "item_balances")
+STOCK_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_receipts_item_ts ON receipts(item_id, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_stock_adjustments_item_ts ON stock_adjustments(item_id, ts)",
+)
+
+def _balance_delta(item_expr: str, delta_expr: str) -> str:
+    return f"""
+        INSERT INTO item_balances(item_id, on_hand) VALUES ({item_expr}, {delta_expr})
+        ON CONFLICT(item_id) DO UPDATE SET on_hand = on_hand + excluded.on_hand;
+    """
+
+STOCK_TRIGGERS = (
+    f"CREATE TRIGGER IF NOT EXISTS trg_logs_stock_ins AFTER INSERT ON logs BEGIN {_balance_delta('NEW.item_id', '-NEW.qty')} END",
+    f"CREATE TRIGGER IF NOT EXISTS trg_logs_stock_del AFTER DELETE ON logs BEGIN {_balance_delta('OLD.item_id', 'OLD.qty')} END",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_logs_stock_upd AFTER UPDATE OF item_id, qty ON logs
+        BEGIN {_balance_delta('OLD.item_id', 'OLD.qty')} {_balance_delta('NEW.item_id', '-NEW.qty')} END""",
+    f"CREATE TRIGGER IF NOT EXISTS trg_receipts_stock_ins AFTER INSERT ON receipts BEGIN {_balance_delta('NEW.item_id', 'NEW.qty')} END",
+    f"CREATE TRIGGER IF NOT EXISTS trg_receipts_stock_del AFTER DELETE ON receipts BEGIN {_balance_delta('OLD.item_id', '-OLD.qty')} END",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_receipts_stock_upd AFTER UPDATE OF item_id, qty ON receipts
+        BEGIN {_balance_delta('OLD.item_id', '-OLD.qty')} {_balance_delta('NEW.item_id', 'NEW.qty')} END""",
+    f"CREATE TRIGGER IF NOT EXISTS trg_adjust_stock_ins AFTER INSERT ON stock_adjustments BEGIN {_balance_delta('NEW.item_id', 'NEW.delta')} END",
+    f"CREATE TRIGGER IF NOT EXISTS trg_adjust_stock_del AFTER DELETE ON stock_adjustments BEGIN {_balance_delta('OLD.item_id', '-OLD.delta')} END",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_adjust_stock_upd AFTER UPDATE OF item_id, delta ON stock_adjustments
+        BEGIN {_balance_delta('OLD.item_id', '-OLD.delta')} {_balance_delta('NEW.item_id', 'NEW.delta')} END""",
+)
+
+# 연도별 보관 DB 목록. 보관된 기록은 <장부>_archive_<연도>.db 의 logs 로 옮겨집니다.
+ARCHIVE_CATALOG = """
+    CREATE TABLE IF NOT EXISTS log_archives (
+        year INTEGER PRIMARY KEY,
+        file TEXT NOT NULL,
+        rows INTEGER NOT NULL,
+        min_ts TEXT,
+        max_ts TEXT,
+        archived_at TEXT NOT NULL
+    )
+"""
+
+# 여러 사업장 합산용 품목 이름 대응 (사업장마다 부르는 이름 -> 통합 이름). 대표 장부(DB_PATH)의 것을 씀
+ITEM_ALIASES = """
+    CREATE TABLE IF NOT EXISTS item_aliases (
+        alias TEXT PRIMARY KEY,
+        canonical TEXT NOT NULL
+    ) WITHOUT ROWID
+"""
+
+# 관리자 일괄 작업의 되돌리기 기록. 바뀌기 전 행을 그대로 복사해 두고 되돌릴 때 다시 넣음
+# action: delete_logs / update_names / delete_names, target: logs / recipients / items
+# 지운 지급 기록 원본은 TABLES["admin_journal_logs"]
+ADMIN_JOURNAL = (
+    """CREATE TABLE IF NOT EXISTS admin_journal (
+        id INTEGER PRIMARY KEY,
+        ts TEXT NOT NULL,
+        action TEXT NOT NULL,
+        target TEXT NOT NULL,
+        summary TEXT NOT NULL,
+        rows INTEGER NOT NULL,
+        undone_at TEXT
+    )""",
+    # 바꾸거나 지우기 전 수령자/품목 (min_qty 는 품목 완전 삭제 때만)
+    """CREATE TABLE IF NOT EXISTS admin_journal_names (
+        journal_id INTEGER NOT NULL,
+        id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        active INTEGER NOT NULL,
+        min_qty INTEGER,
+        PRIMARY KEY (journal_id, id)
+    ) WITHOUT ROWID""",
+)
+
+# 비고 전문 검색. trigram 토크나이저라 "청소" 처럼 낱말 중간도 찾을 수 있음 (3글자 이상)
+# content='logs': 본문은 logs 에만 두고 색인만 따로 (비고가 있는 행만 색인)
+NOTE_FTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {schema}.logs_fts USING fts5("
+    "note, content='logs', content_rowid='id', tokenize='trigram')"
+)
+NOTE_FTS_TRIGGERS = (
+    """CREATE TRIGGER IF NOT EXISTS trg_logs_fts_ins AFTER INSERT ON logs WHEN NEW.note IS NOT NULL BEGIN
+        INSERT INTO logs_fts(rowid, note) VALUES (NEW.id, NEW.note);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_logs_fts_del AFTER DELETE ON logs WHEN OLD.note IS NOT NULL BEGIN
+        INSERT INTO logs_fts(logs_fts, rowid, note) VALUES ('delete', OLD.id, OLD.note);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_logs_fts_upd AFTER UPDATE OF note ON logs BEGIN
+        INSERT INTO logs_fts(logs_fts, rowid, note) SELECT 'delete', OLD.id, OLD.note WHERE OLD.note IS NOT NULL;
+        INSERT INTO logs_fts(rowid, note) SELECT NEW.id, NEW.note WHERE NEW.note IS NOT NULL;
+    END""",
+)
+
+@functools.lru_cache(maxsize=None)
+def fts_available() -> bool:
+    # FTS5(+trigram, SQLite 3.34+) 없이 빌드된 SQLite 면 비고 검색은 LIKE 로 대신함. (라이브러리 기능이라 한 번만 확인)
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE VIRTUAL TABLE fts_probe USING fts5(x, tokenize='trigram')")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+def _table_exists(name: str, schema: str = "main") -> bool:
+    return bool(run(f"SELECT 1 FROM {schema}.sqlite_master WHERE type='table' AND name=?", (name,), fetch=True))
+
+def init_db():
+    # 옛 장부면 먼저 최신 스키마로 올리고, 없는 테이블/인덱스/트리거를 만듦
+    migrate_db()
+    with transaction():
+        _create_tables()
+        for ddl in LOG_INDEXES:
+            run(ddl)
+        # 기존 DB 에 집계 테이블이 처음 생기면 한 번 채워 넣음
+        new_rollups = not _table_exists("monthly_item_totals")
+        for name in ROLLUP_TABLES:
+            create_table(name)
+        for ddl in ROLLUP_TRIGGERS:
+            run(ddl)
+        if new_rollups:
+            rebuild_rollups()
+        new_balances = not _table_exists("item_balances")
+        for name in STOCK_TABLES:
+            create_table(name)
+        for ddl in STOCK_INDEXES + STOCK_TRIGGERS:
+            run(ddl)
+        if new_balances:
+            rebuild_item_balances()
+        run(ARCHIVE_CATALOG)
+        run(ITEM_ALIASES)
+        for ddl in ADMIN_JOURNAL:
+            run(ddl)
+        create_table("admin_journal_logs")
+        new_fts = fts_available() and not _table_exists("logs_fts")
+        if new_fts:
+            run(NOTE_FTS.format(schema="main"))
+            for ddl in NOTE_FTS_TRIGGERS:
+                run(ddl)
+            rebuild_note_index()
+        # 새 장부는 처음부터 최신 스키마로 만들어짐
+        run(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        has_stats = run("SELECT 1 FROM sqlite_master WHERE name='sqlite_stat1'", fetch=True)
+    if not has_stats:
+        analyze_db()
+
+def analyze_db():
+    # 플래너 통계 갱신 (대량 입력/삭제 후)
+    run("ANALYZE")
+
+def vacuum_db():
+    # 삭제/보관으로 생긴 빈 페이지를 돌려주고 WAL 파일도 비움 (트랜잭션 밖에서만 가능)
+    run("VACUUM")
+    run("PRAGMA wal_checkpoint(TRUNCATE)")
+
+def db_free_bytes() -> int:
+    # VACUUM 으로 돌려받을 수 있는 빈 페이지 크기
+    free = run("PRAGMA freelist_count", fetch=True)[0][0]
+    return free * run("PRAGMA page_size", fetch=True)[0][0]
+
+def rebuild_rollups():
+    # 월별 집계를 logs(+보관 DB) 에서 처음부터 다시 계산
+    years = archive_years()
+    src = all_logs_sql(years, "ts, recipient_id, item_id, qty")
+    with transaction(attach=archive_attach(years)):
+        run("DELETE FROM monthly_item_totals")
+        run("DELETE FROM monthly_recipient_item_totals")
+        run(f"""
+            INSERT INTO monthly_item_totals(month, item_id, qty, n)
+            SELECT {ts_month('ts')}, item_id, SUM(qty), COUNT(*)
+            FROM {src} GROUP BY 1, 2
+        """)
+        run(f"""
+            INSERT INTO monthly_recipient_item_totals(month, recipient_id, item_id, qty, n)
+            SELECT {ts_month('ts')}, recipient_id, item_id, SUM(qty), COUNT(*)
+            FROM {src} GROUP BY 1, 2, 3
+        """)
+
+def _create_tables():
+    run("""
+        CREATE TABLE IF NOT EXISTS recipients (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            active INTEGER NOT NULL DEFAULT 1
+        )
+    """)
+    run("""
+        CREATE TABLE IF NOT EXISTS items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            active INTEGER NOT NULL DEFAULT 1
+        )
+    """)
+    create_table("logs")
+
+def rebuild_note_index(schema: str = "main"):
+    # 비고 색인을 logs 에서 다시 만듦 (기존 DB 채우기 / 색인 손상 시)
+    run(f"INSERT INTO {schema}.logs_fts(logs_fts) VALUES ('rebuild')")
+
+def rebuild_item_balances():
+    # 현재고를 전체 이력(+보관 DB)에서 다시 계산 (최소재고 설정은 유지)
+    years = archive_years()
+    src = all_logs_sql(years, "item_id, qty")
+    with transaction(attach=archive_attach(years)):
+        run("UPDATE item_balances SET on_hand = 0")
+        run(f"""
+            INSERT INTO item_balances(item_id, on_hand)
+            SELECT item_id, SUM(delta) FROM (
+                SELECT item_id, qty AS delta FROM receipts
+                UNION ALL SELECT item_id, delta FROM stock_adjustments
+                UNION ALL SELECT item_id, -qty FROM {src}
+            ) WHERE true
+            GROUP BY item_id
+            ON CONFLICT(item_id) DO UPDATE SET on_hand = excluded.on_hand
+        """)
+
+# =========================================================
+# 연도별 보관(archive) DB
+# =========================================================
+def archive_alias(year: int) -> str:
+    return f"arch_{int(year)}"
+
+def archive_path(year: int) -> Path:
+    base = Path(get_pool().path)
+    return base.with_name(f"{base.stem}_archive_{int(year)}.db")
+
+@cached_query
+def get_archives() -> List[Tuple[int, str, int, Optional[str], Optional[str], str]]:
+    if not _table_exists("log_archives"):
+        return []
+    return run("SELECT year, file, rows, min_ts, max_ts, archived_at FROM log_archives ORDER BY year", fetch=True)
+
+def archive_years(start=None, end=None) -> List[int]:
+    # [start, end] 와 겹치는 보관 연도만 (None 이면 그쪽은 열린 구간)
+    return [
+        year for year, *_rest in get_archives()
+        if (start is None or year >= start.year) and (end is None or year <= end.year)
+    ]
+
+def archive_attach(years: List[int]) -> Dict[str, Path]:
+    return {archive_alias(y): archive_path(y) for y in years}
+
+def all_logs_sql(years: List[int], columns: str) -> str:
+    # main.logs + 보관 DB logs 를 하나의 FROM 대상으로
+    if not years:
+        return "main.logs"
+    tables = ["main.logs"] + [f"{archive_alias(y)}.logs" for y in years]
+    return "(" + " UNION ALL ".join(f"SELECT {columns} FROM {t}" for t in tables) + ")"
+
+# 보관 DB 의 logs. 장부 logs 와 열 순서가 같아야 UNION ALL 로 합칠 수 있음
+ARCHIVE_LOGS = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY,
+        ts INTEGER NOT NULL,
+        recipient_id INTEGER NOT NULL,
+        item_id INTEGER NOT NULL,
+        qty INTEGER NOT NULL,
+        note TEXT
+    )""" + table_options()
+
+ARCHIVE_SCHEMA = (
+    ARCHIVE_LOGS.format(name="{a}.logs"),
+    "CREATE INDEX IF NOT EXISTS {a}.idx_logs_ts ON logs(ts, recipient_id, item_id, qty)",
+    "CREATE INDEX IF NOT EXISTS {a}.idx_logs_recipient_ts ON logs(recipient_id, ts, item_id, qty)",
+    "CREATE INDEX IF NOT EXISTS {a}.idx_logs_item_ts ON logs(item_id, ts, recipient_id, qty)",
+)
+
+# =========================================================
+# 스키마 버전 · 마이그레이션
+# =========================================================
+# PRAGMA user_version 이 장부의 스키마 버전. MIGRATIONS[i] 는 버전 i -> i+1 을 한 트랜잭션으로 (보관 DB 포함).
+# 새 단계는 끝에 덧붙이기만 하고, 이미 나간 단계는 고치지 않음
+_TS_TO_INT = "CASE WHEN typeof(ts) = 'text' THEN CAST(strftime('%s', ts) AS INTEGER) ELSE ts END"
+
+def _rebuild_table(ddl: str, table: str, schema: str = "main"):
+    # ddl({name}) 로 새로 만들어 옮겨 담고 바꿔 끼움 (ts 문자열은 정수로, 이미 정수면 그대로).
+    # 인덱스는 옛 테이블과 함께 지워지므로 호출자가 다시 만듦. AUTOINCREMENT 다음 번호는 유지
+    cols = [row[1] for row in run(f"PRAGMA {schema}.table_info({table})", fetch=True)]
+    select = ", ".join(_TS_TO_INT if c == "ts" else c for c in cols)
+    seq = []
+    if _table_exists("sqlite_sequence", schema):
+        seq = run(f"SELECT seq FROM {schema}.sqlite_sequence WHERE name = ?", (table,), fetch=True)
+    run(ddl.format(name=f"{schema}.{table}_new"))
+    run(f"INSERT INTO {schema}.{table}_new({', '.join(cols)}) SELECT {select} FROM {schema}.{table}")
+    run(f"DROP TABLE {schema}.{table}")
+    run(f"ALTER TABLE {schema}.{table}_new RENAME TO {table}")
+    if seq:
+        run(f"DELETE FROM {schema}.sqlite_sequence WHERE name = ?", (table,))
+        run(f"INSERT INTO {schema}.sqlite_sequence(name, seq) VALUES (?, ?)", (table, seq[0][0]))
+
+def _migrate_integer_ts(years: List[int]):
+    # 1: ts 'YYYY-MM-DD HH:MM:SS' 문자열 -> 정수 epoch 초, ts 가 든 테이블과 집계/재고 테이블을 STRICT 로
+    # 테이블을 바꿔 끼우는 동안 트리거가 없는 테이블을 가리키면 RENAME 이 실패하므로 모두 내렸다가 다시 올림
+    triggers = run("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'", fetch=True)
+    for name, _sql in triggers:
+        run(f"DROP TRIGGER {name}")
+    for table in TABLES:
+        if _table_exists(table):
+            _rebuild_table(TABLES[table], table)
+    # 처음 스키마(recipients/items/logs 만)에서 올라오는 장부엔 재고 테이블이 없음 -> init_db 가 만듦
+    for ddl in LOG_INDEXES:
+        run(ddl)
+    if _table_exists("receipts"):
+        for ddl in STOCK_INDEXES:
+            run(ddl)
+    # 월별 집계 트리거는 월 계산식이 바뀌었으므로 새 정의로
+    for name, sql in triggers:
+        if not name.startswith("trg_logs_rollup_"):
+            run(sql)
+    if any(name.startswith("trg_logs_rollup_") for name, _sql in triggers):
+        for ddl in ROLLUP_TRIGGERS:
+            run(ddl)
+    for year in years:
+        alias = archive_alias(year)
+        _rebuild_table(ARCHIVE_LOGS, "logs", alias)
+        for ddl in ARCHIVE_SCHEMA:
+            run(ddl.format(a=alias))
+
+MIGRATIONS: List[Callable[[List[int]], None]] = [
+    _migrate_integer_ts,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def schema_version() -> int:
+    return run("PRAGMA user_version", fetch=True)[0][0]
+
+def backup_db(tag: str) -> List[Path]:
+    # 장부와 보관 DB 를 <이름>_<tag>_<시각>.bak.db 로 복사 (온라인 백업 -> WAL 에만 있는 내용까지)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    saved = []
+    for src in [Path(get_pool().path)] + [archive_path(y) for y in archive_years()]:
+        if not src.exists():
+            continue
+        dst = src.with_name(f"{src.stem}_{tag}_{stamp}.bak{src.suffix}")
+        source, target = sqlite3.connect(src), sqlite3.connect(dst)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        saved.append(dst)
+    return saved
+
+def migrate_db() -> int:
+    # 장부를 SCHEMA_VERSION 까지 올림. 옛 장부면 먼저 백업하고 단계마다 커밋. 적용한 단계 수를 돌려줌
+    version = schema_version()
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"이 장부(스키마 {version})는 더 새 버전의 프로그램에서 만들어졌습니다. (지원: {SCHEMA_VERSION})"
+        )
+    if version == SCHEMA_VERSION or not _table_exists("logs"):
+        # 새 장부는 init_db 가 최신 스키마로 바로 만듦
+        return 0
+    backup_db(f"v{version}")
+    years = [y for y in archive_years() if archive_path(y).exists()]
+    for step in range(version, SCHEMA_VERSION):
+        with transaction(attach=archive_attach(years)):
+            MIGRATIONS[step](years)
+            run(f"PRAGMA user_version = {step + 1}")
+    # 옛 테이블 페이지를 돌려줘야 파일이 실제로 작아짐
+    vacuum_db()
+    analyze_db()
+    return SCHEMA_VERSION - version
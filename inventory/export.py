@@ -0,0 +1,113 @@
+"""지급 내역 CSV / Excel 내보내기."""
+import csv
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from .db import get_pool
+from .queries import LOG_COLUMNS, count_logs, iter_logs
+
+# 이 행 수를 넘으면 Excel 시트를 월별로 나눕니다. (한 시트 최대 1,048,576행)
+EXCEL_SHEET_ROWS = 100_000
+
+def write_logs_csv(path: Path, **filters) -> int:
+    n = 0
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        w = csv.writer(f)
+        w.writerow(LOG_COLUMNS)
+        for rows in iter_logs(**filters):
+            w.writerows(rows)
+            n += len(rows)
+    return n
+
+def write_rows_xlsx(path: Path, chunks: Iterable[List[tuple]], header: List[str], split: bool) -> int:
+    # 시간 역순 행 묶음을 시트로. split 이면 월별 시트 ("시간" 열 기준)
+    from openpyxl import Workbook
+
+    # write_only: 행을 바로 파일로 흘려보내므로 메모리가 행 수에 비례하지 않음
+    wb = Workbook(write_only=True)
+    ts_col = header.index("시간")
+    ws, sheet_key, part, sheet_rows, n = None, None, 0, 0, 0
+    for rows in chunks:
+        for row in rows:
+            ts = row[ts_col]
+            key = ts[:7] if split else "지급내역"
+            if ws is None or key != sheet_key or sheet_rows >= EXCEL_SHEET_ROWS:
+                # 한 달이 시트 한도를 넘으면 "2024-03 (2)" 처럼 이어서 만듦
+                part = part + 1 if key == sheet_key else 1
+                ws = wb.create_sheet(key if part == 1 else f"{key} ({part})")
+                ws.append(header)
+                sheet_key, sheet_rows = key, 0
+            row = list(row)
+            row[ts_col] = datetime.strptime(ts, "%Y-%m-%d %H:%M:%S")
+            ws.append(row)
+            sheet_rows += 1
+            n += 1
+    if ws is None:
+        wb.create_sheet("지급내역").append(header)
+    wb.save(path)
+    return n
+
+def write_logs_xlsx(path: Path, **filters) -> int:
+    return write_rows_xlsx(path, iter_logs(**filters), LOG_COLUMNS, count_logs(**filters) > EXCEL_SHEET_ROWS)
+
+EXPORT_WRITERS = {"csv": write_logs_csv, "xlsx": write_logs_xlsx}
+
+class ExportCache:
+    # 완성된 내보내기 파일을 (형식, 필터, 장부, data_version) 기준으로 디스크에 보관
+    def __init__(self, maxfiles: int = 8):
+        self.dir = Path(tempfile.mkdtemp(prefix="inventory_export_"))
+        self.maxfiles = maxfiles
+        self._files: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, suffix: str, build) -> Path:
+        with self._lock:
+            path = self._files.get(key)
+            if path is not None and path.exists():
+                self._files.move_to_end(key)
+                return path
+        fd, tmp = tempfile.mkstemp(suffix=suffix, dir=self.dir)
+        os.close(fd)
+        build(Path(tmp))
+        path = Path(tmp)
+        with self._lock:
+            self._files[key] = path
+            while len(self._files) > self.maxfiles:
+                _key, old = self._files.popitem(last=False)
+                old.unlink(missing_ok=True)
+        return path
+
+    def clear(self):
+        with self._lock:
+            self._files.clear()
+        shutil.rmtree(self.dir, ignore_errors=True)
+        self.dir.mkdir(parents=True, exist_ok=True)
+
+_export_cache: Optional[ExportCache] = None
+_export_cache_lock = threading.Lock()
+
+def get_export_cache() -> ExportCache:
+    global _export_cache
+    with _export_cache_lock:
+        if _export_cache is None:
+            _export_cache = ExportCache()
+        return _export_cache
+
+def export_key(kind: str, **filters):
+    # 장부 경로도 키에 (사업장마다 data_version 이 따로 매겨져 값이 겹칠 수 있음)
+    pool = get_pool()
+    return (kind, tuple(sorted(filters.items())), str(pool.path), pool.current_version())
+
+def export_logs(kind: str, **filters) -> Path:
+    # 같은 필터/같은 데이터면 이미 만든 파일을 그대로 돌려줌
+    writer = EXPORT_WRITERS[kind]
+    return get_export_cache().get_or_build(
+        export_key(kind, **filters), f".{kind}", lambda path: writer(path, **filters)
+    )
+
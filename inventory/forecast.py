@@ -0,0 +1,211 @@
+"""품목별 사용량 예측 · 재주문점 계산.
+
+최근 history_days 일의 지급 기록(load_log_columns 의 정수 배열)을 품목 × 날짜 행렬로 한 번에
+bincount 하고, 월별 집계(monthly_item_totals, 보관 연도 포함)로 달력 월별 계절 지수를 구해
+모든 품목을 품목 반복 없이 행렬 연산으로 계산합니다.
+
+    기본 사용률  = 최근 91일 사용량 / 그 기간의 계절 지수 합   (계절 효과를 뺀 하루 사용량)
+    예측 사용량  = 기본 사용률 × 앞으로 각 날짜의 계절 지수
+    재주문점     = 조달 기간 예측 사용량 + 안전재고 (z × 일 사용량 표준편차 × √조달 기간)
+    권장 발주량  = 재주문점 이하일 때 (조달 + 발주 주기) 예측 사용량 + 안전재고 - 현재고
+"""
+from datetime import date, timedelta
+from statistics import NormalDist
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .analytics import LogColumns, load_log_columns
+from .db import cached_query, run
+from .queries import get_all_items, get_all_recipients, get_item_balances
+
+BASE_DAYS = 91        # 기본 사용률 · 표준편차를 보는 기간
+SEASON_FULL_MONTHS = 24  # 이만큼(2년) 쌓여야 계절 지수를 그대로 씀 (그 전엔 1 쪽으로 줄임)
+SEASON_CLIP = (0.25, 4.0)
+
+def _day_index(d: date) -> int:
+    # ts 는 장부 시각을 UTC 로 본 epoch 초 -> // 86400 이 장부 날짜
+    return (d - date(1970, 1, 1)).days
+
+def _calendar_months(first_day: int, n_days: int) -> np.ndarray:
+    # 날짜 번호 구간 -> 달력 월 (0=1월 ... 11=12월)
+    days = np.arange(first_day, first_day + n_days).astype("datetime64[D]")
+    return days.astype("datetime64[M]").astype(np.int64) % 12
+
+def daily_usage(cols: LogColumns, first_day: int, n_days: int, width: int) -> np.ndarray:
+    # (품목 id, 날짜) 사용량 행렬. (품목, 날짜) 쌍을 정수 키 하나로 합쳐 bincount 한 번
+    day = cols.ts // 86400 - first_day
+    keep = (day >= 0) & (day < n_days)
+    key = cols.item_id[keep].astype(np.int64) * n_days + day[keep]
+    return np.bincount(key, weights=cols.qty[keep], minlength=width * n_days).reshape(width, n_days)
+
+@cached_query
+def seasonal_index(width: int, this_month: str) -> Tuple[np.ndarray, int]:
+    # (품목 id × 12 계절 지수, 쓴 달 수). 이번 달(진행 중)은 빼고 월별 집계 전체에서
+    rows = run("SELECT month, item_id, qty FROM monthly_item_totals WHERE month < ?", (this_month,), fetch=True)
+    index = np.ones((width, 12))
+    if not rows:
+        return index, 0
+    months = np.array([m for m, _i, _q in rows], dtype="datetime64[M]")
+    items = np.array([i for _m, i, _q in rows], dtype=np.int64)
+    qty = np.array([q for _m, _i, q in rows], dtype=np.float64)
+    keep = items < width
+    months, items, qty = months[keep], items[keep], qty[keep]
+
+    # 첫 집계 달부터 지난달까지 모든 달을 관측한 것으로 봄 (그 달에 안 쓴 품목은 0)
+    span = np.arange(months.min(), np.datetime64(this_month, "M"))
+    observed = np.bincount(span.astype(np.int64) % 12, minlength=12)
+    cal = months.astype(np.int64) % 12
+    totals = np.bincount(items * 12 + cal, weights=qty, minlength=width * 12).reshape(width, 12)
+    avg = np.divide(totals, observed, out=np.zeros_like(totals), where=observed > 0)
+    seen = observed > 0
+    level = avg[:, seen].mean(axis=1, keepdims=True)
+    raw = np.divide(avg, level, out=np.ones_like(avg), where=level > 0)
+    weight = min(1.0, len(span) / SEASON_FULL_MONTHS)
+    index[:, seen] = np.clip(1 + (raw[:, seen] - 1) * weight, *SEASON_CLIP)
+    index.flags.writeable = False
+    return index, len(span)
+
+def _usage_window(history_days: int, today: date) -> Tuple[LogColumns, int, int]:
+    # 어제까지 history_days 일 (오늘은 진행 중이라 뺌)
+    first = today - timedelta(days=history_days)
+    cols = load_log_columns(start=first, end=today - timedelta(days=1))
+    width = max([i for i, _n, _a in get_all_items()] + [int(cols.item_id.max()) if len(cols) else 0]) + 1
+    return cols, _day_index(first), width
+
+def forecast_items(
+    lead_days: int = 14,
+    review_days: int = 30,
+    service: float = 0.95,
+    history_days: int = 365,
+    today: Optional[date] = None,
+) -> pd.DataFrame:
+    # 활성 품목별 사용 속도 · 소진 예상 · 재주문점 · 권장 발주량.
+    # 기준일도 캐시 키에 넣어야 자정이 지나면 새로 계산됨
+    return _forecast_items(lead_days, review_days, service, history_days, today or date.today())
+
+@cached_query
+def _forecast_items(lead_days: int, review_days: int, service: float, history_days: int, today: date) -> pd.DataFrame:
+    cols, first_day, width = _usage_window(history_days, today)
+    usage = daily_usage(cols, first_day, history_days, width)
+    season, season_months = seasonal_index(width, today.strftime("%Y-%m"))
+
+    bal = get_item_balances()
+    ids = bal["id"].to_numpy(dtype=np.int64)
+    on_hand = bal["현재고"].to_numpy(dtype=np.float64)
+    min_qty = bal["최소재고"].to_numpy(dtype=np.float64)
+    usage, season = usage[ids], season[ids]
+
+    base_days = min(BASE_DAYS, history_days)
+    recent = usage[:, -base_days:]
+    hist_season = season[:, _calendar_months(first_day + history_days - base_days, base_days)]
+    base = recent.sum(axis=1) / hist_season.sum(axis=1)
+    sigma = recent.std(axis=1, ddof=1) if base_days > 1 else np.zeros(len(ids))
+
+    horizon = max(180, lead_days + review_days)
+    future = base[:, None] * season[:, _calendar_months(_day_index(today), horizon)]
+    cum = np.cumsum(future, axis=1)
+
+    # 누적 예측 사용량이 현재고를 넘는 첫날 (범위 안에 없거나 쓰지 않는 품목은 NaN)
+    runs_out = (cum >= on_hand[:, None]) & (cum > 0)
+    days_left = np.where(runs_out.any(axis=1), runs_out.argmax(axis=1) + 1, np.nan)
+    days_left[(on_hand <= 0) & (base > 0)] = 0
+
+    z = NormalDist().inv_cdf(service)
+    safety = z * sigma * np.sqrt(lead_days)
+    reorder_point = np.maximum(cum[:, lead_days - 1] + safety, min_qty)
+    order_up_to = cum[:, lead_days + review_days - 1] + safety
+    suggest = np.where(on_hand <= reorder_point, np.ceil(np.maximum(order_up_to - on_hand, 0)), 0)
+
+    def ma(days: int) -> np.ndarray:
+        return usage[:, -days:].sum(axis=1) / days
+
+    this_cal = today.month - 1
+    df = pd.DataFrame({
+        "id": ids,
+        "품목": bal["품목"],
+        "현재고": on_hand.astype(np.int64),
+        "최소재고": min_qty.astype(np.int64),
+        "7일 평균": ma(7).round(2),
+        "28일 평균": ma(28).round(2),
+        "91일 평균": ma(min(91, history_days)).round(2),
+        "주간 사용": (ma(28) * 7).round(1),
+        "계절 지수": season[:, this_cal].round(2),
+        "예측 일사용": future[:, 0].round(2),
+        "소진까지(일)": pd.array([None if np.isnan(d) else int(d) for d in days_left], dtype="Int64"),
+        "재주문점": np.ceil(reorder_point).astype(np.int64),
+        "권장 발주량": suggest.astype(np.int64),
+    })
+    df["소진 예상일"] = [
+        (today + timedelta(days=int(d))).isoformat() if not np.isnan(d) else "" for d in days_left
+    ]
+    df["상태"] = np.select(
+        [df["권장 발주량"] > 0, days_left <= lead_days + review_days],
+        ["발주 필요", "다음 주기 발주"],
+        default="여유",
+    )
+    df.attrs["season_months"] = season_months
+    return df.sort_values(["소진까지(일)", "품목"], na_position="last", ignore_index=True)
+
+def item_series(item_id: int, history_days: int = 365, horizon_days: int = 90, today: Optional[date] = None) -> pd.DataFrame:
+    # 차트용: 한 품목의 일별 사용량 + 7/28일 이동평균 + 앞으로의 예측
+    return _item_series(item_id, history_days, horizon_days, today or date.today())
+
+@cached_query
+def _item_series(item_id: int, history_days: int, horizon_days: int, today: date) -> pd.DataFrame:
+    cols, first_day, width = _usage_window(history_days, today)
+    if item_id >= width:
+        return pd.DataFrame(columns=["날짜", "사용량", "7일 평균", "28일 평균", "예측"])
+    usage = daily_usage(cols, first_day, history_days, width)[item_id]
+    season, _months = seasonal_index(width, today.strftime("%Y-%m"))
+    season = season[item_id]
+
+    cs = np.concatenate([[0.0], np.cumsum(usage)])
+    def rolling(days: int) -> np.ndarray:
+        out = np.full(history_days, np.nan)
+        out[days - 1:] = (cs[days:] - cs[:-days]) / days
+        return out
+
+    base_days = min(BASE_DAYS, history_days)
+    hist_season = season[_calendar_months(first_day + history_days - base_days, base_days)]
+    base = usage[-base_days:].sum() / hist_season.sum()
+    past = pd.DataFrame({
+        "날짜": pd.to_datetime(np.arange(first_day, first_day + history_days).astype("datetime64[D]")),
+        "사용량": usage,
+        "7일 평균": rolling(7),
+        "28일 평균": rolling(28),
+        "예측": np.nan,
+    })
+    future = pd.DataFrame({
+        "날짜": pd.to_datetime(np.arange(_day_index(today), _day_index(today) + horizon_days).astype("datetime64[D]")),
+        "사용량": np.nan,
+        "7일 평균": np.nan,
+        "28일 평균": np.nan,
+        "예측": base * season[_calendar_months(_day_index(today), horizon_days)],
+    })
+    return pd.concat([past, future], ignore_index=True)
+
+def recipient_rates(window_days: int = BASE_DAYS, today: Optional[date] = None) -> pd.DataFrame:
+    # 수령자 × 품목 하루 평균 사용량과 그 품목 전체 사용 중 비중 (0 인 조합은 뺌)
+    return _recipient_rates(window_days, today or date.today())
+
+@cached_query
+def _recipient_rates(window_days: int, today: date) -> pd.DataFrame:
+    cols, _first_day, width = _usage_window(window_days, today)
+    if not len(cols):
+        return pd.DataFrame(columns=["수령자", "품목", "일평균", "비중(%)"])
+    key = cols.recipient_id.astype(np.int64) * width + cols.item_id
+    rate = np.bincount(key, weights=cols.qty) / window_days
+    item_rate = np.bincount(cols.item_id, weights=cols.qty, minlength=width) / window_days
+    nz = np.flatnonzero(rate)
+    r_ids, i_ids = nz // width, nz % width
+    r_names = {rid: name for rid, name, _a in get_all_recipients()}
+    i_names = {iid: name for iid, name, _a in get_all_items()}
+    df = pd.DataFrame({
+        "수령자": [r_names.get(r, f"#{r}") for r in r_ids.tolist()],
+        "품목": [i_names.get(i, f"#{i}") for i in i_ids.tolist()],
+        "일평균": rate[nz].round(3),
+        "비중(%)": (rate[nz] / item_rate[i_ids] * 100).round(1),
+    })
+    return df.sort_values("일평균", ascending=False, ignore_index=True)
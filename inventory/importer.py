@@ -0,0 +1,244 @@
+"""예전 장부(CSV / Excel) 지급 기록 가져오기. (Streamlit 없이 실행 가능)
+
+    python -m inventory.importer 옛장부.xlsx --dry-run
+    python -m inventory.importer 옛장부.csv --create-missing
+
+파일을 한 줄씩 읽어 chunk_size 행마다 executemany 로 넣으므로 파일 전체를 메모리에 올리지 않습니다.
+첫 줄(엑셀은 시트마다 첫 줄)은 머리글이어야 하며, 내보내기 파일 형식(시간, 수령자, 품목, 수량, 비고)을
+그대로 받습니다.
+"""
+import argparse
+import csv
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from . import db
+from .db import TS_PARAM, analyze_db, run, run_many
+from .queries import add_items, add_recipients, prepare_db
+from .writer import queued_write
+
+# 머리글 이름 -> 표준 열
+HEADER_ALIASES = {
+    "시간": "ts", "일시": "ts", "날짜": "ts", "ts": "ts",
+    "수령자": "recipient", "이름": "recipient", "recipient": "recipient",
+    "품목": "item", "품명": "item", "item": "item",
+    "수량": "qty", "qty": "qty",
+    "비고": "note", "note": "note",
+}
+REQUIRED = ("ts", "recipient", "item", "qty")
+TS_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d", "%Y.%m.%d", "%Y/%m/%d", "%Y%m%d")
+MAX_ERRORS = 200  # 보고서에 남길 오류 줄 수 (개수는 모두 셈)
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    valid: int = 0
+    imported: int = 0
+    error_count: int = 0
+    errors: List[Tuple[str, int, str]] = field(default_factory=list)
+    new_recipients: Set[str] = field(default_factory=set)
+    new_items: Set[str] = field(default_factory=set)
+    min_ts: Optional[str] = None
+    max_ts: Optional[str] = None
+    seconds: float = 0.0
+
+    def error(self, sheet: str, line: int, reason: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((sheet, line, reason))
+
+    def summary(self) -> str:
+        lines = [
+            f"읽은 행 {self.rows:,} / 정상 {self.valid:,} / 오류 {self.error_count:,} / 저장 {self.imported:,} ({self.seconds:.1f}초)",
+        ]
+        if self.min_ts:
+            lines.append(f"기간 {self.min_ts} ~ {self.max_ts}")
+        if self.new_recipients:
+            lines.append(f"새 수령자 {len(self.new_recipients)}명: {', '.join(sorted(self.new_recipients)[:20])}")
+        if self.new_items:
+            lines.append(f"새 품목 {len(self.new_items)}종: {', '.join(sorted(self.new_items)[:20])}")
+        lines += [f"[{sheet}:{line}] {reason}" for sheet, line, reason in self.errors[:20]]
+        return "\n".join(lines)
+
+# =========================================================
+# 파일 읽기 (스트리밍)
+# =========================================================
+def _csv_rows(path: Path) -> Iterator[Tuple[str, int, list]]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for line, row in enumerate(csv.reader(f), start=1):
+            yield path.name, line, row
+
+def _xlsx_rows(path: Path) -> Iterator[Tuple[str, int, list]]:
+    from openpyxl import load_workbook
+
+    # read_only: 시트를 통째로 읽지 않고 행 단위로 풀어 냄
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            for line, row in enumerate(ws.iter_rows(values_only=True), start=1):
+                yield ws.title, line, list(row)
+    finally:
+        wb.close()
+
+def iter_source_rows(path: Path) -> Iterator[Tuple[str, int, list]]:
+    if path.suffix.lower() in (".xlsx", ".xlsm"):
+        return _xlsx_rows(path)
+    return _csv_rows(path)
+
+# =========================================================
+# 값 검사
+# =========================================================
+def parse_ts(value) -> str:
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, date):
+        return value.strftime("%Y-%m-%d 00:00:00")
+    text = str(value or "").strip()
+    if len(text) == 19 and text[4] == "-" and text[10] == " ":
+        # 내보내기 형식 그대로면 strptime 보다 훨씬 빠른 fromisoformat 으로 검사만
+        try:
+            datetime.fromisoformat(text)
+            return text
+        except ValueError:
+            pass
+    for fmt in TS_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime("%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            continue
+    raise ValueError(f"시간 형식을 알 수 없습니다: {text!r}")
+
+def parse_qty(value) -> int:
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    qty = int(str(value).strip().replace(",", ""))
+    if qty <= 0:
+        raise ValueError(f"수량은 1 이상이어야 합니다: {qty}")
+    return qty
+
+def _header_map(row: list) -> Optional[Dict[str, int]]:
+    cols = {}
+    for i, cell in enumerate(row):
+        key = HEADER_ALIASES.get(str(cell or "").strip())
+        if key and key not in cols:
+            cols[key] = i
+    return cols if all(k in cols for k in REQUIRED) else None
+
+def _cell(row: list, header: Dict[str, int], key: str):
+    i = header.get(key)
+    return row[i] if i is not None and i < len(row) else None
+
+def _name_ids(table: str) -> Dict[str, int]:
+    return {name: rid for rid, name in run(f"SELECT id, name FROM {table}", fetch=True)}
+
+@queued_write
+def _insert_chunk(rows: List[tuple]) -> int:
+    # ts 는 parse_ts 로 검사한 문자열 -> 정수 변환은 SQLite 에서
+    return run_many(f"INSERT INTO logs(ts, recipient_id, item_id, qty, note) VALUES ({TS_PARAM}, ?, ?, ?, ?)", rows)
+
+# =========================================================
+# 가져오기
+# =========================================================
+def import_logs(
+    path: Path,
+    dry_run: bool = False,
+    create_missing: bool = False,
+    chunk_size: int = 50_000,
+) -> ImportReport:
+    # dry_run: 저장 없이 검사만. create_missing: 없는 수령자/품목은 새로 등록 (아니면 그 행은 오류)
+    t0 = time.perf_counter()
+    path = Path(path)
+    report = ImportReport()
+    recipients, items = _name_ids("recipients"), _name_ids("items")
+    header: Optional[Dict[str, int]] = None
+    sheet_seen = None
+    chunk: List[tuple] = []
+    pending: List[tuple] = []  # 새 이름이 들어 있는 행 (등록 후 id 를 채움)
+
+    def flush():
+        nonlocal chunk, pending
+        if pending:
+            new_r = {r for _ts, r, _i, _q, _n in pending if r not in recipients}
+            new_i = {i for _ts, _r, i, _q, _n in pending if i not in items}
+            if new_r:
+                add_recipients(sorted(new_r))
+                recipients.update(_name_ids("recipients"))
+            if new_i:
+                add_items(sorted(new_i))
+                items.update(_name_ids("items"))
+            chunk += [(ts, recipients[r], items[i], q, n) for ts, r, i, q, n in pending]
+        if chunk:
+            report.imported += _insert_chunk(chunk)
+        chunk, pending = [], []
+
+    for sheet, line, row in iter_source_rows(path):
+        if sheet != sheet_seen:
+            sheet_seen, header = sheet, None
+        if header is None:
+            header = _header_map(row)
+            if header is None and line == 1:
+                report.error(sheet, line, "머리글(시간, 수령자, 품목, 수량)을 찾지 못했습니다.")
+            continue
+        if not any(c not in (None, "") for c in row):
+            continue
+        report.rows += 1
+        try:
+            ts = parse_ts(_cell(row, header, "ts"))
+            qty = parse_qty(_cell(row, header, "qty"))
+            recip = str(_cell(row, header, "recipient") or "").strip()
+            item = str(_cell(row, header, "item") or "").strip()
+            if not recip or not item:
+                raise ValueError("수령자/품목이 비어 있습니다.")
+        except ValueError as e:
+            report.error(sheet, line, str(e))
+            continue
+        note = _cell(row, header, "note")
+        note = (str(note).strip() or None) if note is not None else None
+
+        missing_r, missing_i = recip not in recipients, item not in items
+        if (missing_r or missing_i) and not create_missing:
+            report.error(sheet, line, f"등록되지 않은 {'수령자' if missing_r else '품목'}: {recip if missing_r else item}")
+            continue
+        if missing_r:
+            report.new_recipients.add(recip)
+        if missing_i:
+            report.new_items.add(item)
+
+        report.valid += 1
+        report.min_ts = ts if report.min_ts is None else min(report.min_ts, ts)
+        report.max_ts = ts if report.max_ts is None else max(report.max_ts, ts)
+        if dry_run:
+            continue
+        if missing_r or missing_i:
+            pending.append((ts, recip, item, qty, note))
+        else:
+            chunk.append((ts, recipients[recip], items[item], qty, note))
+        if len(chunk) + len(pending) >= chunk_size:
+            flush()
+
+    if not dry_run:
+        flush()
+        if report.imported:
+            analyze_db()
+    report.seconds = time.perf_counter() - t0
+    return report
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="CSV / Excel 지급 기록 가져오기")
+    ap.add_argument("file", help="가져올 .csv 또는 .xlsx")
+    ap.add_argument("--db", default=str(db.DB_PATH), help="대상 DB 파일 (기본: inventory.db)")
+    ap.add_argument("--dry-run", action="store_true", help="저장하지 않고 검사 결과만")
+    ap.add_argument("--create-missing", action="store_true", help="없는 수령자/품목은 새로 등록")
+    ap.add_argument("--chunk-size", type=int, default=50_000)
+    args = ap.parse_args(argv)
+
+    db.DB_PATH = Path(args.db)
+    prepare_db()
+    report = import_logs(Path(args.file), args.dry_run, args.create_missing, args.chunk_size)
+    print(report.summary())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""쿼리 / 화면 실행 시간 계측.
+
+import 하면 db 의 run() / run_many() / iter_rows() 에 훅이 걸립니다. 기록은 메모리의 고정 크기 버퍼에 남고,
+INVENTORY_PERF_LOG=1 이면 장부 옆 <이름>_perf.db 의 perf_log 테이블에도 저장합니다.
+(장부 DB 에 쓰면 data_version 이 바뀌어 조회 캐시가 매번 비워지므로 파일을 분리)
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Deque, Dict, List, Optional
+
+import pandas as pd
+
+from . import db
+
+# 이보다 느린 조회/쓰기는 EXPLAIN QUERY PLAN 을 함께 남김 (run_many 는 첫 행의 값으로)
+SLOW_QUERY_MS = 50.0
+_EXPLAINABLE = ("SELECT", "WITH ", "INSERT", "UPDATE", "DELETE", "REPLAC")
+
+_WS = re.compile(r"\s+")
+
+def _normalize(sql: str) -> str:
+    return _WS.sub(" ", sql).strip()
+
+class PerfMonitor:
+    def __init__(self, max_queries: int = 1000, max_pages: int = 200):
+        self.queries: Deque[dict] = deque(maxlen=max_queries)
+        self.pages: Dict[str, Deque[float]] = {}
+        self.max_pages = max_pages
+        self.slow_ms = SLOW_QUERY_MS
+        self.persist = os.environ.get("INVENTORY_PERF_LOG") == "1"
+        self._pending: List[tuple] = []
+        self._lock = threading.Lock()
+        self._log_conn: Optional[sqlite3.Connection] = None
+
+    # ---------- 기록 ----------
+    def on_query(self, conn: sqlite3.Connection, query: str, params, ms: float, rows: int):
+        sql = _normalize(query)
+        plan = None
+        if ms >= self.slow_ms and params is not None and sql[:6].upper() in _EXPLAINABLE:
+            try:
+                plan = "\n".join(r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + query, params))
+            except sqlite3.Error:
+                pass
+        rec = {"시각": datetime.now(), "SQL": sql, "ms": ms, "행": rows, "실행계획": plan}
+        with self._lock:
+            self.queries.append(rec)
+            if self.persist:
+                self._pending.append(("query", sql, ms, rows, plan))
+
+    def record_page(self, page: str, ms: float):
+        with self._lock:
+            self.pages.setdefault(page, deque(maxlen=self.max_pages)).append(ms)
+            if self.persist:
+                self._pending.append(("page", page, ms, None, None))
+        self.flush()
+
+    def page_timer(self, page: str) -> "PageTimer":
+        return PageTimer(self, page)
+
+    def clear(self):
+        with self._lock:
+            self.queries.clear()
+            self.pages.clear()
+
+    # ---------- perf_log 저장 ----------
+    def log_path(self) -> Path:
+        path = Path(db.DB_PATH)
+        return path.with_name(f"{path.stem}_perf.db")
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return
+            if self._log_conn is None:
+                self._log_conn = sqlite3.connect(self.log_path(), check_same_thread=False)
+                self._log_conn.execute("PRAGMA journal_mode = WAL;")
+                self._log_conn.execute("""
+                    CREATE TABLE IF NOT EXISTS perf_log (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        ts TEXT NOT NULL DEFAULT (datetime('now', 'localtime')),
+                        kind TEXT NOT NULL,
+                        name TEXT NOT NULL,
+                        ms REAL NOT NULL,
+                        rows INTEGER,
+                        plan TEXT
+                    )
+                """)
+            with self._log_conn:
+                self._log_conn.executemany(
+                    "INSERT INTO perf_log(kind, name, ms, rows, plan) VALUES (?, ?, ?, ?, ?)", pending
+                )
+
+    # ---------- 요약 ----------
+    def slowest_queries(self, n: int = 20) -> pd.DataFrame:
+        with self._lock:
+            recs = list(self.queries)
+        df = pd.DataFrame(recs, columns=["시각", "SQL", "ms", "행", "실행계획"])
+        return df.sort_values("ms", ascending=False).head(n).reset_index(drop=True)
+
+    def query_summary(self) -> pd.DataFrame:
+        with self._lock:
+            recs = list(self.queries)
+        if not recs:
+            return pd.DataFrame(columns=["SQL", "횟수", "p50 ms", "p95 ms", "최대 ms", "전체 스캔"])
+        df = pd.DataFrame(recs)
+        df["전체 스캔"] = df["실행계획"].fillna("").str.contains(r"\bSCAN\b(?! CONSTANT)", regex=True)
+        g = df.groupby("SQL")
+        out = pd.DataFrame({
+            "횟수": g["ms"].size(),
+            "p50 ms": g["ms"].quantile(0.5),
+            "p95 ms": g["ms"].quantile(0.95),
+            "최대 ms": g["ms"].max(),
+            "전체 스캔": g["전체 스캔"].any(),
+        }).reset_index()
+        return out.sort_values("p95 ms", ascending=False).reset_index(drop=True)
+
+    def page_summary(self) -> pd.DataFrame:
+        with self._lock:
+            pages = {k: list(v) for k, v in self.pages.items()}
+        rows = [
+            (page, len(v), pd.Series(v).quantile(0.5), pd.Series(v).quantile(0.95), max(v))
+            for page, v in pages.items() if v
+        ]
+        return pd.DataFrame(rows, columns=["화면", "횟수", "p50 ms", "p95 ms", "최대 ms"])
+
+class PageTimer:
+    # app.py 가 화면 본문을 try/finally 로 감싸 st.stop()/st.rerun() 으로 끝난 실행도 stop() 을 부름
+    def __init__(self, monitor: PerfMonitor, page: str):
+        self.monitor = monitor
+        self.page = page
+        self.t0 = time.perf_counter()
+
+    def stop(self) -> float:
+        ms = (time.perf_counter() - self.t0) * 1000
+        self.monitor.record_page(self.page, ms)
+        return ms
+
+def db_size() -> Dict[str, int]:
+    path = Path(db.get_pool().path)
+    sizes = {}
+    for suffix in ("", "-wal", "-shm"):
+        f = Path(f"{path}{suffix}")
+        sizes[f.name] = f.stat().st_size if f.exists() else 0
+    return sizes
+
+_monitor = PerfMonitor()
+db.add_query_hook(_monitor.on_query)
+
+def get_monitor() -> PerfMonitor:
+    return _monitor
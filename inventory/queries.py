@@ -0,0 +1,399 @@
+"""장부 조회/기록 함수. (Streamlit 없이 import 가능)"""
+import threading
+import pandas as pd
+from datetime import datetime, date, timedelta
+from pathlib import Path
+from typing import Optional, List, Tuple, Iterator, Dict
+
+from .db import (
+    ANALYZE_THRESHOLD, analyze_db, archive_alias, archive_attach, archive_years, cached_query,
+    from_ts, get_archives, get_pool, init_db, iter_rows, run, run_many, to_ts, transaction, ts_text,
+)
+from .writer import queued_write
+
+# =========================================================
+# 초기 데이터 (명단/품목)
+# =========================================================
+DEFAULT_RECIPIENTS = [
+    "김순영","노나경","김감열","임금란","최점순","최명숙","김상임","김일란",
+    "정정화","이순옥","김영경","정해동","박선옥","박영순","우미진","우시은",
+    "장기현","박승욱"
+]
+
+DEFAULT_ITEMS = [
+    "핸드타올","점보롤",
+    "락스","박리제","왁스","물비누","소독제","세수비누","빨래비누","하이타이",
+    "쓰레기봉투(100L)","쓰레기봉투(75L)","쓰레기봉투(50L)","쓰레기봉투(20L)",
+    "고무장갑","장갑","수세미(녹색)","수세미(철)","극세사수건","마대걸레","기름걸레",
+    "갈대빗자루","플라스틱빗자루","쓰레받이(대)","쓰레받이(소)",
+    "빠께스","변기솔","금속광택제","바가지",
+    "위생비닐","위생봉투컵","검정비닐","헤라"
+]
+
+_prepared = set()
+_prepare_lock = threading.Lock()
+
+def prepare_db():
+    # 스키마 생성 + 기본 명단 시드. DB 파일마다 프로세스당 한 번만 실행
+    path = str(get_pool().path)
+    if path in _prepared:
+        return
+    with _prepare_lock:
+        if path not in _prepared:
+            init_db()
+            seed_if_empty()
+            _prepared.add(path)
+
+def seed_if_empty():
+    r_cnt = run("SELECT COUNT(*) FROM recipients", fetch=True)[0][0]
+    i_cnt = run("SELECT COUNT(*) FROM items", fetch=True)[0][0]
+
+    with transaction():
+        if r_cnt == 0:
+            add_recipients(DEFAULT_RECIPIENTS)
+        if i_cnt == 0:
+            add_items(DEFAULT_ITEMS)
+
+# =========================================================
+# 장부 조회 · 기록
+# =========================================================
+@cached_query
+def get_active_recipients() -> List[Tuple[int, str]]:
+    return run("SELECT id, name FROM recipients WHERE active=1 ORDER BY name", fetch=True)
+
+@cached_query
+def get_active_items() -> List[Tuple[int, str]]:
+    return run("SELECT id, name FROM items WHERE active=1 ORDER BY name", fetch=True)
+
+@cached_query
+def get_all_recipients():
+    return run("SELECT id, name, active FROM recipients ORDER BY name", fetch=True)
+
+@cached_query
+def get_all_items():
+    return run("SELECT id, name, active FROM items ORDER BY name", fetch=True)
+
+def insert_log(ts: datetime, recipient_id: int, item_id: int, qty: int, note: Optional[str]):
+    insert_logs_bulk([(ts, recipient_id, item_id, qty, note)])
+
+LogRow = Tuple[datetime, int, int, int, Optional[str]]
+
+@queued_write
+def insert_logs_bulk(rows: List[LogRow]) -> int:
+    # (ts, recipient_id, item_id, qty, note) 목록을 한 번에 커밋
+    n = run_many(
+        "INSERT INTO logs(ts, recipient_id, item_id, qty, note) VALUES (?, ?, ?, ?, ?)",
+        [(to_ts(ts), rid, iid, qty, note) for ts, rid, iid, qty, note in rows]
+    )
+    if len(rows) >= ANALYZE_THRESHOLD:
+        analyze_db()
+    return n
+
+LOG_COLUMNS = ["id", "시간", "수령자", "품목", "수량", "비고"]
+
+# {ts}: 화면용은 정수 그대로 (DataFrame 에서 한 번에 변환), 파일/시트용은 ts_text 로 문자열
+_LOG_SELECT = """
+    SELECT
+        l.id,
+        {ts},
+        r.name AS recipient,
+        i.name AS item,
+        l.qty,
+        COALESCE(l.note, '') AS note
+    FROM {source}
+    JOIN recipients r ON r.id = l.recipient_id
+    JOIN items i ON i.id = l.item_id
+"""
+
+def _log_filters(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    recipient_id: Optional[int] = None,
+    item_id: Optional[int] = None,
+    before: Optional[Tuple[int, int]] = None
+) -> Tuple[str, list]:
+    where = []
+    params = []
+
+    # [start, end+1일) 반열린 구간의 ts 로 비교해야 인덱스를 탑니다. (date(ts) 처럼 컬럼을 감싸면 전체 스캔)
+    if start:
+        where.append("l.ts >= ?")
+        params.append(to_ts(start))
+    if end:
+        where.append("l.ts < ?")
+        params.append(to_ts(end + timedelta(days=1)))
+    if recipient_id:
+        where.append("l.recipient_id = ?")
+        params.append(recipient_id)
+    if item_id:
+        where.append("l.item_id = ?")
+        params.append(item_id)
+    # 키셋 페이지: 직전 페이지 마지막 행 (ts, id) 보다 오래된 행부터
+    if before:
+        where.append("(l.ts, l.id) < (?, ?)")
+        params.extend(before)
+
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+    return where_sql, params
+
+def _log_source(
+    limit: Optional[int] = None, **filters
+) -> Tuple[str, str, list, Dict[str, Path]]:
+    # (FROM 대상, WHERE, 파라미터, ATTACH 할 보관 DB)
+    # 기간이 겹치는 보관 연도가 있으면 main.logs 와 UNION ALL. 조건(과 LIMIT)은 각 갈래 안에
+    # 넣어야 갈래마다 인덱스를 타고, 최신순 LIMIT 도 갈래당 limit 행만 읽습니다.
+    where_sql, params = _log_filters(**filters)
+    years = archive_years(filters.get("start"), filters.get("end"))
+    if not years:
+        return "logs l", where_sql, params, {}
+
+    arms, all_params = [], []
+    for table in ["main.logs"] + [f"{archive_alias(y)}.logs" for y in years]:
+        arm = f"SELECT l.id, l.ts, l.recipient_id, l.item_id, l.qty, l.note FROM {table} l {where_sql}"
+        if limit:
+            arm = f"SELECT * FROM ({arm} ORDER BY l.ts DESC, l.id DESC LIMIT {int(limit)})"
+        arms.append(arm)
+        all_params += params
+    return "(" + " UNION ALL ".join(arms) + ") l", "", all_params, archive_attach(years)
+
+@cached_query
+def read_logs(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    recipient_id: Optional[int] = None,
+    item_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    before: Optional[Tuple[int, int]] = None
+) -> pd.DataFrame:
+    source, where_sql, params, attach = _log_source(
+        limit, start=start, end=end, recipient_id=recipient_id, item_id=item_id, before=before
+    )
+    limit_sql = ""
+    if limit:
+        limit_sql = "LIMIT ?"
+        params.append(int(limit))
+
+    rows = run(f"""
+        {_LOG_SELECT.format(ts="l.ts", source=source)}
+        {where_sql}
+        ORDER BY l.ts DESC, l.id DESC
+        {limit_sql}
+    """, tuple(params), fetch=True, attach=attach)
+
+    return _log_frame(rows)
+
+def _log_frame(rows: List[tuple]) -> pd.DataFrame:
+    # 정수 ts 열은 문자열 파싱 없이 한 번에 datetime64 로
+    df = pd.DataFrame(rows, columns=LOG_COLUMNS)
+    df["시간"] = pd.to_datetime(df["시간"].astype("int64"), unit="s")
+    return df
+
+@cached_query
+def count_logs(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    recipient_id: Optional[int] = None,
+    item_id: Optional[int] = None
+) -> int:
+    source, where_sql, params, attach = _log_source(start=start, end=end, recipient_id=recipient_id, item_id=item_id)
+    return run(f"SELECT COUNT(*) FROM {source} {where_sql}", tuple(params), fetch=True, attach=attach)[0][0]
+
+@cached_query
+def get_log_date_range() -> Optional[Tuple[date, date]]:
+    # idx_logs_ts 의 양 끝만 읽음. 보관된 기간은 log_archives 목록에서
+    days = [from_ts(ts).date() for ts in run("SELECT MIN(ts), MAX(ts) FROM logs", fetch=True)[0] if ts is not None]
+    for _year, _file, _rows, a_lo, a_hi, _at in get_archives():
+        if a_lo is not None:
+            days += [date.fromisoformat(a_lo[:10]), date.fromisoformat(a_hi[:10])]
+    if not days:
+        return None
+    return min(days), max(days)
+
+def log_cursor(df: pd.DataFrame) -> Tuple[int, int]:
+    # read_logs 결과의 마지막 행 -> 다음 페이지용 before 커서
+    last = df.iloc[-1]
+    return to_ts(last["시간"]), int(last["id"])
+
+def iter_logs(chunk_size: int = 5000, **filters) -> Iterator[List[tuple]]:
+    # 커서에서 chunk_size 행씩 꺼내므로 결과 전체를 메모리에 올리지 않음. 시간은 'YYYY-MM-DD HH:MM:SS' 문자열
+    source, where_sql, params, attach = _log_source(**filters)
+    select = _LOG_SELECT.format(ts=ts_text("l.ts"), source=source)
+    yield from iter_rows(f"{select} {where_sql} ORDER BY l.ts DESC, l.id DESC", params, chunk_size, attach)
+
+def _note_terms(text: str) -> Tuple[str, List[str]]:
+    # (FTS MATCH 식, LIKE 로 찾을 짧은 낱말). trigram 색인은 3글자 이상만 찾음
+    terms = text.split()
+    match = " AND ".join('"' + t.replace('"', '""') + '"' for t in terms if len(t) >= 3)
+    return match, [t for t in terms if len(t) < 3]
+
+@cached_query
+def search_logs(
+    text: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    recipient_id: Optional[int] = None,
+    item_id: Optional[int] = None,
+    limit: int = 500
+) -> pd.DataFrame:
+    # 비고 검색 + 기존 필터, 최신순. 겹치는 보관 DB 도 함께
+    # (bm25 점수는 색인마다 따로 매겨져 장부/보관 DB 사이에 비교할 수 없고, 짧은 비고에선 의미도 적음)
+    match, short = _note_terms(text)
+    if not match and not short:
+        return pd.DataFrame(columns=LOG_COLUMNS)
+    where_sql, params = _log_filters(start, end, recipient_id, item_id)
+    conds = [where_sql[len("WHERE "):]] if where_sql else []
+    conds += ["l.note LIKE ?"] * len(short)
+    params += [f"%{t}%" for t in short]
+
+    years = archive_years(start, end)
+    attach = archive_attach(years)
+    arms, all_params = [], []
+    for schema in ["main"] + [archive_alias(y) for y in years]:
+        has_fts = bool(match) and bool(run(
+            f"SELECT 1 FROM {schema}.sqlite_master WHERE name='logs_fts'", fetch=True, attach=attach
+        ))
+        arm_conds = list(conds)
+        if has_fts:
+            source = f"{schema}.logs_fts f JOIN {schema}.logs l ON l.id = f.rowid"
+            arm_conds.insert(0, "f.logs_fts MATCH ?")
+            arm_params = [match] + params
+        else:
+            # 색인이 없으면 (FTS5 없는 SQLite / 옛 보관 DB) LIKE 로
+            source = f"{schema}.logs l"
+            long_terms = [t for t in text.split() if len(t) >= 3]
+            arm_conds += ["l.note LIKE ?"] * len(long_terms)
+            arm_params = params + [f"%{t}%" for t in long_terms]
+        arms.append(
+            f"SELECT l.id, l.ts, l.recipient_id, l.item_id, l.qty, l.note "
+            f"FROM {source} WHERE {' AND '.join(arm_conds)}"
+        )
+        all_params += arm_params
+
+    # CROSS JOIN: 걸러낸 기록을 바깥 루프로 고정 (아니면 LIKE 갈래를 수령자 인덱스로 돌며 전체를 뒤짐)
+    rows = run(f"""
+        SELECT l.id, l.ts, r.name, i.name, l.qty, COALESCE(l.note, '')
+        FROM ({" UNION ALL ".join(arms)}) l
+        CROSS JOIN recipients r ON r.id = l.recipient_id
+        CROSS JOIN items i ON i.id = l.item_id
+        ORDER BY l.ts DESC, l.id DESC
+        LIMIT ?
+    """, tuple(all_params) + (int(limit),), fetch=True, attach=attach)
+    return _log_frame(rows)
+
+@cached_query
+def get_rollup_months() -> List[str]:
+    return [m for (m,) in run("SELECT DISTINCT month FROM monthly_item_totals ORDER BY month", fetch=True)]
+
+@cached_query
+def monthly_item_stats(month: str) -> pd.DataFrame:
+    rows = run("""
+        SELECT i.name, t.qty
+        FROM monthly_item_totals t
+        JOIN items i ON i.id = t.item_id
+        WHERE t.month = ?
+        ORDER BY t.qty DESC
+    """, (month,), fetch=True)
+    return pd.DataFrame(rows, columns=["품목", "수량"])
+
+@cached_query
+def monthly_recipient_stats(month: str) -> pd.DataFrame:
+    rows = run("""
+        SELECT r.name, SUM(t.qty) AS qty
+        FROM monthly_recipient_item_totals t
+        JOIN recipients r ON r.id = t.recipient_id
+        WHERE t.month = ?
+        GROUP BY t.recipient_id
+        ORDER BY qty DESC
+    """, (month,), fetch=True)
+    return pd.DataFrame(rows, columns=["수령자", "수량"])
+
+@cached_query
+def monthly_recipient_item_stats(month: str) -> pd.DataFrame:
+    rows = run("""
+        SELECT r.name, i.name, t.qty
+        FROM monthly_recipient_item_totals t
+        JOIN recipients r ON r.id = t.recipient_id
+        JOIN items i ON i.id = t.item_id
+        WHERE t.month = ?
+    """, (month,), fetch=True)
+    return pd.DataFrame(rows, columns=["수령자", "품목", "수량"])
+
+# =========================================================
+# 관리: 명단 추가 (일괄 수정 · 삭제는 admin.py)
+# =========================================================
+def _add_names(table: str, names: List[str]) -> int:
+    cleaned = [(n,) for n in dict.fromkeys(n.strip() for n in names) if n]
+    if not cleaned:
+        return 0
+    return run_many(f"INSERT OR IGNORE INTO {table}(name, active) VALUES (?, 1)", cleaned)
+
+@queued_write
+def add_recipients(names: List[str]):
+    _add_names("recipients", names)
+
+@queued_write
+def add_items(names: List[str]):
+    _add_names("items", names)
+
+# ====== 재고(입고/조정) ======
+@queued_write
+def insert_receipt(ts: datetime, item_id: int, qty: int, note: Optional[str]):
+    run(
+        "INSERT INTO receipts(ts, item_id, qty, note) VALUES (?, ?, ?, ?)",
+        (to_ts(ts), item_id, qty, note)
+    )
+
+@queued_write
+def insert_adjustment(ts: datetime, item_id: int, delta: int, reason: Optional[str]):
+    run(
+        "INSERT INTO stock_adjustments(ts, item_id, delta, reason) VALUES (?, ?, ?, ?)",
+        (to_ts(ts), item_id, delta, reason)
+    )
+
+@queued_write
+def set_stock_count(ts: datetime, item_id: int, counted: int, reason: Optional[str]) -> int:
+    # 실사 수량과 장부 재고의 차이를 조정 기록으로 남김
+    with transaction():
+        row = run("SELECT on_hand FROM item_balances WHERE item_id=?", (item_id,), fetch=True)
+        delta = counted - (row[0][0] if row else 0)
+        if delta:
+            insert_adjustment(ts, item_id, delta, reason)
+        return delta
+
+@queued_write
+def set_min_qty(item_id: int, min_qty: int):
+    run("""
+        INSERT INTO item_balances(item_id, min_qty) VALUES (?, ?)
+        ON CONFLICT(item_id) DO UPDATE SET min_qty = excluded.min_qty
+    """, (item_id, int(min_qty)))
+
+@queued_write
+def set_min_qtys(pairs: List[Tuple[int, int]]) -> int:
+    # (품목 id, 최소재고) 여러 개를 한 번에 (쓰기 스레드의 한 커밋)
+    return run_many("""
+        INSERT INTO item_balances(item_id, min_qty) VALUES (?, ?)
+        ON CONFLICT(item_id) DO UPDATE SET min_qty = excluded.min_qty
+    """, [(int(item_id), int(min_qty)) for item_id, min_qty in pairs])
+
+@cached_query
+def get_item_balances() -> pd.DataFrame:
+    rows = run("""
+        SELECT i.id, i.name, COALESCE(b.on_hand, 0), COALESCE(b.min_qty, 0)
+        FROM items i
+        LEFT JOIN item_balances b ON b.item_id = i.id
+        WHERE i.active = 1
+        ORDER BY i.name
+    """, fetch=True)
+    return pd.DataFrame(rows, columns=["id", "품목", "현재고", "최소재고"])
+
+@cached_query
+def get_low_stock() -> List[Tuple[str, int, int]]:
+    # 최소재고가 설정된 품목 중 현재고가 그 이하인 것
+    return run("""
+        SELECT i.name, b.on_hand, b.min_qty
+        FROM item_balances b
+        JOIN items i ON i.id = b.item_id
+        WHERE i.active = 1 AND b.min_qty > 0 AND b.on_hand <= b.min_qty
+        ORDER BY b.on_hand - b.min_qty, i.name
+    """, fetch=True)
+
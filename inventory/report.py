@@ -0,0 +1,174 @@
+"""월간 소모품 사용 보고서 (PDF).
+
+월별 집계 테이블만 읽어 만듭니다. 완성된 PDF 는 장부 옆 <이름>_reports/ 에
+<월>_<데이터 지문>.pdf 로 남기므로, 그 달 숫자나 이름이 바뀌지 않는 한 다시 받을 때는 바로 내려갑니다.
+그리기(reportlab)는 작업 스레드에서 하므로 화면은 기다리지 않습니다.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from . import db
+from .queries import get_rollup_months, monthly_item_stats, monthly_recipient_item_stats
+
+LOGO_PATH = Path(__file__).resolve().parent.parent / "assets" / "court_logo.png"
+REPORT_TITLE = "대구고등법원 환경미화 소모품 사용 보고서"
+FONT = "HYGothic-Medium"  # reportlab 내장 한글 CID 글꼴
+PIVOT_COLUMNS = 6         # 수령자 × 품목 표의 한 줄에 넣을 품목 수
+
+# =========================================================
+# 보고서 데이터
+# =========================================================
+def previous_month(month: str) -> Optional[str]:
+    months = get_rollup_months()
+    i = months.index(month) if month in months else -1
+    return months[i - 1] if i > 0 else None
+
+def report_data(month: str) -> Dict[str, pd.DataFrame]:
+    prev = previous_month(month)
+    items = monthly_item_stats(month)
+    prev_items = monthly_item_stats(prev) if prev else items.iloc[0:0]
+    compare = items.merge(prev_items, on="품목", how="outer", suffixes=("", "_전월")).fillna(0)
+    compare = compare.rename(columns={"수량": "이번 달", "수량_전월": "지난달"})
+    compare[["이번 달", "지난달"]] = compare[["이번 달", "지난달"]].astype(int)
+    compare["증감"] = compare["이번 달"] - compare["지난달"]
+    compare = compare.sort_values(["이번 달", "지난달"], ascending=False, ignore_index=True)
+
+    pivot = monthly_recipient_item_stats(month).pivot_table(
+        index="수령자", columns="품목", values="수량", aggfunc="sum", fill_value=0
+    )
+    # 많이 쓴 품목이 왼쪽으로
+    pivot = pivot[pivot.sum().sort_values(ascending=False).index]
+    return {"items": compare, "pivot": pivot, "prev_month": prev or ""}
+
+def data_digest(data: Dict[str, pd.DataFrame]) -> str:
+    # 보고서에 들어가는 값 자체의 지문 = 그 달 보고서의 데이터 버전
+    h = hashlib.sha1()
+    h.update(data["prev_month"].encode())
+    for key in ("items", "pivot"):
+        h.update(pd.util.hash_pandas_object(data[key].reset_index(), index=False).values.tobytes())
+        h.update("|".join(map(str, data[key].reset_index().columns)).encode())
+    return h.hexdigest()[:16]
+
+# =========================================================
+# PDF 그리기
+# =========================================================
+def write_report_pdf(path: Path, month: str, data: Dict[str, pd.DataFrame]):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib.units import mm
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+    from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    if FONT not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(UnicodeCIDFont(FONT))
+    title = ParagraphStyle("title", fontName=FONT, fontSize=16, leading=22)
+    h2 = ParagraphStyle("h2", fontName=FONT, fontSize=12, leading=18, spaceBefore=8, spaceAfter=4)
+    body = ParagraphStyle("body", fontName=FONT, fontSize=9, leading=13)
+
+    def table(rows: List[list], col_widths=None) -> Table:
+        t = Table(rows, colWidths=col_widths, repeatRows=1)
+        t.setStyle(TableStyle([
+            ("FONTNAME", (0, 0), (-1, -1), FONT),
+            ("FONTSIZE", (0, 0), (-1, -1), 8),
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#e8eef7")),
+            ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+            ("ALIGN", (1, 1), (-1, -1), "RIGHT"),
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ]))
+        return t
+
+    year, mon = month.split("-")
+    story = []
+    if LOGO_PATH.exists():
+        story.append(Image(str(LOGO_PATH), width=18 * mm, height=18 * mm * 248 / 256, hAlign="LEFT"))
+    story += [
+        Paragraph(REPORT_TITLE, title),
+        Paragraph(f"{year}년 {int(mon)}월 · 작성 {datetime.now():%Y-%m-%d %H:%M}", body),
+        Spacer(1, 6 * mm),
+    ]
+
+    items = data["items"]
+    prev = data["prev_month"]
+    story.append(Paragraph("1. 품목별 사용량" + (f" (전월 {prev} 대비)" if prev else ""), h2))
+    story.append(Paragraph(
+        f"총 {int(items['이번 달'].sum()):,}개 / 전월 {int(items['지난달'].sum()):,}개, 사용 품목 {int((items['이번 달'] > 0).sum())}종",
+        body
+    ))
+    rows = [["품목", "이번 달", "지난달", "증감"]]
+    rows += [[name, f"{cur:,}", f"{last:,}", f"{diff:+,}"] for name, cur, last, diff in items.itertuples(index=False, name=None)]
+    story += [table(rows, [70 * mm, 30 * mm, 30 * mm, 30 * mm]), Spacer(1, 4 * mm)]
+
+    pivot = data["pivot"]
+    story.append(Paragraph("2. 수령자 × 품목", h2))
+    for i in range(0, len(pivot.columns), PIVOT_COLUMNS):
+        part = pivot.iloc[:, i:i + PIVOT_COLUMNS]
+        rows = [["수령자"] + list(part.columns)]
+        rows += [[name] + [f"{v:,}" if v else "" for v in vals] for name, vals in zip(part.index, part.values.tolist())]
+        story += [table(rows), Spacer(1, 3 * mm)]
+
+    SimpleDocTemplate(
+        str(path), pagesize=A4, title=f"{REPORT_TITLE} {month}",
+        leftMargin=15 * mm, rightMargin=15 * mm, topMargin=15 * mm, bottomMargin=15 * mm,
+    ).build(story)
+
+# =========================================================
+# 디스크 캐시 · 작업 스레드
+# =========================================================
+def report_dir() -> Path:
+    base = Path(db.get_pool().path)
+    return base.with_name(f"{base.stem}_reports")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_jobs: Dict[Path, Future] = {}
+_jobs_lock = threading.Lock()
+
+def _build(path: Path, month: str, data: Dict[str, pd.DataFrame]) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(suffix=".pdf", dir=path.parent)
+    os.close(fd)
+    try:
+        write_report_pdf(Path(tmp), month, data)
+        os.replace(tmp, path)
+    finally:
+        Path(tmp).unlink(missing_ok=True)
+    # 같은 달의 지난 버전은 정리
+    for old in path.parent.glob(f"{month}_*.pdf"):
+        if old != path:
+            old.unlink(missing_ok=True)
+    return path
+
+def _report_target(month: str) -> Tuple[Path, Dict[str, pd.DataFrame]]:
+    data = report_data(month)
+    return report_dir() / f"{month}_{data_digest(data)}.pdf", data
+
+def request_report(month: str) -> Tuple[Path, Optional[Future]]:
+    # (PDF 경로, 만드는 중이면 Future). 이미 있으면 Future 없이 바로 경로
+    path, data = _report_target(month)
+    if path.exists():
+        with _jobs_lock:
+            _jobs.pop(path, None)
+        return path, None
+    global _executor
+    with _jobs_lock:
+        job = _jobs.get(path)
+        if job is None or (job.done() and job.exception() is not None):
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report")
+            job = _jobs[path] = _executor.submit(_build, path, month, data)
+        return path, job
+
+def report_job(month: str) -> Tuple[Path, Optional[Future]]:
+    # 화면 rerun 에서 상태만 확인 (새로 만들지 않음)
+    path, _data = _report_target(month)
+    with _jobs_lock:
+        return path, _jobs.get(path)
@@ -0,0 +1,365 @@
+"""여러 사업장(본관 · 별관 ...) 장부를 함께 조회 · 합산.
+
+사업장마다 장부 파일과 수령자/품목 명단이 따로 있습니다. 대표 장부는 INVENTORY_DB 이고,
+나머지는 INVENTORY_SITES 에 "이름=파일" 을 ; 로 나열합니다.
+
+    INVENTORY_SITE_NAME=본관 INVENTORY_SITES="별관=annex.db;신관=new.db" streamlit run app.py
+
+조회는 사업장마다 스레드 하나에서 (db.use_db 로 그 스레드의 장부를 바꿔) 같은 queries 함수를 실행하고
+결과에 '사업장' 열을 붙여 합칩니다. SQLite 는 쿼리 중 GIL 을 놓으므로 사업장이 늘어도 한 곳과 비슷한 시간.
+품목 id 는 사업장마다 달라 이름으로 맞추고, 표기가 다른 이름은 대표 장부의 item_aliases 로 통합 이름에 대응시킵니다.
+"""
+import csv
+import heapq
+import itertools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import db
+from .db import MAX_ATTACHED, cached_query, get_archives, get_pool, run, run_many, use_db
+from .export import EXCEL_SHEET_ROWS, get_export_cache, write_rows_xlsx
+from .queries import (
+    LOG_COLUMNS, _log_filters, _log_source, count_logs, get_all_items, get_all_recipients, get_log_date_range,
+    get_rollup_months, iter_logs, monthly_item_stats, monthly_recipient_stats, prepare_db, read_logs,
+)
+from .writer import queued_write
+
+SITE_COLUMN = "사업장"
+SITE_LOG_COLUMNS = [SITE_COLUMN] + LOG_COLUMNS
+
+@dataclass(frozen=True)
+class Site:
+    name: str
+    path: Path
+
+def get_sites() -> List[Site]:
+    # 대표 장부가 항상 첫 번째. 같은 파일을 두 번 적으면 한 번만
+    sites = [Site(os.environ.get("INVENTORY_SITE_NAME", "본관"), Path(db.DB_PATH))]
+    seen = {sites[0].path.resolve()}
+    for part in os.environ.get("INVENTORY_SITES", "").split(";"):
+        name, sep, path = part.partition("=")
+        if not sep or not name.strip() or not path.strip():
+            continue
+        site = Site(name.strip(), Path(path.strip()))
+        if site.path.resolve() not in seen:
+            seen.add(site.path.resolve())
+            sites.append(site)
+    return sites
+
+def primary_site() -> Site:
+    return get_sites()[0]
+
+# =========================================================
+# 사업장별 병렬 실행
+# =========================================================
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="site")
+        return _executor
+
+def on_site(site: Site, fn: Callable, *args, **kwargs):
+    # 이 스레드의 get_pool() 을 사업장 장부로 바꿔 실행 (캐시도 장부 파일별)
+    with use_db(site.path):
+        prepare_db()
+        return fn(*args, **kwargs)
+
+def fan_out(fn: Callable, *args, sites: Optional[List[Site]] = None, **kwargs) -> List[Tuple[Site, object]]:
+    # 사업장마다 fn(*args) 를 동시에 -> [(사업장, 결과)] (사업장 순서 그대로)
+    sites = sites or get_sites()
+    if len(sites) == 1:
+        return [(sites[0], on_site(sites[0], fn, *args, **kwargs))]
+    futures = [(site, _get_executor().submit(on_site, site, fn, *args, **kwargs)) for site in sites]
+    return [(site, f.result()) for site, f in futures]
+
+# =========================================================
+# 품목 이름 대응
+# =========================================================
+def normalize_name(name: str) -> str:
+    return " ".join(name.split())
+
+@cached_query
+def _item_aliases() -> Dict[str, str]:
+    return dict(run("SELECT alias, canonical FROM item_aliases", fetch=True))
+
+def item_aliases() -> Dict[str, str]:
+    # 대표 장부의 {사업장 품목 이름: 통합 이름}
+    with use_db(primary_site().path):
+        return _item_aliases()
+
+def canonical_item(name: str, aliases: Dict[str, str]) -> str:
+    name = normalize_name(name)
+    return aliases.get(name, name)
+
+@queued_write
+def _save_item_aliases(pairs: List[Tuple[str, str]]):
+    run("DELETE FROM item_aliases")
+    run_many("INSERT OR REPLACE INTO item_aliases(alias, canonical) VALUES (?, ?)", pairs)
+
+def set_item_aliases(aliases: Dict[str, str]):
+    # 통합 이름이 자기 자신이거나 비어 있으면 대응하지 않음
+    pairs = []
+    for alias, canonical in aliases.items():
+        alias, canonical = normalize_name(alias or ""), normalize_name(canonical or "")
+        if alias and canonical and alias != canonical:
+            pairs.append((alias, canonical))
+    with use_db(primary_site().path):
+        _save_item_aliases(pairs)
+
+def site_items() -> pd.DataFrame:
+    # 품목 이름별로 쓰는 사업장과 지금의 통합 이름 (관리 화면 편집용, 이름이 같으면 한 줄)
+    aliases = item_aliases()
+    used: Dict[str, List[str]] = {}
+    for site, items in fan_out(get_all_items):
+        for _id, name, _a in items:
+            used.setdefault(normalize_name(name), []).append(site.name)
+    names = sorted(used)
+    return pd.DataFrame({
+        "품목": names,
+        SITE_COLUMN: [", ".join(used[n]) for n in names],
+        "통합 이름": [canonical_item(n, aliases) for n in names],
+    })
+
+def recipient_names() -> List[str]:
+    # 모든 사업장의 수령자 이름 (합집합)
+    names = {name for _site, rows in fan_out(get_all_recipients) for _id, name, _a in rows}
+    return sorted(names)
+
+def item_names() -> List[str]:
+    # 모든 사업장의 통합 품목 이름 (합집합)
+    aliases = item_aliases()
+    names = {canonical_item(name, aliases) for _site, rows in fan_out(get_all_items) for _id, name, _a in rows}
+    return sorted(names)
+
+def _site_filters(recipient: Optional[str], item: Optional[str], aliases: Dict[str, str]) -> List[dict]:
+    # 이름 필터 -> 현재 장부의 id 필터들. 통합 이름 하나가 품목 여럿일 수 있음 ([] 면 이 사업장엔 해당 없음)
+    recipient_ids: List[Optional[int]] = [None]
+    item_ids: List[Optional[int]] = [None]
+    if recipient:
+        recipient_ids = [rid for rid, name, _a in get_all_recipients() if normalize_name(name) == normalize_name(recipient)]
+    if item:
+        item_ids = [iid for iid, name, _a in get_all_items() if canonical_item(name, aliases) == normalize_name(item)]
+    return [{"recipient_id": r, "item_id": i} for r in recipient_ids for i in item_ids]
+
+# =========================================================
+# 지급 기록: 사업장 열을 붙여 합치기
+# =========================================================
+def _read_site_logs(start, end, recipient, item, limit, aliases) -> pd.DataFrame:
+    frames = [
+        read_logs(start=start, end=end, limit=limit, **f)
+        for f in _site_filters(recipient, item, aliases)
+    ]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=LOG_COLUMNS)
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    return df.sort_values(["시간", "id"], ascending=False, ignore_index=True).head(limit)
+
+def read_logs_sites(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    recipient: Optional[str] = None,
+    item: Optional[str] = None,
+    limit: int = 500,
+) -> pd.DataFrame:
+    # 모든 사업장의 최신순 limit 건. 사업장마다 limit 건만 읽어 합친 뒤 다시 자름
+    aliases = item_aliases()
+    frames = []
+    for site, df in fan_out(_read_site_logs, start, end, recipient, item, limit, aliases):
+        if not df.empty:
+            df.insert(0, SITE_COLUMN, site.name)
+            frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=SITE_LOG_COLUMNS)
+    df = pd.concat(frames, ignore_index=True)
+    return df.sort_values(["시간", "id"], ascending=False, ignore_index=True).head(limit)
+
+def _count_site_logs(start, end, recipient, item, aliases) -> int:
+    return sum(count_logs(start=start, end=end, **f) for f in _site_filters(recipient, item, aliases))
+
+def count_logs_sites(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    recipient: Optional[str] = None,
+    item: Optional[str] = None,
+) -> Dict[str, int]:
+    # {사업장: 건수}. 보관 DB 가 없고 사업장 수가 ATTACH 한도 안이면 연결 하나에서 쿼리 한 번
+    # (스레드를 띄우는 비용보다 싼 경우가 대부분). 아니면 사업장별로 동시에
+    aliases = item_aliases()
+    sites = get_sites()
+    plans = []
+    for site in sites:
+        with use_db(site.path):
+            prepare_db()
+            plans.append((site, get_archives(), _site_filters(recipient, item, aliases)))
+    if len(sites) > MAX_ATTACHED + 1 or any(archives for _s, archives, _f in plans):
+        return {site.name: n for site, n in fan_out(_count_site_logs, start, end, recipient, item, aliases)}
+
+    current = Path(get_pool().path).resolve()
+    attach, arms, params = {}, [], []
+    for k, (site, _archives, filters) in enumerate(plans):
+        schema = "main" if site.path.resolve() == current else f"site_{k}"
+        if schema != "main":
+            attach[schema] = site.path
+        for f in filters:
+            where_sql, where_params = _log_filters(start, end, **f)
+            arms.append(f"SELECT ? AS site, COUNT(*) AS n FROM {schema}.logs l {where_sql}")
+            params += [site.name] + where_params
+    counts = {site.name: 0 for site in sites}
+    if arms:
+        rows = run(
+            f"SELECT site, SUM(n) FROM ({' UNION ALL '.join(arms)}) GROUP BY site",
+            tuple(params), fetch=True, attach=attach,
+        )
+        counts.update({name: int(n) for name, n in rows})
+    return counts
+
+def log_date_range_sites() -> Optional[Tuple[date, date]]:
+    ranges = [r for _site, r in fan_out(get_log_date_range) if r is not None]
+    if not ranges:
+        return None
+    return min(lo for lo, _hi in ranges), max(hi for _lo, hi in ranges)
+
+# =========================================================
+# 통계 합산
+# =========================================================
+def rollup_months_sites() -> List[str]:
+    return sorted({m for _site, months in fan_out(get_rollup_months) for m in months})
+
+def _with_site(results, name_col: str, canonical: bool) -> pd.DataFrame:
+    # [(사업장, 이름/수량 표)] -> 사업장 · 이름 · 수량 (통합 이름으로 바꾸면 겹친 이름끼리 합산)
+    aliases = item_aliases() if canonical else {}
+    frames = []
+    for site, df in results:
+        if df.empty:
+            continue
+        df = df.copy()
+        if canonical:
+            df[name_col] = [canonical_item(n, aliases) for n in df[name_col]]
+        df.insert(0, SITE_COLUMN, site.name)
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=[SITE_COLUMN, name_col, "수량"])
+    df = pd.concat(frames, ignore_index=True)
+    return df.groupby([SITE_COLUMN, name_col], as_index=False, sort=False)["수량"].sum()
+
+def monthly_item_stats_sites(month: str) -> pd.DataFrame:
+    # 월별 집계 테이블에서 사업장마다 한 쿼리 -> 사업장 · 품목(통합 이름) · 수량
+    return _with_site(fan_out(monthly_item_stats, month), "품목", canonical=True)
+
+def monthly_recipient_stats_sites(month: str) -> pd.DataFrame:
+    return _with_site(fan_out(monthly_recipient_stats, month), "수령자", canonical=False)
+
+@cached_query
+def _item_period_totals(start: Optional[date], end: Optional[date]) -> Tuple[np.ndarray, np.ndarray]:
+    # (품목 id, 수량) 배열. 합계는 SQLite 안에서 (GIL 을 놓고) 끝내고 품목 수만큼만 꺼냄
+    source, where_sql, params, attach = _log_source(start=start, end=end)
+    rows = run(
+        f"SELECT l.item_id, SUM(l.qty) FROM {source} {where_sql} GROUP BY l.item_id",
+        tuple(params), fetch=True, attach=attach,
+    )
+    ids = np.array([i for i, _q in rows], dtype=np.int64)
+    qty = np.array([q for _i, q in rows], dtype=np.int64)
+    return ids, qty
+
+def _site_item_totals(start, end, aliases) -> Tuple[np.ndarray, np.ndarray, Dict[int, str]]:
+    ids, qty = _item_period_totals(start, end)
+    names = {iid: canonical_item(name, aliases) for iid, name, _a in get_all_items()}
+    return ids, qty, names
+
+def item_totals_sites(start: Optional[date] = None, end: Optional[date] = None) -> pd.DataFrame:
+    # 기간 품목 합계 (품목 × 사업장 + 합계). 사업장마다 GROUP BY 한 번을 동시에 돌리고,
+    # 사업장 품목 id -> 통합 품목 번호 대응표(배열)로 바꿔 bincount
+    aliases = item_aliases()
+    results = fan_out(_site_item_totals, start, end, aliases)
+    canon = sorted({name for _site, (_i, _q, names) in results for name in names.values()})
+    code = {name: k for k, name in enumerate(canon)}
+    matrix = np.zeros((len(canon), len(results)), dtype=np.int64)
+    for col, (_site, (ids, qty, names)) in enumerate(results):
+        if not len(ids):
+            continue
+        lut = np.zeros(max(max(names, default=0), int(ids.max())) + 1, dtype=np.int64)
+        for iid, name in names.items():
+            lut[iid] = code[name]
+        matrix[:, col] = np.bincount(lut[ids], weights=qty, minlength=len(canon)).astype(np.int64)
+    df = pd.DataFrame(matrix, columns=[site.name for site, _r in results])
+    df.insert(0, "품목", canon)
+    df["합계"] = matrix.sum(axis=1)
+    df = df[df["합계"] > 0]
+    return df.sort_values("합계", ascending=False, ignore_index=True)
+
+# =========================================================
+# 합산 내보내기
+# =========================================================
+def _prime(site: Site, chunks: Iterator[List[tuple]]) -> Optional[Iterator[tuple]]:
+    # 첫 묶음을 사업장 장부에서 꺼내 커서를 열어 둠 (제너레이터는 처음 next 할 때 get_pool 을 부름)
+    with use_db(site.path):
+        prepare_db()
+        first = next(chunks, None)
+    if first is None:
+        return None
+    return ((site.name, *row) for rows in itertools.chain([first], chunks) for row in rows)
+
+def iter_logs_sites(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    recipient: Optional[str] = None,
+    item: Optional[str] = None,
+    chunk_size: int = 5000,
+) -> Iterator[List[tuple]]:
+    # 사업장 열이 붙은 최신순 행 묶음. 사업장별 커서를 heapq.merge 로 섞어 전체를 메모리에 올리지 않음
+    aliases = item_aliases()
+    streams = []
+    for site in get_sites():
+        with use_db(site.path):
+            prepare_db()
+            filters = _site_filters(recipient, item, aliases)
+        for f in filters:
+            stream = _prime(site, iter_logs(chunk_size, start=start, end=end, **f))
+            if stream is not None:
+                streams.append(stream)
+    merged = heapq.merge(*streams, key=lambda row: (row[2], row[1]), reverse=True)
+    while True:
+        rows = list(itertools.islice(merged, chunk_size))
+        if not rows:
+            break
+        yield rows
+
+def write_sites_csv(path: Path, **filters) -> int:
+    n = 0
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        w = csv.writer(f)
+        w.writerow(SITE_LOG_COLUMNS)
+        for rows in iter_logs_sites(**filters):
+            w.writerows(rows)
+            n += len(rows)
+    return n
+
+def write_sites_xlsx(path: Path, **filters) -> int:
+    split = sum(count_logs_sites(**filters).values()) > EXCEL_SHEET_ROWS
+    return write_rows_xlsx(path, iter_logs_sites(**filters), SITE_LOG_COLUMNS, split)
+
+SITE_EXPORT_WRITERS = {"csv": write_sites_csv, "xlsx": write_sites_xlsx}
+
+def sites_export_key(kind: str, **filters):
+    # 사업장 중 하나라도 바뀌면 새로 만듦 (키에 모든 장부의 data_version)
+    versions = tuple((str(site.path), get_pool(site.path).current_version()) for site in get_sites())
+    return ("sites", kind, tuple(sorted(filters.items())), versions)
+
+def export_sites(kind: str, **filters) -> Path:
+    writer = SITE_EXPORT_WRITERS[kind]
+    return get_export_cache().get_or_build(
+        sites_export_key(kind, **filters), f".{kind}", lambda path: writer(path, **filters)
+    )
@@ -0,0 +1,284 @@
+"""지급 기록 → Google Sheets 증분 동기화.
+
+logs 트리거가 log_changes 에 (log_id, 종류) 를 쌓고, 백그라운드 스레드가 마지막으로 보낸
+seq(high-water mark) 이후 변경만 모아 append_rows / batch_update 로 보냅니다.
+시트의 행 번호는 sheet_rows 에 기억해 두고, 삭제된 기록은 행을 지우지 않고 '상태' 를 '삭제' 로 바꿉니다.
+(행을 지우면 아래 행 번호가 모두 밀림)
+
+    INVENTORY_SHEET_KEY=<스프레드시트 key> INVENTORY_SHEET_CREDENTIALS=service_account.json
+"""
+import os
+import random
+import re
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Protocol, Sequence, Tuple
+
+from .db import run, run_many, ts_text
+from .queries import LOG_COLUMNS
+from .writer import queued_write
+
+SHEET_HEADER = LOG_COLUMNS + ["상태"]
+
+SYNC_TABLES = (
+    """CREATE TABLE IF NOT EXISTS log_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        log_id INTEGER NOT NULL,
+        op TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS sheet_rows (
+        log_id INTEGER PRIMARY KEY,
+        row INTEGER NOT NULL
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS sync_state (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    ) WITHOUT ROWID""",
+)
+
+SYNC_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS trg_logs_sync_ins AFTER INSERT ON logs BEGIN "
+    "INSERT INTO log_changes(log_id, op) VALUES (NEW.id, 'I'); END",
+    "CREATE TRIGGER IF NOT EXISTS trg_logs_sync_upd AFTER UPDATE ON logs BEGIN "
+    "INSERT INTO log_changes(log_id, op) VALUES (NEW.id, 'U'); END",
+    "CREATE TRIGGER IF NOT EXISTS trg_logs_sync_del AFTER DELETE ON logs BEGIN "
+    "INSERT INTO log_changes(log_id, op) VALUES (OLD.id, 'D'); END",
+)
+
+# =========================================================
+# 시트 클라이언트
+# =========================================================
+class SheetClient(Protocol):
+    def ensure_header(self, header: List[str]) -> None: ...
+
+    def append_rows(self, rows: List[list]) -> int:
+        # 붙인 첫 행의 번호(1부터)를 돌려줌
+        ...
+
+    def batch_update(self, updates: List[Tuple[int, list]]) -> None: ...
+
+class MemorySheet:
+    # 오프라인 확인용 가짜 시트. fail_next 만큼 호출을 실패시켜 재시도를 흉내낼 수 있음
+    def __init__(self):
+        self.rows: List[list] = []
+        self.calls: List[str] = []
+        self.fail_next = 0
+
+    def _call(self, name: str):
+        self.calls.append(name)
+        if self.fail_next:
+            self.fail_next -= 1
+            raise ConnectionError(f"{name} 실패 (가짜 시트)")
+
+    def ensure_header(self, header: List[str]) -> None:
+        self._call("ensure_header")
+        if not self.rows:
+            self.rows.append(list(header))
+
+    def append_rows(self, rows: List[list]) -> int:
+        self._call("append_rows")
+        first = len(self.rows) + 1
+        self.rows.extend(list(r) for r in rows)
+        return first
+
+    def batch_update(self, updates: List[Tuple[int, list]]) -> None:
+        self._call("batch_update")
+        for row, values in updates:
+            self.rows[row - 1] = list(values)
+
+_RANGE_ROW = re.compile(r"![A-Z]+(\d+)")
+
+class GspreadSheet:
+    def __init__(self, key: str, credentials: str, worksheet: Optional[str] = None):
+        import gspread  # 동기화를 켤 때만 필요
+
+        book = gspread.service_account(filename=credentials).open_by_key(key)
+        self.ws = book.worksheet(worksheet) if worksheet else book.sheet1
+
+    def ensure_header(self, header: List[str]) -> None:
+        if self.ws.row_values(1) != header:
+            self.ws.update([header], "A1")
+
+    def append_rows(self, rows: List[list]) -> int:
+        resp = self.ws.append_rows(rows, value_input_option="RAW")
+        return int(_RANGE_ROW.search(resp["updates"]["updatedRange"]).group(1))
+
+    def batch_update(self, updates: List[Tuple[int, list]]) -> None:
+        last_col = chr(ord("A") + len(SHEET_HEADER) - 1)
+        self.ws.batch_update(
+            [{"range": f"A{row}:{last_col}{row}", "values": [values]} for row, values in updates],
+            value_input_option="RAW",
+        )
+
+def sheet_from_env() -> Optional[GspreadSheet]:
+    key = os.environ.get("INVENTORY_SHEET_KEY")
+    if not key:
+        return None
+    return GspreadSheet(
+        key,
+        os.environ.get("INVENTORY_SHEET_CREDENTIALS", "service_account.json"),
+        os.environ.get("INVENTORY_SHEET_WORKSHEET"),
+    )
+
+# =========================================================
+# 변경 추적 · 한 번 동기화
+# =========================================================
+@queued_write
+def init_sync():
+    # 트리거 설치. 처음 켤 때는 기존 기록 전체를 'I' 로 쌓아 두어 첫 동기화에 올라가게 함
+    for ddl in SYNC_TABLES:
+        run(ddl)
+    installed = run("SELECT 1 FROM sqlite_master WHERE type='trigger' AND name='trg_logs_sync_ins'", fetch=True)
+    if not installed:
+        run("INSERT INTO log_changes(log_id, op) SELECT id, 'I' FROM logs ORDER BY id")
+        for ddl in SYNC_TRIGGERS:
+            run(ddl)
+
+def _state(key: str, default: str = "0") -> str:
+    row = run("SELECT value FROM sync_state WHERE key=?", (key,), fetch=True)
+    return row[0][0] if row else default
+
+def _set_state(key: str, value) -> None:
+    run("""
+        INSERT INTO sync_state(key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+    """, (key, str(value)))
+
+def pending_changes() -> int:
+    return run("SELECT COUNT(*) FROM log_changes WHERE seq > ?", (int(_state("change_seq")),), fetch=True)[0][0]
+
+def _sheet_rows(log_ids: Sequence[int]) -> Dict[int, int]:
+    out = {}
+    for i in range(0, len(log_ids), 500):
+        chunk = log_ids[i:i + 500]
+        out.update(run(
+            f"SELECT log_id, row FROM sheet_rows WHERE log_id IN ({','.join('?' * len(chunk))})",
+            tuple(chunk), fetch=True
+        ))
+    return out
+
+def _sheet_values(log_ids: Sequence[int]) -> Dict[int, list]:
+    out = {}
+    for i in range(0, len(log_ids), 500):
+        chunk = log_ids[i:i + 500]
+        rows = run(f"""
+            SELECT l.id, {ts_text("l.ts")}, r.name, i.name, l.qty, COALESCE(l.note, '')
+            FROM logs l
+            JOIN recipients r ON r.id = l.recipient_id
+            JOIN items i ON i.id = l.item_id
+            WHERE l.id IN ({",".join("?" * len(chunk))})
+        """, tuple(chunk), fetch=True)
+        out.update({row[0]: list(row) + [""] for row in rows})
+    return out
+
+@queued_write
+def _save_sheet_rows(pairs: List[Tuple[int, int]]) -> None:
+    run_many("INSERT OR REPLACE INTO sheet_rows(log_id, row) VALUES (?, ?)", pairs)
+
+@queued_write
+def _mark_synced(seq: int) -> None:
+    # 보낸 seq 까지를 high-water mark 로 기록하고 처리한 변경은 지움
+    _set_state("change_seq", seq)
+    _set_state("synced_at", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    run("DELETE FROM log_changes WHERE seq <= ?", (seq,))
+
+def sync_once(client: SheetClient, batch_size: int = 1000) -> Dict[str, int]:
+    # high-water mark 이후 변경을 batch_size 개까지 보냄. 네트워크 오류는 그대로 올려 보냄 (재시도는 호출자)
+    hwm = int(_state("change_seq"))
+    changes = run(
+        "SELECT seq, log_id, op FROM log_changes WHERE seq > ? ORDER BY seq LIMIT ?",
+        (hwm, batch_size), fetch=True
+    )
+    if not changes:
+        return {"appended": 0, "updated": 0, "deleted": 0}
+
+    last_op: Dict[int, str] = {}
+    for _seq, log_id, op in changes:
+        last_op[log_id] = op
+    ids = list(last_op)
+    known = _sheet_rows(ids)
+    current = _sheet_values([lid for lid, op in last_op.items() if op != "D"])
+
+    client.ensure_header(SHEET_HEADER)
+    new_ids = [lid for lid in ids if lid not in known and lid in current]
+    if new_ids:
+        first = client.append_rows([current[lid] for lid in new_ids])
+        # 다시 보내지 않도록 붙이자마자 행 번호부터 기록
+        _save_sheet_rows([(lid, first + k) for k, lid in enumerate(new_ids)])
+
+    updates, deleted = [], 0
+    for lid, row in known.items():
+        if lid in current:
+            updates.append((row, current[lid]))
+        else:
+            updates.append((row, [lid, "", "", "", "", "", "삭제"]))
+            deleted += 1
+    if updates:
+        client.batch_update(updates)
+
+    _mark_synced(changes[-1][0])
+    return {"appended": len(new_ids), "updated": len(updates) - deleted, "deleted": deleted}
+
+# =========================================================
+# 백그라운드 작업 스레드
+# =========================================================
+class SyncWorker(threading.Thread):
+    # interval 마다 (또는 nudge() 즉시) 동기화. 실패하면 지수 백오프 후 재시도
+    def __init__(self, client: SheetClient, interval: float = 30.0, max_backoff: float = 600.0):
+        super().__init__(name="sheet-sync", daemon=True)
+        self.client = client
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.last_result: Optional[Dict[str, int]] = None
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    def nudge(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+
+    def backoff(self) -> float:
+        if not self.failures:
+            return self.interval
+        delay = min(self.max_backoff, 2.0 ** self.failures)
+        return delay * random.uniform(0.5, 1.0)
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                result = sync_once(self.client)
+                # 한 번에 다 못 보냈으면 바로 이어서
+                more = bool(sum(result.values())) and pending_changes() > 0
+                self.last_result, self.last_error, self.failures = result, None, 0
+            except Exception as e:  # 네트워크/인증/할당량 오류 모두 재시도
+                self.failures += 1
+                self.last_error = f"{datetime.now():%H:%M:%S} {type(e).__name__}: {e}"
+                more = False
+            if more:
+                continue
+            self._wake.wait(self.backoff())
+            self._wake.clear()
+
+_worker: Optional[SyncWorker] = None
+_worker_lock = threading.Lock()
+
+def start_sync(client: Optional[SheetClient] = None, interval: float = 30.0) -> Optional[SyncWorker]:
+    # 프로세스당 하나. client 가 없으면 환경변수 설정으로 만들고, 설정이 없으면 None
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            client = client or sheet_from_env()
+            if client is None:
+                return None
+            init_sync()
+            _worker = SyncWorker(client, interval)
+            _worker.start()
+        return _worker
+
+def get_sync_worker() -> Optional[SyncWorker]:
+    return _worker
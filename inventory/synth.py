@@ -0,0 +1,147 @@
+"""벤치마크용 가상 장부 생성기. (Streamlit 없이 실행)
+
+    python -m inventory.synth --db bench.db --logs 1000000 --years 10
+"""
+import argparse
+import math
+import random
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from . import db
+from .db import analyze_db, init_db, run, run_many, to_ts
+from .queries import DEFAULT_ITEMS, DEFAULT_RECIPIENTS, add_items, add_recipients
+
+NOTES = ["대청소", "특별작업", "정기 지급", "추가 요청", "행사 준비", "화장실 보수"]
+
+# 여름에 많이 쓰는 품목 (계절성)
+SUMMER_ITEMS = ("락스", "쓰레기봉투", "소독제", "물비누")
+
+def _names(defaults: List[str], n: int, prefix: str) -> List[str]:
+    names = list(defaults[:n])
+    names += [f"{prefix}{i:04d}" for i in range(1, n - len(names) + 1)]
+    return names
+
+def _day_weight(d: date) -> float:
+    # 주말은 거의 없고, 여름(7~8월)에 소모량이 많음
+    if d.weekday() >= 5:
+        return 0.05
+    return 1.0 + 0.3 * math.sin((d.month - 4) / 12 * 2 * math.pi)
+
+def generate(
+    n_logs: int,
+    years: int = 10,
+    n_recipients: int = 300,
+    n_items: int = 200,
+    seed: int = 42,
+    end: Optional[date] = None,
+    chunk_size: int = 50_000,
+) -> Dict[str, float]:
+    rng = random.Random(seed)
+    end = end or date.today()
+    start = end - timedelta(days=365 * years)
+
+    init_db()
+    add_recipients(_names(DEFAULT_RECIPIENTS, n_recipients, "수령자"))
+    add_items(_names(DEFAULT_ITEMS, n_items, "품목"))
+    recipients = run("SELECT id FROM recipients ORDER BY id", fetch=True)
+    items = run("SELECT id, name FROM items ORDER BY id", fetch=True)
+
+    r_ids = [rid for (rid,) in recipients]
+    r_cum = _cumulative([rng.uniform(0.5, 1.5) for _ in r_ids])
+    i_ids = [iid for iid, _name in items]
+    # 품목 인기도는 멱법칙 (몇몇 품목이 대부분)
+    i_base = [1.0 / (rank + 1) for rank in range(len(i_ids))]
+    rng.shuffle(i_base)
+    summer = [any(name.startswith(p) for p in SUMMER_ITEMS) for _iid, name in items]
+    rooms = [f"{floor}층 {room}호" for floor in range(1, 8) for room in range(1, 21)]
+
+    days = [start + timedelta(days=k) for k in range((end - start).days + 1)]
+    weights = [_day_weight(d) for d in days]
+    per_weight = n_logs / sum(weights)
+
+    t0 = time.perf_counter()
+    buf: List[tuple] = []
+    month_use: Dict[int, int] = {}
+    receipts: List[tuple] = []
+    inserted = 0
+    cur_month = None
+    i_cum = None
+
+    for d, w in zip(days, weights):
+        if d.month != cur_month:
+            if month_use:
+                # 지난달 사용량만큼 월초에 입고 (재고가 음수로 가지 않도록 조금 넉넉히)
+                ts = to_ts(datetime(d.year, d.month, 1, 8, 0, 0))
+                receipts += [(ts, iid, int(q * rng.uniform(1.0, 1.2)) + 1, "정기 구매") for iid, q in month_use.items()]
+                month_use = {}
+            cur_month = d.month
+            boost = 2.0 if d.month in (7, 8) else 1.0
+            i_cum = _cumulative([b * (boost if s else 1.0) for b, s in zip(i_base, summer)])
+
+        expected = per_weight * w
+        count = int(expected) + (1 if rng.random() < expected - int(expected) else 0)
+        if not count:
+            continue
+        rids = rng.choices(r_ids, cum_weights=r_cum, k=count)
+        iids = rng.choices(i_ids, cum_weights=i_cum, k=count)
+        secs = sorted(rng.randrange(7 * 3600, 18 * 3600) for _ in range(count))
+        day_ts = to_ts(d)
+        for rid, iid, sec in zip(rids, iids, secs):
+            qty = 1 if rng.random() < 0.6 else rng.randint(2, 10)
+            note = None
+            if rng.random() < 0.1:
+                note = rng.choice(NOTES) if rng.random() < 0.6 else rng.choice(rooms)
+            buf.append((day_ts + sec, rid, iid, qty, note))
+            month_use[iid] = month_use.get(iid, 0) + qty
+
+        if len(buf) >= chunk_size:
+            inserted += _flush(buf, receipts)
+            buf, receipts = [], []
+
+    inserted += _flush(buf, receipts)
+    analyze_db()
+    elapsed = time.perf_counter() - t0
+    return {
+        "logs": inserted,
+        "seconds": elapsed,
+        "rows_per_sec": inserted / elapsed if elapsed else 0.0,
+        "db_bytes": Path(db.DB_PATH).stat().st_size,
+    }
+
+def _cumulative(weights: List[float]) -> List[float]:
+    out, total = [], 0.0
+    for w in weights:
+        total += w
+        out.append(total)
+    return out
+
+def _flush(logs: List[tuple], receipts: List[tuple]) -> int:
+    if receipts:
+        run_many("INSERT INTO receipts(ts, item_id, qty, note) VALUES (?, ?, ?, ?)", receipts)
+    if logs:
+        run_many("INSERT INTO logs(ts, recipient_id, item_id, qty, note) VALUES (?, ?, ?, ?, ?)", logs)
+    return len(logs)
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="가상 지급 기록으로 장부 DB 채우기")
+    ap.add_argument("--db", default=str(db.DB_PATH), help="대상 DB 파일 (기본: inventory.db)")
+    ap.add_argument("--logs", type=int, default=1_000_000, help="생성할 지급 기록 수")
+    ap.add_argument("--years", type=int, default=10)
+    ap.add_argument("--recipients", type=int, default=300)
+    ap.add_argument("--items", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--end", type=date.fromisoformat, default=None, help="마지막 날짜 (YYYY-MM-DD, 기본: 오늘)")
+    args = ap.parse_args(argv)
+
+    db.DB_PATH = Path(args.db)
+    res = generate(args.logs, args.years, args.recipients, args.items, args.seed, args.end)
+    print(
+        f"{res['logs']:,} logs in {res['seconds']:.1f}s "
+        f"({res['rows_per_sec']:,.0f} rows/s), {res['db_bytes'] / 1e6:.1f} MB -> {args.db}"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""단일 쓰기 스레드 + 그룹 커밋.
+
+여러 태블릿이 동시에 저장하면 연결마다 BEGIN IMMEDIATE 를 잡으려고 다투다 "database is locked" 가
+나고, 건마다 커밋합니다. @queued_write 함수는 호출한 스레드에서 실행하지 않고 쓰기 스레드의 큐에
+넣습니다. 쓰기 스레드는 앞 커밋 동안 쌓인 작업(linger_ms 를 주면 그만큼 더 기다린 것까지)을
+한 트랜잭션으로 커밋합니다. 묶음 중 한 건이라도 오류가 나면 묶음을 되돌리고 작업마다 따로
+다시 실행하므로, 한 건의 오류가 다른 저장을 막지 않습니다. (작업마다 SAVEPOINT 를 두면
+큰 일괄 입력에서 부분 저널이 커져 급격히 느려짐)
+읽기는 WAL 덕분에 쓰기와 상관없이 각자의 연결에서 계속 진행됩니다.
+"""
+import functools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .db import get_pool, transaction, use_db
+
+class _JobFailed(Exception):
+    # 묶음 안의 작업 하나가 실패 -> 트랜잭션을 되돌리기 위한 신호
+    def __init__(self, error: Exception):
+        super().__init__(error)
+        self.error = error
+
+@dataclass
+class WriteJob:
+    fn: Callable
+    args: tuple
+    kwargs: dict
+    attach: Optional[Dict[str, Path]] = None
+    db_path: Optional[Path] = None  # 제출한 스레드의 대상 장부 (사업장별 장부)
+    future: Future = field(default_factory=Future)
+
+class WriteQueue:
+    def __init__(self, max_batch: int = 64, linger_ms: float = 0.0):
+        self.max_batch = max_batch
+        self.linger = linger_ms / 1000
+        self.batches = 0
+        self.writes = 0
+        self.errors = 0
+        self._queue: "queue.Queue[WriteJob]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def is_writer_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def submit(self, fn: Callable, args: tuple = (), kwargs: Optional[dict] = None,
+               attach: Optional[Dict[str, Path]] = None) -> Future:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+                self._thread.start()
+        job = WriteJob(fn, args, kwargs or {}, attach, get_pool().path)
+        self._queue.put(job)
+        return job.future
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            # 이미 쌓여 있는 작업(+ linger 동안 들어온 작업)을 같은 커밋에 태움
+            deadline = time.perf_counter() + self.linger
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(batch)
+
+    def _commit(self, batch: List[WriteJob]):
+        # 장부 파일별로 묶어 각각 한 트랜잭션 (대부분은 파일 하나)
+        groups: Dict[Optional[Path], List[WriteJob]] = {}
+        for job in batch:
+            if job.future.set_running_or_notify_cancel():
+                groups.setdefault(job.db_path, []).append(job)
+        for path, jobs in groups.items():
+            with use_db(path):
+                self._execute(jobs)
+
+    def _execute(self, jobs: List[WriteJob]):
+        attach: Dict[str, Path] = {}
+        for job in jobs:
+            attach.update(job.attach or {})
+        try:
+            with transaction(attach=attach):
+                results = []
+                for job in jobs:
+                    try:
+                        results.append(job.fn(*job.args, **job.kwargs))
+                    except Exception as e:
+                        raise _JobFailed(e) from e
+        except _JobFailed as failed:
+            if len(jobs) > 1:
+                # 되돌린 뒤 한 건씩 다시: 실패한 작업만 오류를 돌려받음
+                for job in jobs:
+                    self._execute([job])
+            else:
+                self._fail(jobs, failed.error)
+            return
+        except Exception as e:
+            # BEGIN/COMMIT 자체가 실패하면 묶음 전체가 반영되지 않음
+            self._fail(jobs, e)
+            return
+
+        self.batches += 1
+        self.writes += len(jobs)
+        for job, value in zip(jobs, results):
+            job.future.set_result(value)
+
+    def _fail(self, jobs: List[WriteJob], error: Exception):
+        self.errors += len(jobs)
+        for job in jobs:
+            job.future.set_exception(error)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "커밋": self.batches,
+            "쓰기": self.writes,
+            "오류": self.errors,
+            "커밋당 쓰기": self.writes / self.batches if self.batches else 0.0,
+            "대기": self._queue.qsize(),
+        }
+
+_writer = WriteQueue()
+
+def get_writer() -> WriteQueue:
+    return _writer
+
+def queued_write(fn=None, *, attach: Optional[Callable[..., Dict[str, Path]]] = None):
+    # 쓰기 스레드에서 실행하고 결과(또는 예외)를 호출자에게 그대로 돌려줌.
+    # attach 는 fn 과 같은 인자를 받아 붙일 보관 DB 를 돌려줌 (BEGIN 전에 붙여야 하므로)
+    # 이미 쓰기 스레드이거나 이 스레드가 transaction() 안이면 (중첩 호출) 바로 실행
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _writer.is_writer_thread() or get_pool().in_transaction():
+                return fn(*args, **kwargs)
+            return _writer.submit(fn, args, kwargs, attach(*args, **kwargs) if attach else None).result()
+        return wrapper
+    return decorate(fn) if fn is not None else decorate
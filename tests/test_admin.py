@@ -0,0 +1,43 @@
+"""관리자 일괄 작업: 수령자/품목 이름 수정과 되돌리기."""
+import sqlite3
+
+import pytest
+
+from inventory import admin, db
+from inventory.queries import add_items, prepare_db
+
+def _names():
+    return db.run("SELECT id, name, active FROM items ORDER BY id", fetch=True)
+
+def _ids(*names):
+    ids = dict(db.run("SELECT name, id FROM items", fetch=True))
+    return [ids[n] for n in names]
+
+@pytest.mark.parametrize("update_from", [True, False])
+def test_swap_names_and_undo(tmp_path, monkeypatch, update_from):
+    # UPDATE ... FROM 이 없는 SQLite(3.33 미만)에서 쓰는 길도 같은 결과
+    monkeypatch.setattr(admin, "HAS_UPDATE_FROM", update_from)
+    with db.use_db(tmp_path / "inventory.db"):
+        prepare_db()
+        add_items(["새품목A", "새품목B", "새품목C"])
+        before = _names()
+        a, b, c = _ids("새품목A", "새품목B", "새품목C")
+
+        assert admin.update_names("items", [(a, "새품목B", True), (b, "새품목A", True), (c, "새품목C", False)]) == 3
+        assert _names() == sorted(
+            [r for r in before if r[0] not in (a, b, c)] + [(a, "새품목B", 1), (b, "새품목A", 1), (c, "새품목C", 0)]
+        )
+
+        journal_id = int(admin.get_journal().iloc[0]["id"])
+        assert admin.undo(journal_id) == 3
+        assert _names() == before
+
+def test_duplicate_name_is_rejected(tmp_path):
+    with db.use_db(tmp_path / "inventory.db"):
+        prepare_db()
+        add_items(["새품목A", "새품목B"])
+        before = _names()
+        (a,) = _ids("새품목A")
+        with pytest.raises(sqlite3.IntegrityError):
+            admin.update_names("items", [(a, "새품목B", True)])
+        assert _names() == before
@@ -0,0 +1,84 @@
+"""스키마 마이그레이션: 처음(기준) 스키마 장부를 최신 스키마로 올리기."""
+import sqlite3
+from datetime import date
+
+from inventory import db
+from inventory.queries import count_logs, get_log_date_range, prepare_db, read_logs
+
+# 처음 배포된 app.py 의 스키마 (recipients / items / logs 만, ts 는 문자열)
+BASELINE_SCHEMA = """
+    CREATE TABLE recipients (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL,
+        active INTEGER NOT NULL DEFAULT 1
+    );
+    CREATE TABLE items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL,
+        active INTEGER NOT NULL DEFAULT 1
+    );
+    CREATE TABLE logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ts TEXT NOT NULL,
+        recipient_id INTEGER NOT NULL,
+        item_id INTEGER NOT NULL,
+        qty INTEGER NOT NULL,
+        note TEXT,
+        FOREIGN KEY(recipient_id) REFERENCES recipients(id),
+        FOREIGN KEY(item_id) REFERENCES items(id)
+    );
+"""
+
+def _baseline_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.executemany("INSERT INTO recipients(name) VALUES (?)", [("김순영",), ("노나경",)])
+    conn.executemany("INSERT INTO items(name) VALUES (?)", [("락스",), ("장갑",)])
+    conn.executemany(
+        "INSERT INTO logs(ts, recipient_id, item_id, qty, note) VALUES (?, ?, ?, ?, ?)",
+        [
+            ("2024-01-05 09:30:00", 1, 1, 2, "청소용"),
+            ("2024-01-20 14:00:00", 2, 2, 1, None),
+            ("2024-02-03 08:15:00", 1, 2, 5, None),
+        ],
+    )
+    # 마지막 행을 지워 AUTOINCREMENT 다음 번호(4)가 최대 id(3) 보다 크게
+    conn.execute("INSERT INTO logs(ts, recipient_id, item_id, qty) VALUES ('2024-02-04 08:00:00', 1, 1, 1)")
+    conn.execute("DELETE FROM logs WHERE id = 4")
+    conn.commit()
+    conn.close()
+
+def test_migrate_baseline_schema(tmp_path):
+    path = tmp_path / "inventory.db"
+    _baseline_db(path)
+
+    with db.use_db(path):
+        prepare_db()
+        assert db.schema_version() == db.SCHEMA_VERSION
+        assert db.run("SELECT DISTINCT typeof(ts) FROM logs", fetch=True) == [("integer",)]
+        assert count_logs() == 3
+        assert get_log_date_range() == (date(2024, 1, 5), date(2024, 2, 3))
+
+        df = read_logs()
+        assert df["시간"].dt.strftime("%Y-%m-%d %H:%M:%S").tolist() == [
+            "2024-02-03 08:15:00", "2024-01-20 14:00:00", "2024-01-05 09:30:00",
+        ]
+        # 없던 집계/재고 테이블은 옮긴 정수 ts 로 채워짐
+        assert db.run("SELECT month, item_id, qty FROM monthly_item_totals ORDER BY 1, 2", fetch=True) == [
+            ("2024-01", 1, 2), ("2024-01", 2, 1), ("2024-02", 2, 5),
+        ]
+        assert db.run("SELECT item_id, on_hand FROM item_balances ORDER BY 1", fetch=True) == [(1, -2), (2, -6)]
+        assert db.run("SELECT seq FROM sqlite_sequence WHERE name = 'logs'", fetch=True) == [(4,)]
+
+    backups = list(tmp_path.glob("inventory_v0_*.bak.db"))
+    assert len(backups) == 1
+    conn = sqlite3.connect(backups[0])
+    assert conn.execute("SELECT ts FROM logs ORDER BY id LIMIT 1").fetchone() == ("2024-01-05 09:30:00",)
+    conn.close()
+
+def test_new_db_starts_at_latest_version(tmp_path):
+    path = tmp_path / "new.db"
+    with db.use_db(path):
+        prepare_db()
+        assert db.schema_version() == db.SCHEMA_VERSION
+    assert not list(tmp_path.glob("*.bak.db"))
@@ -0,0 +1,84 @@
+"""시트 동기화: 가짜 시트(MemorySheet)로 추가 · 수정 · 삭제 표시와 재시도."""
+import time
+from datetime import datetime
+
+import pytest
+
+from inventory import admin, db
+from inventory.queries import get_all_items, get_all_recipients, insert_logs_bulk, prepare_db
+from inventory.sync import SHEET_HEADER, MemorySheet, SyncWorker, init_sync, pending_changes, sync_once
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    # 동기화 스레드도 같은 장부를 보도록 스레드별 대상(use_db) 대신 기본 경로를 바꿈
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "inventory.db")
+    prepare_db()
+    init_sync()
+    rid, iid = get_all_recipients()[0][0], get_all_items()[0][0]
+    return rid, iid
+
+def _log_ids():
+    return [lid for (lid,) in db.run("SELECT id FROM logs ORDER BY id", fetch=True)]
+
+def test_append_update_delete(ledger):
+    rid, iid = ledger
+    insert_logs_bulk([(datetime(2026, 3, 1, 9, k), rid, iid, k + 1, None) for k in range(3)])
+    sheet = MemorySheet()
+
+    assert sync_once(sheet) == {"appended": 3, "updated": 0, "deleted": 0}
+    assert sheet.rows[0] == SHEET_HEADER
+    a, b, c = _log_ids()
+    assert [row[0] for row in sheet.rows[1:]] == [a, b, c]
+    assert sheet.rows[1][1] == "2026-03-01 09:00:00"
+    assert pending_changes() == 0
+    assert sync_once(sheet) == {"appended": 0, "updated": 0, "deleted": 0}
+
+    # 수정은 같은 행을 고치고, 삭제는 행을 지우지 않고 '삭제' 로 표시 (아래 행 번호 유지)
+    db.run("UPDATE logs SET qty = 9 WHERE id = ?", (b,))
+    admin.delete_logs([c])
+    assert sync_once(sheet) == {"appended": 0, "updated": 1, "deleted": 1}
+    assert len(sheet.rows) == 4
+    assert sheet.rows[2][4] == 9
+    assert sheet.rows[3] == [c, "", "", "", "", "", "삭제"]
+
+def test_failed_sync_is_retried_without_duplicates(ledger):
+    rid, iid = ledger
+    insert_logs_bulk([(datetime(2026, 3, 1, 9, 0), rid, iid, 1, None)])
+    sheet = MemorySheet()
+    sheet.fail_next = 1
+    with pytest.raises(ConnectionError):
+        sync_once(sheet)
+    assert pending_changes() == 1
+
+    assert sync_once(sheet)["appended"] == 1
+    assert sync_once(sheet)["appended"] == 0
+    assert len(sheet.rows) == 2
+
+def test_worker_backs_off_and_recovers(ledger):
+    rid, iid = ledger
+    insert_logs_bulk([(datetime(2026, 3, 1, 9, k), rid, iid, 1, None) for k in range(5)])
+    sheet = MemorySheet()
+    sheet.fail_next = 2
+    worker = SyncWorker(sheet, interval=0.05, max_backoff=0.05)
+    worker.start()
+    try:
+        deadline = time.monotonic() + 10
+        while worker.last_result is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        worker.stop()
+        worker.join(5)
+
+    assert worker.last_result == {"appended": 5, "updated": 0, "deleted": 0}
+    assert worker.failures == 0 and worker.last_error is None
+    assert sheet.calls[:2] == ["ensure_header", "ensure_header"]
+    assert len(sheet.rows) == 6
+    assert pending_changes() == 0
+
+def test_backoff_grows_with_failures():
+    worker = SyncWorker(MemorySheet(), interval=30.0, max_backoff=600.0)
+    assert worker.backoff() == 30.0
+    worker.failures = 3
+    assert 4.0 <= worker.backoff() <= 8.0
+    worker.failures = 20
+    assert worker.backoff() <= 600.0